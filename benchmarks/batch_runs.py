@@ -0,0 +1,124 @@
+"""
+Benchmark: running the tests of every snippet one by one vs. as a batch job.
+
+A temporary SQLite database is filled with `--snippets` Python snippets whose tests wait
+`--wait-ms` on the code under test (sleeping, as I/O bound tests do, so that runs overlap
+even on a single CPU; 0 makes every run CPU bound) and spend a little CPU time. They are
+run:
+
+- one by one: `run_code` then `crud.update_test_result`, one commit per snippet, as a
+  client calling `POST /api/run/python` for each snippet would
+- batch: `src.batch.run_batch` with a concurrency of 1, 2 and 4, on its own warm pool of 4
+  workers, committing `BATCH_COMMIT_SIZE` results at a time
+
+The wall time, the snippets run per second and the number of commits are printed.
+
+Usage:
+    python -m benchmarks.batch_runs [--snippets 200] [--wait-ms 50]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SANDBOX_WARM_POOL_SIZE", "4")
+os.environ.setdefault("BATCH_CONCURRENCY", "4")
+
+from sqlalchemy import event  # noqa: E402
+
+from src import batch, crud, runner  # noqa: E402
+from src.database import (  # noqa: E402
+    create_async_db_engine,
+    create_db_engine,
+    create_session_factory,
+)
+from src.models import Base  # noqa: E402
+
+CODE = """
+import time
+
+def slow_square(x, wait_ms):
+    time.sleep(wait_ms / 1000)
+    sum(range(20000))
+    return x * x
+"""
+
+
+def snippet(i: int, wait_ms: int) -> dict:
+    return {
+        "title": f"Snippet {i}",
+        "language": "python",
+        "code": CODE,
+        "test_code": f"assert slow_square({i}, {wait_ms}) == {i * i}\n",
+    }
+
+
+def count_commits(engine) -> list[int]:
+    commits = [0]
+
+    def on_commit(connection):
+        commits[0] += 1
+
+    event.listen(engine.sync_engine, "commit", on_commit)
+    return commits
+
+
+async def one_by_one(session_factory) -> None:
+    async with session_factory() as db:
+        _, last_id = await crud.count_test_runs(db, "python")
+        rows = await crud.get_test_runs(db, "python", 0, last_id, last_id)
+        await db.commit()
+        for row in rows:
+            result = await runner.run_code_async(
+                "python", row["code"], row["test_code"]
+            )
+            await crud.update_test_result(
+                db, row["id"], result["result"], result["message"], result
+            )
+
+
+async def main(count: int, wait_ms: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        engine = create_db_engine(url)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+        async_engine = create_async_db_engine(url)
+        session_factory = create_session_factory(async_engine)
+        async with session_factory() as db:
+            await crud.create_snippets(db, [snippet(i, wait_ms) for i in range(count)])
+        # Start the warm pools of interactive and batch runs
+        runner.run_code("python", CODE, "pass")
+        runner.run_code("python", CODE, "pass", capacity=batch.batch_capacity)
+        commits = count_commits(async_engine)
+
+        modes = [("one by one", lambda: one_by_one(session_factory))]
+        for concurrency in (1, 2, 4):
+            job = batch.BatchJob("python")
+            modes.append(
+                (
+                    f"batch x{concurrency}",
+                    lambda job=job, concurrency=concurrency: batch.run_batch(
+                        job, async_engine, concurrency
+                    ),
+                )
+            )
+
+        print(f"{'mode':<12} {'seconds':>8} {'runs/s':>8} {'commits':>8}")
+        for name, run in modes:
+            commits[0] = 0
+            start = time.perf_counter()
+            await run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<12} {elapsed:>8.2f} {count / elapsed:>8.1f} {commits[0]:>8}")
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snippets", type=int, default=200)
+    parser.add_argument("--wait-ms", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.snippets, args.wait_ms))
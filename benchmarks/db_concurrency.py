@@ -0,0 +1,160 @@
+"""
+Benchmark: concurrent snippet reads and writes against SQLite.
+
+Reader processes page through the snippet list while writer processes update snippets,
+the way `GET /api/snippets`, `PUT /api/snippets/{id}` and
+`/api/run/python` overlap under load. The same workload runs against:
+
+- default: an engine with no pool settings or pragmas (the old `database.py`)
+- tuned: `create_async_db_engine` (WAL, synchronous=NORMAL, mmap, cache size, busy timeout)
+
+Each worker is a separate process with its own engine, as with several server workers.
+The throughput, write latency and "database is locked" errors are reported.
+
+Usage:
+    python -m benchmarks.db_concurrency [--readers 8] [--writers 4] [--seconds 5]
+        [--busy-timeout-ms 5000]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src import blobs, crud, models, schemas
+from src import database
+from src.database import (
+    async_database_url,
+    create_async_db_engine,
+    create_session_factory,
+    register_sqlite_functions,
+)
+
+SNIPPETS = 2000
+
+
+def populate(engine) -> None:
+    models.Base.metadata.create_all(engine)
+    rows = [
+        {"title": f"Snippet {i}", "language": "python", "code": "x = 1\n" * 20}
+        for i in range(SNIPPETS)
+    ]
+    with engine.begin() as connection:
+        rows, blob_rows = blobs.split_texts(rows)
+        connection.execute(models.insert_blobs("sqlite"), blob_rows)
+        connection.execute(insert(models.Snippet), rows)
+
+
+FACTORIES = {
+    "default": lambda url: create_async_engine(
+        async_database_url(url),
+        connect_args={
+            "check_same_thread": False,
+            "timeout": database.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
+    ),
+    "tuned": create_async_db_engine,
+}
+
+
+async def work(factory: str, url: str, role: str, seed: int, stop: float) -> dict:
+    engine = FACTORIES[factory](url)
+    Session = create_session_factory(engine)
+    rng = random.Random(seed)
+    stats = {"ops": 0, "locked": 0, "ms": []}
+    while time.time() < stop:
+        start = time.perf_counter()
+        async with Session() as db:
+            try:
+                if role == "read":
+                    await crud.get_snippets(db, limit=50, summary=True)
+                else:
+                    update = schemas.SnippetUpdate(code=f"x = {rng.random()}\n")
+                    await crud.update_snippet(db, rng.randint(1, SNIPPETS), update)
+                stats["ops"] += 1
+                stats["ms"].append((time.perf_counter() - start) * 1000)
+            except OperationalError:
+                await db.rollback()
+                stats["locked"] += 1
+    await engine.dispose()
+    return stats
+
+
+def worker(
+    factory: str, url: str, role: str, seed: int, stop: float, timeout_ms: int
+) -> dict:
+    """
+    Runs reads or writes in its own process until `stop`, with its own engine.
+    """
+    database.SQLITE_BUSY_TIMEOUT_MS = timeout_ms
+    return asyncio.run(work(factory, url, role, seed, stop))
+
+
+def run(
+    factory: str,
+    url: str,
+    readers: int,
+    writers: int,
+    seconds: float,
+    timeout_ms: int,
+) -> dict:
+    stop = time.time() + 1 + seconds  # Leave a second for the processes to start
+    roles = ["read"] * readers + ["write"] * writers
+    with multiprocessing.Pool(len(roles)) as pool:
+        results = pool.starmap(
+            worker,
+            [(factory, url, role, i, stop, timeout_ms) for i, role in enumerate(roles)],
+        )
+    totals = {"read": [], "write": [], "locked": 0}
+    counts = {"read": 0, "write": 0}
+    for role, stats in zip(roles, results):
+        counts[role] += stats["ops"]
+        totals[role] += stats["ms"]
+        totals["locked"] += stats["locked"]
+    return {**totals, "reads": counts["read"], "writes": counts["write"]}
+
+
+def main(readers: int, writers: int, seconds: float, timeout_ms: int) -> None:
+    print(
+        f"{'engine':<8} {'reads/s':>9} {'writes/s':>9} {'write p50':>10} "
+        f"{'write p99':>10} {'locked':>7}"
+    )
+    for name in FACTORIES:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+            engine = create_engine(url)  # Leaves the journal mode to the engine tested
+            event.listen(engine, "connect", register_sqlite_functions)
+            populate(engine)
+            engine.dispose()
+            stats = run(name, url, readers, writers, seconds, timeout_ms)
+
+        write_ms = sorted(stats["write"]) or [0.0]
+        p99 = write_ms[max(0, int(len(write_ms) * 0.99) - 1)]
+        print(
+            f"{name:<8} {stats['reads'] / seconds:>9.0f} "
+            f"{stats['writes'] / seconds:>9.0f} {statistics.median(write_ms):>10.2f} "
+            f"{p99:>10.2f} {stats['locked']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument(
+        "--busy-timeout-ms",
+        type=int,
+        default=database.SQLITE_BUSY_TIMEOUT_MS,
+        help="How long both engines wait for a lock before failing",
+    )
+    args = parser.parse_args()
+    main(args.readers, args.writers, args.seconds, args.busy_timeout_ms)
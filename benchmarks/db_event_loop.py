@@ -0,0 +1,111 @@
+"""
+Benchmark: event loop stalls caused by database queries.
+
+While concurrent snippet-list queries run on the event loop, a ticker coroutine that should
+wake up every millisecond measures how late it is, the way an SSE stream waiting for its
+next token would be delayed. The queries run through:
+
+- sync: a synchronous `Session` called from the coroutine (the old `get_db`)
+- async: an `AsyncSession` from `create_async_db_engine` (the current `get_db`)
+
+Usage:
+    python -m benchmarks.db_event_loop [--snippets 20000] [--queries 200] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import Session
+
+from src import blobs, crud, models
+from src.database import (
+    create_async_db_engine,
+    create_db_engine,
+    create_session_factory,
+    register_sqlite_functions,
+)
+
+
+def populate(url: str, count: int) -> None:
+    engine = create_engine(url)
+    event.listen(engine, "connect", register_sqlite_functions)
+    models.Base.metadata.create_all(engine)
+    rows = [
+        {"title": f"Snippet {i}", "language": "python", "code": "x = 1\n" * 50}
+        for i in range(count)
+    ]
+    with engine.begin() as connection:
+        rows, blob_rows = blobs.split_texts(rows)
+        connection.execute(models.insert_blobs("sqlite"), blob_rows)
+        connection.execute(insert(models.Snippet), rows)
+    engine.dispose()
+
+
+async def ticker(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+
+async def measure(query, queries: int, concurrency: int) -> tuple[float, list[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await query()
+
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(queries)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return queries / elapsed, sorted(lags)
+
+
+async def main(count: int, queries: int, concurrency: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        populate(url, count)
+        sync_engine = create_db_engine(url)
+        async_engine = create_async_db_engine(url)
+        AsyncSessionLocal = create_session_factory(async_engine)
+
+        async def sync_query():
+            with Session(sync_engine) as db:
+                db.scalars(
+                    select(models.Snippet)
+                    .where(models.Snippet.is_active == True)
+                    .order_by(models.Snippet.updated_at.desc())
+                    .limit(100)
+                ).all()
+
+        async def async_query():
+            async with AsyncSessionLocal() as db:
+                await crud.get_snippets(db, limit=100)
+
+        print(f"{'session':<8} {'queries/s':>10} {'lag p50 ms':>11} {'lag max ms':>11}")
+        for name, query in (("sync", sync_query), ("async", async_query)):
+            throughput, lags = await measure(query, queries, concurrency)
+            print(
+                f"{name:<8} {throughput:>10.0f} {statistics.median(lags):>11.2f} "
+                f"{lags[-1]:>11.2f}"
+            )
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.snippets, args.queries, args.concurrency))
@@ -0,0 +1,105 @@
+"""
+Load test: latency of GET /api/snippets while sandbox test runs are in progress.
+
+It measures the p50/p99 latency of `/api/snippets` on an idle server, then again while
+20 concurrent `/api/run/python` calls are running, each of which keeps the sandbox busy
+for about one second. With the execution pool in place both percentiles should stay flat.
+
+Usage:
+    python -m benchmarks.load_run_concurrency [--runs 20] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_dir}/bench.sqlite3"
+os.environ.setdefault("SANDBOX_MAX_CONCURRENCY", "4")
+os.environ.setdefault("SANDBOX_MAX_QUEUE", "32")
+
+import httpx  # noqa: E402
+
+from src.app import app  # noqa: E402
+
+SLOW_CODE = """
+import time
+
+def slow():
+    time.sleep(1)
+    return True
+"""
+SLOW_TEST_CODE = "assert slow()"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def measure_list_latency(client: httpx.AsyncClient, requests: int) -> list[float]:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/api/snippets/")
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def run_tests(client: httpx.AsyncClient, snippet_id: int, runs: int) -> list:
+    payload = {
+        "snippet_id": snippet_id,
+        "code": SLOW_CODE,
+        "language": "python",
+        "test_code": SLOW_TEST_CODE,
+    }
+    return await asyncio.gather(
+        *(client.post("/api/run/python", json=payload, timeout=60) for _ in range(runs))
+    )
+
+
+def report(label: str, latencies: list[float]) -> None:
+    print(
+        f"{label:<28} n={len(latencies):<5} "
+        f"p50={statistics.median(latencies):7.2f} ms  "
+        f"p99={percentile(latencies, 99):7.2f} ms  "
+        f"max={max(latencies):7.2f} ms"
+    )
+
+
+async def main(runs: int, requests: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    # The transport does not run the lifespan, which creates the schema
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        snippet_id = (await client.post("/api/snippets/", json={})).json()["id"]
+
+        idle = await measure_list_latency(client, requests)
+
+        run_task = asyncio.ensure_future(run_tests(client, snippet_id, runs))
+        await asyncio.sleep(0.05)  # Let the runs get admitted to the pool
+        loaded = await measure_list_latency(client, requests)
+        responses = await run_task
+
+    statuses = {}
+    for response in responses:
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    report("GET /api/snippets (idle)", idle)
+    report(f"GET /api/snippets ({runs} runs)", loaded)
+    print(f"/api/run/python status codes: {statuses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.requests))
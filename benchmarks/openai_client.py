@@ -0,0 +1,125 @@
+"""
+Benchmark: OpenAI client strategies against a local stub OpenAI server.
+
+A stub `/v1/chat/completions` endpoint answers after a fixed delay. The same number of
+concurrent completions is then issued with:
+
+- sync-per-request: a new blocking `openai.OpenAI` client per call (the old `chatgpt_response`)
+- async-per-request: a new `openai.AsyncOpenAI` client per call (the old stream path)
+- shared-async: the shared pooled client from `src.llm`
+
+and the throughput and number of TCP connections seen by the server are reported.
+
+Usage:
+    python -m benchmarks.openai_client [--requests 200] [--concurrency 20] [--delay-ms 20]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import openai
+import uvicorn
+from fastapi import FastAPI, Request
+
+os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+
+from src import llm  # noqa: E402
+
+stub = FastAPI()
+stub.state.delay = 0.02
+stub.state.client_ports = set()
+
+
+@stub.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    stub.state.client_ports.add(request.client.port)
+    await asyncio.sleep(stub.state.delay)
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-3.5-turbo",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": '{"language": "python"}'},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+def start_stub_server() -> str:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    config = uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+MESSAGES = [{"role": "user", "content": "detect"}]
+
+
+async def sync_per_request(base_url: str) -> None:
+    client = openai.OpenAI(base_url=base_url)
+    client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES)
+    client.close()
+
+
+async def async_per_request(base_url: str) -> None:
+    client = openai.AsyncOpenAI(base_url=base_url)
+    await client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES)
+    await client.close()
+
+
+async def shared_async(base_url: str) -> None:
+    await llm.get_client().chat.completions.create(
+        model="gpt-3.5-turbo", messages=MESSAGES
+    )
+
+
+async def run_strategy(strategy, base_url: str, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await strategy(base_url)
+
+    stub.state.client_ports = set()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, len(stub.state.client_ports)
+
+
+async def main(requests: int, concurrency: int) -> None:
+    base_url = start_stub_server()
+    os.environ["OPENAI_API_BASE"] = base_url
+
+    print(f"{'strategy':<20} {'req/s':>8} {'connections':>12}")
+    for strategy in (sync_per_request, async_per_request, shared_async):
+        throughput, connections = await run_strategy(
+            strategy, base_url, requests, concurrency
+        )
+        print(f"{strategy.__name__:<20} {throughput:8.1f} {connections:>12}")
+    await llm.close_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+    stub.state.delay = args.delay_ms / 1000
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,62 @@
+"""
+Benchmark: staging cold runs through stdin vs. a script in a new temporary directory.
+
+A passing and a failing test run of every registered language is executed repeatedly with
+`SANDBOX_MODE=cold`, with `SANDBOX_STAGING` set to "disk" and then "stdin", alternating
+between the two so that both see the same machine load. The mean and 95th percentile wall
+time per run are reported.
+
+Usage:
+    python -m benchmarks.runner_staging [--iterations 30]
+"""
+
+import argparse
+import statistics
+import time
+
+from src import runner
+from tests.unit import test_runner
+
+CASES = [
+    (
+        "python",
+        "def add(a, b):\n    return a - b",
+        "assert add(0, 0) == 0",
+        "assert add(1, 2) == 3",
+    ),
+    *(param.values[:4] for param in test_runner.LANGUAGE_CASES),
+]
+STAGINGS = ("disk", "stdin")
+
+
+def percentile(timings: list[float], fraction: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+    runner.SANDBOX_MODE = "cold"
+
+    print(f"{'case':<20} {'staging':<7} {'mean ms':>8} {'p95 ms':>8}")
+    for language, code, passing, failing in CASES:
+        for name, test_code in (("success", passing), ("failure", failing)):
+            timings = {staging: [] for staging in STAGINGS}
+            for _ in range(args.iterations):
+                for staging in STAGINGS:
+                    runner.SANDBOX_STAGING = staging
+                    start = time.perf_counter()
+                    runner.run_code(language, code, test_code)
+                    timings[staging].append((time.perf_counter() - start) * 1000)
+            for staging in STAGINGS:
+                print(
+                    f"{language + '_' + name:<20} {staging:<7} "
+                    f"{statistics.mean(timings[staging]):>8.1f} "
+                    f"{percentile(timings[staging], 0.95):>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: running test code as a whole vs. split into test cases run in parallel.
+
+The test code has `--cases` test functions, each waiting `--wait-ms` on the code under test
+(sleeping, as I/O bound tests do, so that cases overlap even on a single CPU) and spending
+a little CPU time. It is run as a whole, with every function called in turn, and then split
+with `SANDBOX_CASE_CONCURRENCY` set to 1, 2 and 4, on a warm pool of 4 workers. The mean
+wall time per run and the number of failures reported are printed.
+
+Usage:
+    python -m benchmarks.runner_test_cases [--cases 8] [--wait-ms 200] [--iterations 5]
+"""
+
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SANDBOX_WARM_POOL_SIZE", "4")
+
+from src import runner  # noqa: E402
+from src.languages import PYTHON  # noqa: E402
+
+CODE = """
+import time
+
+def slow_square(x, wait_ms):
+    time.sleep(wait_ms / 1000)
+    sum(range(20000))
+    return x * x if x % 4 != 3 else -1  # Wrong for 3, 7, ...
+"""
+
+
+def build_test_code(cases: int, wait_ms: int) -> str:
+    return "\n".join(
+        f"def test_square_{i}():\n    assert slow_square({i}, {wait_ms}) == {i * i}\n"
+        for i in range(cases)
+    )
+
+
+def time_runs(run, iterations: int) -> tuple[float, dict]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=8)
+    parser.add_argument("--wait-ms", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    test_code = build_test_code(args.cases, args.wait_ms)
+    calls = "\n".join(f"test_square_{i}()" for i in range(args.cases))
+    runner.run_code("python", CODE, "pass")  # Start the warm pool
+
+    def run_whole() -> dict:
+        source = PYTHON.build_script(CODE, f"{test_code}\n{calls}")
+        return runner._run_script(PYTHON, source, 60000, 256, None)
+
+    mean, result = time_runs(run_whole, args.iterations)
+    print(f"{'mode':<12} {'mean ms':>8} {'failures':>9}")
+    print(f"{'whole':<12} {mean:>8.0f} {int(result['result'] != 'success'):>9}")
+
+    for concurrency in (1, 2, 4):
+        runner.case_executor = ThreadPoolExecutor(max_workers=concurrency)
+        mean, result = time_runs(
+            lambda: runner.run_code("python", CODE, test_code, timeout_ms=60000),
+            args.iterations,
+        )
+        failures = sum(test["result"] != "success" for test in result["tests"])
+        print(f"{'split x' + str(concurrency):<12} {mean:>8.0f} {failures:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: cold-spawned interpreter vs. warm sandbox pool, per language.
+
+Each Python case from `tests/unit/test_runner.py`, and a passing and a failing test run of
+every other registered language, is executed repeatedly with `SANDBOX_MODE` set to "cold"
+and then "warm", and the mean and 95th percentile wall time per run are reported.
+The timeout case is dominated by its own one-second limit and runs fewer iterations.
+
+Usage:
+    python -m benchmarks.runner_warm_pool [--iterations 20]
+"""
+
+import argparse
+import functools
+import statistics
+import time
+
+from src import runner
+from src.languages import LANGUAGES
+from src.warm_pool import get_warm_pool
+from tests.unit import test_runner
+
+CASES = [
+    test_runner.test_run_python_code_success,
+    test_runner.test_run_python_code_failure,
+    test_runner.test_run_python_code_memory_limit,
+    test_runner.test_run_python_code_timeout,
+]
+for param in test_runner.LANGUAGE_CASES:
+    language, code, passing, failing, _ = param.values
+    for name, test_code in (("success", passing), ("failure", failing)):
+        case = functools.partial(runner.run_code, language, code, test_code)
+        case.__name__ = f"{language}_{name}"
+        CASES.append(case)
+
+
+def time_case(case, iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        case()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def p95(timings: list[float]) -> float:
+    return statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+
+
+def main(iterations: int) -> None:
+    for language in LANGUAGES.values():
+        if language.worker:
+            get_warm_pool(language.worker).start()  # Paid once per process, not per run
+
+    print(
+        f"{'case':<40} {'cold mean':>10} {'cold p95':>10} "
+        f"{'warm mean':>10} {'warm p95':>10} {'speedup':>8}"
+    )
+    for case in CASES:
+        n = 2 if case is test_runner.test_run_python_code_timeout else iterations
+        results = {}
+        for mode in ("cold", "warm"):
+            runner.SANDBOX_MODE = mode
+            results[mode] = time_case(case, n)
+
+        cold = statistics.mean(results["cold"])
+        warm = statistics.mean(results["warm"])
+        print(
+            f"{case.__name__:<40} {cold:8.1f}ms {p95(results['cold']):8.1f}ms "
+            f"{warm:8.1f}ms {p95(results['warm']):8.1f}ms {cold / warm:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    main(args.iterations)
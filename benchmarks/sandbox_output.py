@@ -0,0 +1,75 @@
+"""
+Benchmark: memory used by the API process to capture the output of a test run.
+
+A Python snippet prints `--megabytes` of output to stderr, which fails the run and becomes
+its message. The run is executed with `SANDBOX_MODE` set to "cold" and then "warm", once
+with the output kept whole (an unbounded ring buffer) and once with the default
+`SANDBOX_OUTPUT_LIMIT_BYTES`, and the size of the message and the peak memory allocated by
+the API process (tracemalloc) are reported. The live output callback counts the streamed
+bytes without keeping them.
+
+Usage:
+    python -m benchmarks.sandbox_output [--megabytes 1 16 64]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from src import runner
+
+DEFAULT_LIMIT = runner.SANDBOX_OUTPUT_LIMIT_BYTES
+UNBOUNDED = 1 << 40
+
+SNIPPET = """
+import sys
+line = "x" * 1023 + "\\n"
+for _ in range({lines}):
+    sys.stderr.write(line)
+sys.exit(1)
+"""
+
+
+def measure(megabytes: int, output_limit: int) -> tuple[int, int, float, float]:
+    runner.SANDBOX_OUTPUT_LIMIT_BYTES = output_limit
+    streamed = 0
+
+    def on_output(stream: str, text: str) -> None:
+        nonlocal streamed
+        streamed += len(text)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = runner.run_code(
+        "python", SNIPPET.format(lines=megabytes * 1024), "pass", on_output=on_output
+    )
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert result["result"] == "failure", result["message"]
+    return len(result["message"]), streamed, peak / 2**20, elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<6} {'output':>8} {'limit':>10} {'message':>10} "
+        f"{'streamed':>10} {'peak MB':>8} {'ms':>8}"
+    )
+    for mode in ("cold", "warm"):
+        runner.SANDBOX_MODE = mode
+        for megabytes in args.megabytes:
+            for limit in (UNBOUNDED, DEFAULT_LIMIT):
+                message, streamed, peak, ms = measure(megabytes, limit)
+                label = "none" if limit == UNBOUNDED else str(limit)
+                print(
+                    f"{mode:<6} {megabytes:>6}MB {label:>10} {message:>10} "
+                    f"{streamed:>10} {peak:>8.1f} {ms:>8.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: repeated snippet reads with the response cache.
+
+Measures the latency of `GET /api/snippets/` (a full page) and `GET /api/snippets/{id}`:
+
+- uncached: the response cache is cleared before every request
+- cached: the serialized response is served from the cache
+- 304: the client sends the ETag of its copy in `If-None-Match`
+
+Usage:
+    python -m benchmarks.snippet_cache [--snippets 1000] [--requests 500]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, event, insert
+
+from src import blobs, models
+from src.app import app
+from src.database import (
+    create_async_db_engine,
+    create_session_factory,
+    get_db,
+    register_sqlite_functions,
+)
+from src.response_cache import response_cache
+
+
+def populate(url: str, count: int) -> None:
+    engine = create_engine(url)
+    event.listen(engine, "connect", register_sqlite_functions)
+    models.Base.metadata.create_all(engine)
+    rows = [
+        {"title": f"Snippet {i}", "language": "python", "code": "x = 1\n" * 50}
+        for i in range(count)
+    ]
+    with engine.begin() as connection:
+        rows, blob_rows = blobs.split_texts(rows)
+        connection.execute(models.insert_blobs("sqlite"), blob_rows)
+        connection.execute(insert(models.Snippet), rows)
+    engine.dispose()
+
+
+async def measure(client, path: str, requests: int, mode: str) -> float:
+    headers = {}
+    if mode == "304":
+        headers["If-None-Match"] = (await client.get(path)).headers["ETag"]
+    timings = []
+    for _ in range(requests):
+        if mode == "uncached":
+            response_cache.clear()
+        start = time.perf_counter()
+        await client.get(path, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main(count: int, requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        populate(url, count)
+        async_engine = create_async_db_engine(url)
+        SessionLocal = create_session_factory(async_engine)
+
+        async def override_get_db():
+            async with SessionLocal() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            print(
+                f"{'endpoint':<22} {'uncached ms':>12} {'cached ms':>10} {'304 ms':>8}"
+            )
+            for path in ("/api/snippets/?limit=100", "/api/snippets/1"):
+                medians = [
+                    await measure(client, path, requests, mode)
+                    for mode in ("uncached", "cached", "304")
+                ]
+                print(
+                    f"{path:<22} {medians[0]:>12.2f} {medians[1]:>10.2f} "
+                    f"{medians[2]:>8.2f}"
+                )
+        app.dependency_overrides.clear()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.snippets, args.requests))
@@ -0,0 +1,130 @@
+"""
+Benchmark: bulk NDJSON import and streaming export of snippets.
+
+The app is served by uvicorn in a background thread against a temporary SQLite database.
+The benchmark measures:
+
+- one-by-one: `POST /api/snippets/` per snippet (timed on a sample and extrapolated)
+- import: `POST /api/snippets/import` with the whole library as a streamed NDJSON body
+- export: `GET /api/snippets/export`, with the peak Python memory allocated while streaming
+
+Usage:
+    python -m benchmarks.snippet_import_export [--snippets 100000] [--sample 500]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import httpx
+import uvicorn
+
+from src.app import app
+from src.database import (
+    create_async_db_engine,
+    create_db_engine,
+    create_session_factory,
+    get_db,
+)
+from src.models import Base
+
+
+def snippet(i: int) -> dict:
+    return {
+        "title": f"Snippet {i}",
+        "language": "python",
+        "description": f"Return the square of {i}.",
+        "code": f"def square_{i}(x):\n    return x * x\n",
+        "test_code": f"assert square_{i}(3) == 9\n",
+    }
+
+
+async def ndjson_body(count: int):
+    batch = []
+    for i in range(count):
+        batch.append(json.dumps(snippet(i)))
+        if len(batch) == 1000:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
+
+
+def start_server() -> str:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def main(count: int, sample: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        engine = create_db_engine(url)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+        async_engine = create_async_db_engine(url)
+        SessionLocal = create_session_factory(async_engine)
+
+        async def override_get_db():
+            async with SessionLocal() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        base_url = start_server()
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            start = time.perf_counter()
+            for i in range(sample):
+                await client.post("/api/snippets/", json=snippet(i))
+            per_snippet = (time.perf_counter() - start) / sample
+            print(
+                f"one-by-one: {per_snippet * 1000:.2f} ms/snippet, "
+                f"~{per_snippet * count:.0f}s for {count}"
+            )
+
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/snippets/import",
+                content=ndjson_body(count),
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            elapsed = time.perf_counter() - start
+            imported = response.json()["imported"]
+            print(f"import:     {imported} snippets in {elapsed:.1f}s")
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            lines = size = 0
+            async with client.stream("GET", "/api/snippets/export") as response:
+                async for chunk in response.aiter_bytes():
+                    lines += chunk.count(b"\n")
+                    size += len(chunk)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"export:     {lines} snippets ({size / 1e6:.1f} MB) in {elapsed:.1f}s, "
+                f"peak allocations {peak / 1e6:.1f} MB"
+            )
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.snippets, args.sample))
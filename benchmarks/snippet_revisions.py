@@ -0,0 +1,64 @@
+"""
+Benchmark: storage and reconstruction of snippet revisions.
+
+A snippet with a few hundred lines of code is edited many times, each edit changing a
+couple of lines, as autosaves do. Its revisions are encoded with `src.revisions` and
+compared with storing a compressed full copy of every revision:
+
+- storage: the total bytes stored for the history
+- reconstruction: the mean time to rebuild a revision from its latest keyframe
+
+Usage:
+    python -m benchmarks.snippet_revisions [--lines 300] [--edits 500]
+"""
+
+import argparse
+import json
+import random
+import time
+import zlib
+
+from src import revisions
+
+
+def edit(lines: list[str], rng: random.Random) -> list[str]:
+    lines = list(lines)
+    for _ in range(2):
+        i = rng.randrange(len(lines))
+        lines[i] = f"    value_{rng.randrange(10**6)} = compute({i})\n"
+    return lines
+
+
+def main(line_count: int, edits: int) -> None:
+    rng = random.Random(0)
+    lines = [f"    value_{i} = compute({i})\n" for i in range(line_count)]
+    fields = dict.fromkeys(revisions.REVISION_FIELDS, "")
+    fields["test_code"] = "assert compute(1) == 1\n" * 20
+
+    stored, previous, full = [], None, 0
+    for number in range(1, edits + 1):
+        values = {**fields, "code": "def main():\n" + "".join(lines)}
+        stored.append(revisions.encode(number, values, previous))
+        full += len(zlib.compress(json.dumps(values).encode("utf-8")))
+        previous = values
+        lines = edit(lines, rng)
+    delta = sum(len(data) for _, data in stored)
+    print(
+        f"storage:        {full / 1e3:.0f} KB as full copies, {delta / 1e3:.0f} KB as "
+        f"diffs (keyframe every {revisions.REVISION_KEYFRAME_INTERVAL})"
+    )
+
+    start = time.perf_counter()
+    for number in range(1, edits + 1):
+        keyframe = number - (number - 1) % revisions.REVISION_KEYFRAME_INTERVAL
+        revisions.reconstruct(stored[keyframe - 1 : number])
+    elapsed = (time.perf_counter() - start) / edits
+    print(f"reconstruction: {elapsed * 1000:.2f} ms/revision")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--edits", type=int, default=500)
+    args = parser.parse_args()
+    main(args.lines, args.edits)
@@ -0,0 +1,112 @@
+"""
+Benchmark: full-text snippet search latency on a large library.
+
+A temporary SQLite database is filled with synthetic snippets (the FTS index is kept in
+sync by its triggers during the inserts), then `crud.search_snippets` is timed for queries
+of different selectivity, from a rare word to a word found in most snippets.
+
+Usage:
+    python -m benchmarks.snippet_search [--snippets 100000] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, insert, text
+
+from src import blobs, crud, models
+from src.database import (
+    create_async_db_engine,
+    create_session_factory,
+    register_sqlite_functions,
+)
+
+WORDS = [
+    "binary", "search", "sort", "merge", "quick", "heap", "tree", "graph", "path",
+    "shortest", "matrix", "string", "reverse", "parse", "json", "csv", "http", "cache",
+    "queue", "stack", "linked", "list", "hash", "map", "prime", "fibonacci", "factorial",
+    "palindrome", "anagram", "regex", "date", "time", "window", "sliding", "interval",
+    "dynamic", "greedy", "backtrack", "permutation", "subset", "trie", "union", "find",
+]  # fmt: skip
+LANGUAGES = ["python", "javascript", "ruby", "go"]
+
+QUERIES = {
+    "rare word": "zebra",
+    "title word": "fibonacci",
+    "two prefixes": "bin sea",
+    "common word": "def",
+}
+
+
+def make_snippet(rng: random.Random, i: int) -> dict:
+    words = rng.sample(WORDS, 3)
+    name = "_".join(words)
+    return {
+        "title": " ".join(w.capitalize() for w in words),
+        "language": rng.choice(LANGUAGES),
+        "description": f"Write a function that does {' '.join(rng.sample(WORDS, 8))}.",
+        "code": f"def {name}(data):\n    # {' '.join(rng.sample(WORDS, 6))}\n"
+        + "    result = []\n    for item in data:\n        result.append(item)\n"
+        + ("    return 'zebra'\n" if i % 1000 == 0 else "    return result\n"),
+        "is_active": True,
+    }
+
+
+def populate(engine, count: int) -> float:
+    rng = random.Random(42)
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        for offset in range(0, count, 5000):
+            rows = [
+                make_snippet(rng, i) for i in range(offset, min(count, offset + 5000))
+            ]
+            rows, blob_rows = blobs.split_texts(rows)
+            connection.execute(models.insert_blobs("sqlite"), blob_rows)
+            connection.execute(insert(models.Snippet), rows)
+    return time.perf_counter() - start
+
+
+async def main(count: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        engine = create_engine(url)
+        event.listen(engine, "connect", register_sqlite_functions)
+        models.Base.metadata.create_all(engine)
+        elapsed = populate(engine, count)
+        engine.dispose()
+        print(f"inserted {count} snippets in {elapsed:.1f}s (FTS triggers included)\n")
+
+        async_engine = create_async_db_engine(url)
+        print(f"{'query':<14} {'matches':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        async with create_session_factory(async_engine)() as db:
+            for name, query in QUERIES.items():
+                matches = await db.scalar(
+                    text(
+                        "SELECT count(*) FROM snippets_fts WHERE snippets_fts MATCH :q"
+                    ),
+                    {"q": crud.fts_query(query)},
+                )
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await crud.search_snippets(db, query, limit=20)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                p99 = timings[int(len(timings) * 0.99) - 1]
+                print(
+                    f"{name:<14} {matches:>8} {statistics.median(timings):>8.2f} {p99:>8.2f}"
+                )
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.snippets, args.repeat))
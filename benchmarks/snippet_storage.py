@@ -0,0 +1,148 @@
+"""
+Benchmark: snippet metadata scans with inline texts and with blob storage.
+
+A temporary SQLite database is created with the texts inline in `snippets` (the schema
+before migration 2), filled with snippets whose code is shared in groups of revisions and
+whose test result message is a multi-KB traceback. The database is measured, migrated to
+blob storage and vacuumed, then measured again:
+
+- size: the database file size
+- scan: a full scan of the metadata columns
+- pages: 10 summary pages of `crud.get_snippets`
+
+Usage:
+    python -m benchmarks.snippet_storage [--snippets 20000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from src import crud, migrations, models
+from src.database import (
+    create_async_db_engine,
+    create_db_engine,
+    create_session_factory,
+)
+
+LEGACY_SCHEMA = """
+CREATE TABLE snippets (
+    id INTEGER PRIMARY KEY, title VARCHAR, language VARCHAR, description TEXT,
+    code TEXT, feedback TEXT, test_code TEXT, test_feedback TEXT,
+    test_result VARCHAR, test_result_message TEXT, is_active BOOLEAN,
+    created_at DATETIME, updated_at DATETIME
+)
+"""
+
+TRACEBACK = "".join(
+    f'  File "/tmp/snippet.py", line {n}, in step_{n}\n    result = step_{n + 1}(data)\n'
+    for n in range(40)
+)
+
+
+def populate(engine, count: int) -> None:
+    rows = [
+        {
+            "title": f"Snippet {i}",
+            "language": "python",
+            "description": f"Return the square of {i}.",
+            "code": f"def square_{i // 5}(x):\n    return x * x\n" * 20,
+            "test_code": f"assert square_{i // 5}(3) == 9\n" * 10,
+            "test_result": "failure",
+            "test_result_message": f"Traceback (most recent call last):\n{TRACEBACK}"
+            f"AssertionError: snippet {i}\n",
+            "updated_at": f"2024-01-01 00:{i // 3600 % 60:02d}:{i % 60:02d}.{i:06d}",
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_SCHEMA))
+        connection.execute(
+            text(
+                "INSERT INTO snippets (title, language, description, code, test_code, "
+                "test_result, test_result_message, is_active, created_at, updated_at) "
+                "VALUES (:title, :language, :description, :code, :test_code, "
+                ":test_result, :test_result_message, 1, :updated_at, :updated_at)"
+            ),
+            rows,
+        )
+
+
+async def median_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def measure(url: str, path: str, repeat: int) -> tuple[float, ...]:
+    engine = create_async_db_engine(url)
+    SessionLocal = create_session_factory(engine)
+
+    async def scan():
+        async with engine.connect() as connection:
+            await connection.execute(
+                text("SELECT count(*), max(updated_at) FROM snippets WHERE is_active")
+            )
+
+    async def pages():
+        async with SessionLocal() as db:
+            cursor = None
+            for _ in range(10):
+                _, cursor = await crud.get_snippets(db, cursor=cursor, summary=True)
+
+    results = (
+        os.path.getsize(path) / 1e6,
+        await median_ms(scan, repeat),
+        await median_ms(pages, repeat),
+    )
+    await engine.dispose()
+    return results
+
+
+def main(count: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        url = f"sqlite:///{path}"
+        engine = create_db_engine(url)
+        populate(engine, count)
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    "CREATE INDEX ix_snippets_updated_at_id ON snippets (updated_at, id)"
+                )
+            )
+        engine.dispose()
+
+        results = {"inline": asyncio.run(measure(url, path, repeat))}
+
+        engine = create_db_engine(url)
+        models.Base.metadata.create_all(engine)
+        start = time.perf_counter()
+        migrations.migrate(engine)
+        elapsed = time.perf_counter() - start
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            connection.exec_driver_sql("VACUUM")
+        engine.dispose()
+        results["blobs"] = asyncio.run(measure(url, path, repeat))
+
+        print(f"{'layout':<8} {'size MB':>8} {'scan ms':>8} {'10 pages ms':>12}")
+        for name, (size, scan, pages) in results.items():
+            print(f"{name:<8} {size:>8.1f} {scan:>8.2f} {pages:>12.2f}")
+        print(f"\nmigrated {count} snippets in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.snippets, args.repeat)
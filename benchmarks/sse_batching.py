@@ -0,0 +1,83 @@
+"""
+Benchmark: writes per response and CPU per stream for SSE token batching.
+
+Concurrent fake generations emit small tokens at a fixed interval, the way the OpenAI
+streaming API does. Each generation is served through `sse_response` and its ASGI
+`send` calls are counted, once per batch budget:
+
+- unbatched: every token is written as its own event
+- title / code: the per-endpoint budgets from `src.sse.BATCH_BUDGETS`
+
+and the body writes per response, the process CPU time per stream and the time to the
+first event are reported.
+
+Usage:
+    python -m benchmarks.sse_batching [--streams 50] [--tokens 400] [--interval-ms 2]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from src import sse
+
+TOKENS = ["def", " binary", "_search", "(arr", ",", " x", "):", "\n   ", " lo", " ="]
+
+
+async def fake_tokens(count: int, interval: float):
+    for i in range(count):
+        await asyncio.sleep(interval)
+        yield TOKENS[i % len(TOKENS)]
+
+
+async def serve(endpoint: str, tokens: int, interval: float) -> tuple[int, float]:
+    """
+    Serves one generation and returns the number of body writes and the time to first event.
+    """
+    response = sse.sse_response(sse.as_events(fake_tokens(tokens, interval)), endpoint)
+    writes, first = 0, None
+    start = time.perf_counter()
+
+    async def receive():
+        await asyncio.Event().wait()  # The client never disconnects
+
+    async def send(message):
+        nonlocal writes, first
+        if message["type"] == "http.response.body" and message.get("body"):
+            writes += 1
+            if first is None:
+                first = time.perf_counter() - start
+
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}}
+    await response(scope, receive, send)
+    return writes, first
+
+
+async def run_budget(
+    name: str, endpoint: str, streams: int, tokens: int, interval: float
+) -> None:
+    cpu = time.process_time()
+    results = await asyncio.gather(
+        *(serve(endpoint, tokens, interval) for _ in range(streams))
+    )
+    cpu_per_stream = (time.process_time() - cpu) / streams * 1000
+    writes = statistics.mean(w for w, _ in results)
+    ttfb = statistics.mean(f for _, f in results) * 1000
+    print(f"{name:<10} {writes:>10.1f} {cpu_per_stream:>12.2f} {ttfb:>10.1f}")
+
+
+async def main(streams: int, tokens: int, interval: float) -> None:
+    sse.BATCH_BUDGETS["unbatched"] = (0, 0.0)
+    print(f"{'budget':<10} {'writes/resp':>10} {'cpu ms/strm':>12} {'ttfb ms':>10}")
+    for name in ("unbatched", "title", "code"):
+        await run_budget(name, name, streams, tokens, interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--interval-ms", type=float, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.streams, args.tokens, args.interval_ms / 1000))
@@ -1,22 +1,42 @@
 """
 This module sets up the FastAPI application, including routers, static files, and templates.
-It also creates the database tables and defines the root endpoint.
+It also defines the root endpoint.
+The database tables are created and migrated, and shared resources such as the OpenAI
+client and the database connection pool are opened and closed, in the application lifespan.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from src.database import engine
+from src.database import async_engine
 from src.routers import snippets, generate, run
 from src.logger import logger
-from src import models
+from src.prompt_registry import prompt_registry
+from src import llm, migrations
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates and migrates the database schema, loads the system prompts and opens shared
+    clients at startup, and closes them and the database connections at shutdown.
+    A missing prompt file fails the startup instead of a later request.
+    """
+    async with async_engine.connect() as connection:
+        await connection.run_sync(migrations.create_schema)
+    prompt_registry.load()
+    llm.open_client()
+    yield
+    await llm.close_client()
+    await async_engine.dispose()
 
-models.Base.metadata.create_all(bind=engine)  # Create database tables
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.mount(
     "/static", StaticFiles(directory="src/static"), name="static"
 )  # Mount static files
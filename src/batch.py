@@ -0,0 +1,410 @@
+"""
+This module runs the tests of every snippet of a language as one regression job, e.g. after
+upgrading a runtime or changing the test harness.
+
+Snippets are read from the database `BATCH_CHUNK_SIZE` at a time, by keyset on their ID, so
+neither the table nor a long transaction is held while the tests run. Up to
+`BATCH_CONCURRENCY` runs go on at the same time, each on a warm sandbox worker process (see
+`src.warm_pool`) or a cold interpreter, and a run only starts once the memory limits of the
+processes it may start fit in `BATCH_MEMORY_BUDGET_MB`. Batch runs have warm pools and test
+case threads of their own (`batch_capacity`), so a job never makes interactive runs wait
+for a sandbox worker. Results are written
+`BATCH_COMMIT_SIZE` at a time, in one transaction per write.
+
+Jobs run in the background of the application (`POST /api/run/batch`), which reports their
+progress (`GET /api/run/batch/{job_id}`), or from the command line.
+
+Usage:
+    python -m src.batch [--language python] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src import crud
+from src.cache import TTLCache
+from src.database import create_session_factory
+from src.languages import Language
+from src.logger import logger
+from src.runner import (
+    SandboxCapacity,
+    resolve_language,
+    run_cache_key,
+    run_code,
+    run_result_cache,
+)
+
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+BATCH_COMMIT_SIZE = int(os.getenv("BATCH_COMMIT_SIZE", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(os.cpu_count() or 1)))
+BATCH_TIMEOUT_MS = int(os.getenv("BATCH_TIMEOUT_MS", "5000"))
+BATCH_MEMORY_LIMIT_MB = int(os.getenv("BATCH_MEMORY_LIMIT_MB", "256"))
+BATCH_JOB_TTL_S = float(os.getenv("BATCH_JOB_TTL_S", "3600"))
+
+
+def available_memory_mb() -> int | None:
+    """
+    Returns the memory available to new processes, from `/proc/meminfo`.
+
+    Returns:
+        int | None: The available memory in megabytes, or None if unknown.
+    """
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+# Megabytes of sandbox memory limits a job may have running at once, by default half of
+# the memory available at start-up; 0 means no budget
+BATCH_MEMORY_BUDGET_MB = int(
+    os.getenv("BATCH_MEMORY_BUDGET_MB", str((available_memory_mb() or 0) // 2))
+)
+
+# Runs the sandbox runs of all jobs, apart from the execution pool of interactive runs
+batch_executor = ThreadPoolExecutor(
+    max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix="batch"
+)
+
+# The warm pool workers and test case threads of all jobs, apart from those of interactive
+# runs
+batch_capacity = SandboxCapacity(
+    "batch",
+    BATCH_CONCURRENCY,
+    ThreadPoolExecutor(
+        max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix="batch-case"
+    ),
+)
+
+
+@dataclass
+class BatchJob:
+    """
+    The progress of a batch run of the tests of every snippet of a language.
+
+    Attributes:
+        id (str): The job ID.
+        language (str): The language of the snippets.
+        status (str): "running", "completed" or "failed".
+        total (int): The number of snippets with tests when the job started.
+        completed (int): The number of snippets run so far.
+        stored (int): The number of results written to the database so far.
+        passed (int): The number of runs that succeeded.
+        failed (int): The number of runs whose tests failed.
+        errors (int): The number of runs the sandbox could not complete.
+        message (str): The error that stopped a failed job.
+        started_at (datetime): When the job started.
+        finished_at (datetime): When the job ended, or None while it runs.
+    """
+
+    language: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "running"
+    total: int = 0
+    completed: int = 0
+    stored: int = 0
+    passed: int = 0
+    failed: int = 0
+    errors: int = 0
+    message: str = ""
+    started_at: datetime = field(default_factory=datetime.now)
+    finished_at: datetime | None = None
+
+    def count(self, result: dict) -> None:
+        self.completed += 1
+        if result["result"] == "success":
+            self.passed += 1
+        elif result["result"] == "failure":
+            self.failed += 1
+        else:
+            self.errors += 1
+
+
+class MemoryBudget:
+    """
+    Admits runs while the memory limits of the runs in progress fit in a budget.
+
+    A run larger than the whole budget is admitted once nothing else runs, so it is
+    throttled instead of never starting.
+    """
+
+    def __init__(self, budget_mb: int):
+        self.budget_mb = budget_mb
+        self.reserved_mb = 0
+        self._changed = asyncio.Condition()
+
+    def _fits(self, memory_mb: int) -> bool:
+        return (
+            not self.budget_mb
+            or self.reserved_mb == 0
+            or self.reserved_mb + memory_mb <= self.budget_mb
+        )
+
+    async def reserve(self, memory_mb: int) -> None:
+        """
+        Waits until a run using `memory_mb` fits in the budget, and reserves it.
+        """
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._fits(memory_mb))
+            self.reserved_mb += memory_mb
+
+    async def release(self, memory_mb: int) -> None:
+        """
+        Returns the memory reserved for a run that ended.
+        """
+        async with self._changed:
+            self.reserved_mb -= memory_mb
+            self._changed.notify_all()
+
+
+def run_memory_mb(language: Language, test_code: str, memory_limit_mb: int) -> int:
+    """
+    Returns the memory limits of the sandbox processes a run may use at once: one per test
+    case running in parallel.
+
+    Args:
+        language (Language): The language of the run.
+        test_code (str): The test code.
+        memory_limit_mb (int): The memory limit of each process.
+
+    Returns:
+        int: The memory in megabytes.
+    """
+    cases = len(language.split_tests(test_code)) if language.split_tests else 1
+    return memory_limit_mb * max(1, min(cases, batch_capacity.pool_size))
+
+
+def run_snippet(language: Language, code: str, test_code: str) -> dict:
+    """
+    Runs the tests of a snippet and caches the result like an interactive run.
+    Sandbox failures are reported as an "error" result instead of failing the job.
+
+    Args:
+        language (Language): The language of the snippet.
+        code (str): The code.
+        test_code (str): The test code.
+
+    Returns:
+        dict: The result of `src.runner.run_code`.
+    """
+    try:
+        result = run_code(
+            language.name,
+            code,
+            test_code,
+            BATCH_TIMEOUT_MS,
+            BATCH_MEMORY_LIMIT_MB,
+            capacity=batch_capacity,
+        )
+    except Exception as e:
+        logger.exception(f"Error running {language.display_name} code: {e}")
+        return {"result": "error", "message": f"Error running code: {e}"}
+    if result["result"] != "error":  # Sandbox errors are not cached
+        run_result_cache.set(
+            run_cache_key(
+                code,
+                test_code,
+                BATCH_TIMEOUT_MS,
+                BATCH_MEMORY_LIMIT_MB,
+                language=language.name,
+            ),
+            result,
+        )
+    return result
+
+
+async def run_batch(
+    job: BatchJob, engine: AsyncEngine, concurrency: int = BATCH_CONCURRENCY
+) -> None:
+    """
+    Runs the tests of every active snippet of the job's language that has tests, and
+    records each result on its snippet. The progress is kept on the job.
+
+    Args:
+        job (BatchJob): The job, whose language is supported by the sandbox.
+        engine (AsyncEngine): The database engine.
+        concurrency (int, optional): The maximum number of runs going on at once, at most
+            `BATCH_CONCURRENCY`, the size of the executor and warm pools of batch runs.
+
+    Raises:
+        ValueError: If the concurrency is out of range.
+    """
+    if not 1 <= concurrency <= max(1, BATCH_CONCURRENCY):
+        raise ValueError(
+            f"The concurrency must be between 1 and {max(1, BATCH_CONCURRENCY)}"
+        )
+    language = resolve_language(job.language)
+    session_factory = create_session_factory(engine)
+    budget = MemoryBudget(BATCH_MEMORY_BUDGET_MB)
+    queue = asyncio.Queue(maxsize=BATCH_CHUNK_SIZE)
+    pending = {}
+    write_lock = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+
+    async def flush() -> None:
+        async with write_lock:
+            results = dict(pending)
+            pending.clear()
+            async with session_factory() as db:
+                await crud.update_test_results(db, results)
+            job.stored += len(results)
+
+    async def read() -> None:
+        async with session_factory() as db:
+            job.total, last_id = await crud.count_test_runs(db, language.name)
+            after_id = 0
+            while True:
+                rows = await crud.get_test_runs(
+                    db, language.name, after_id, last_id, BATCH_CHUNK_SIZE
+                )
+                await db.commit()  # Release the connection while the chunk runs
+                if not rows:
+                    break
+                for row in rows:
+                    await queue.put(row)
+                after_id = rows[-1]["id"]
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (row := await queue.get()) is not None:
+            memory_mb = run_memory_mb(language, row["test_code"], BATCH_MEMORY_LIMIT_MB)
+            await budget.reserve(memory_mb)
+            try:
+                result = await loop.run_in_executor(
+                    batch_executor, run_snippet, language, row["code"], row["test_code"]
+                )
+            finally:
+                await budget.release(memory_mb)
+            job.count(result)
+            pending[row["id"]] = result
+            if len(pending) >= BATCH_COMMIT_SIZE:
+                await flush()
+
+    logger.info(f"Starting batch run {job.id} of {language.display_name} snippets")
+    tasks = [asyncio.ensure_future(read())]
+    tasks += [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+        await flush()
+        job.total = job.completed  # Snippets deleted meanwhile were skipped
+        job.status = "completed"
+    except Exception as e:
+        logger.exception(f"Batch run {job.id} failed: {e}")
+        for task in tasks:
+            task.cancel()
+        try:
+            await flush()  # Keeps the results of the runs that completed
+        except Exception as flush_error:
+            logger.exception(
+                f"Batch run {job.id} failed to store its results: {flush_error}"
+            )
+        job.status = "failed"
+        job.message = str(e)
+    finally:
+        for task in tasks:
+            task.cancel()
+        job.finished_at = datetime.now()
+    logger.info(
+        f"Batch run {job.id} {job.status}: {job.passed} passed, {job.failed} failed, "
+        f"{job.errors} errors"
+    )
+
+
+class BatchJobs:
+    """
+    The batch jobs of the application, kept for `BATCH_JOB_TTL_S` after they start so
+    their progress can be polled.
+    """
+
+    def __init__(self, ttl: float):
+        self._jobs = TTLCache(1024, ttl=ttl)
+        # Keeps the tasks of running jobs from being garbage collected
+        self._running = {}
+
+    def get(self, job_id: str) -> BatchJob | None:
+        return self._jobs.get(job_id)
+
+    def running(self, language: str) -> BatchJob | None:
+        """
+        Returns the running job of a language, if any.
+        """
+        for job in self._running.values():
+            if job.language == language:
+                return job
+        return None
+
+    def start(self, language: str, engine: AsyncEngine) -> BatchJob:
+        """
+        Starts a job in the background of the running event loop.
+
+        Args:
+            language (str): The language of the snippets, supported by the sandbox.
+            engine (AsyncEngine): The database engine.
+
+        Returns:
+            BatchJob: The job.
+        """
+        job = BatchJob(language)
+        self._jobs.set(job.id, job)
+        task = asyncio.ensure_future(run_batch(job, engine))
+        self._running[task] = job
+        task.add_done_callback(self._running.pop)
+        return job
+
+
+batch_jobs = BatchJobs(BATCH_JOB_TTL_S)
+
+
+async def main(engine: AsyncEngine, language: str, concurrency: int) -> BatchJob:
+    """
+    Runs a job from the command line, printing its progress every second.
+    """
+    job = BatchJob(language)
+    run = asyncio.ensure_future(run_batch(job, engine, concurrency))
+    start = time.monotonic()
+    while not run.done():
+        await asyncio.wait([run], timeout=1)
+        print(
+            f"{job.completed}/{job.total} run, {job.passed} passed, {job.failed} "
+            f"failed, {job.errors} errors ({time.monotonic() - start:.0f}s)"
+        )
+    await engine.dispose()
+    return job
+
+
+if __name__ == "__main__":
+    from src.database import async_engine
+
+    parser = argparse.ArgumentParser(
+        description="Runs the tests of every snippet of a language."
+    )
+    parser.add_argument("--language", default="python", help="language to run")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help="maximum number of runs at once",
+    )
+    args = parser.parse_args()
+    if not 1 <= args.concurrency <= max(1, BATCH_CONCURRENCY):
+        parser.error(
+            f"--concurrency must be between 1 and {max(1, BATCH_CONCURRENCY)}, "
+            "see BATCH_CONCURRENCY"
+        )
+    resolve_language(args.language)  # Fails early on an unsupported language
+    job = asyncio.run(main(async_engine, args.language, args.concurrency))
+    if job.status == "failed":
+        raise SystemExit(job.message)
@@ -0,0 +1,93 @@
+"""
+This module provides the content-addressed storage of the large snippet texts.
+
+The code, tests, feedback and test result message of a snippet are stored in the `blobs`
+table, zlib-compressed and keyed by the SHA-256 of the text, and the snippet row only keeps
+their hashes. Snippet rows stay small, so listing and sorting read a fraction of the pages,
+and a text shared by several snippets, like an unchanged piece of code, is stored once.
+Empty texts have no blob; their hash is NULL.
+
+On SQLite, the `inflate` SQL function decompresses a blob, so the full-text index can read
+the code of a snippet. It is registered on every connection made by `src.database`.
+"""
+
+import hashlib
+import zlib
+
+# Text fields of a snippet stored as blobs, in the order of `schemas.SnippetCreate`
+TEXT_FIELDS = ("code", "feedback", "test_code", "test_feedback", "test_result_message")
+
+COMPRESSION_LEVEL = 6
+
+
+def blob_hash(text: str) -> str:
+    """
+    Returns the key of a text in the blob storage.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        str: The hex SHA-256 of the UTF-8 encoded text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress(text: str) -> bytes:
+    """
+    Compresses a text for storage.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        bytes: The compressed text.
+    """
+    return zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def decompress(data: bytes | None) -> str:
+    """
+    Decompresses a stored text.
+
+    Args:
+        data (bytes, optional): The compressed text, or None for an empty text.
+
+    Returns:
+        str: The text.
+    """
+    return zlib.decompress(data).decode("utf-8") if data is not None else ""
+
+
+def inflate(data: bytes | None) -> str | None:
+    """
+    The `inflate` SQL function: decompresses a blob, keeping NULL as NULL.
+    """
+    return decompress(data) if data is not None else None
+
+
+def split_texts(rows: list[dict]) -> tuple[list[dict], list[dict]]:
+    """
+    Replaces the text fields of snippet rows with the hashes of their blobs.
+
+    Args:
+        rows (list[dict]): The snippet column values, with any of the `TEXT_FIELDS`.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The rows with a `<field>_hash` value for each text
+            field they had, and the distinct blobs to store, as `hash` and `data` values.
+    """
+    blobs = {}
+    stored = []
+    for row in rows:
+        row = dict(row)
+        for field in TEXT_FIELDS:
+            if field not in row:
+                continue
+            text = row.pop(field)
+            digest = blob_hash(text) if text else None
+            if digest is not None and digest not in blobs:
+                blobs[digest] = {"hash": digest, "data": compress(text)}
+            row[f"{field}_hash"] = digest
+        stored.append(row)
+    return stored, list(blobs.values())
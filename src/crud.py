@@ -1,111 +1,955 @@
 """
 This module provides CRUD (Create, Read, Update, Delete) operations for the Snippet model.
-It interacts with the database using SQLAlchemy sessions.
+It interacts with the database using SQLAlchemy asyncio sessions.
+
+The large text fields of snippets are stored as blobs (see `src.blobs`). Functions returning
+snippets load them unless asked not to, and writes store new texts before the snippet rows
+that refer to them.
+"""
+
+import html
+import os
+import re
+
+from datetime import datetime
+from typing import AsyncIterator, NamedTuple
+
+from sqlalchemy import (
+    DateTime,
+    bindparam,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src import blobs, models, revisions, schemas
+from src.cache import TTLCache
+from src.pagination import decode_cursor, encode_cursor
+from src.response_cache import response_cache
+from src.runner import RUN_METRICS
+
+# Search ranks at most this many of the most recently created matches, so a broad query
+# costs the same as a selective one instead of scoring every matching snippet
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "1000"))
+# Approximate length in characters of search result excerpts
+SEARCH_EXCERPT_CHARS = 160
+
+SEARCH_SQL = """
+WITH candidates AS (
+    SELECT snippets_fts.rowid AS rowid, snippets_fts.rank AS rank
+    FROM snippets_fts JOIN snippets s ON s.id = snippets_fts.rowid
+    WHERE snippets_fts MATCH :query AND (:language IS NULL OR s.language = :language)
+    ORDER BY snippets_fts.rowid DESC
+    LIMIT :window
+), page AS (
+    SELECT rowid, rank FROM candidates ORDER BY rank, rowid LIMIT :limit OFFSET :offset
+)
+SELECT s.id, s.title, s.language, s.updated_at, s.description, b.data AS code_data
+FROM page JOIN snippets s ON s.id = page.rowid LEFT JOIN blobs b ON b.hash = s.code_hash
+ORDER BY page.rank, page.rowid
 """
 
-from sqlalchemy.orm import Session
+# Rows per executemany batch when importing, and rows fetched per round trip when exporting
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# Columns returned by the lightweight list projection
+SUMMARY_COLUMNS = (
+    models.Snippet.id,
+    models.Snippet.title,
+    models.Snippet.language,
+    models.Snippet.updated_at,
+)
+
+# Attempts at an update when the snippet keeps changing concurrently
+UPDATE_ATTEMPTS = 3
+
+# Deferred attributes holding the compressed texts of a snippet
+TEXT_DATA_ATTRIBUTES = [f"{field}_data" for field in blobs.TEXT_FIELDS]
+
+# Snippets whose last committed revision is kept to record the next one without a read
+REVISION_CACHE_SIZE = int(os.getenv("REVISION_CACHE_SIZE", "1024"))
+
+
+class RevisionState(NamedTuple):
+    """
+    The last committed revision of a snippet, which the next revision is diffed against.
+
+    Attributes:
+        number (int): The revision number.
+        saved_at (datetime): The time the snippet was saved at this revision.
+        fields (dict): The `revisions.REVISION_FIELDS` of the revision.
+    """
+
+    number: int
+    saved_at: datetime
+    fields: dict
+
+
+# Snippet IDs mapped to their `RevisionState`. Only committed revisions are cached, and an
+# update only applies at the revision it was diffed against, so a stale entry costs a retry.
+revision_cache = TTLCache(REVISION_CACHE_SIZE)
+
+
+async def store_texts(db: AsyncSession, rows: list[dict]) -> list[dict]:
+    """
+    Stores the text fields of snippet rows as blobs. Blobs that already exist are kept.
+
+    Args:
+        db (AsyncSession): The database session.
+        rows (list[dict]): The snippet column values, with text fields.
+
+    Returns:
+        list[dict]: The column values, with blob hashes in place of the text fields.
+    """
+    rows, blob_rows = blobs.split_texts(rows)
+    if blob_rows:
+        await db.execute(models.insert_blobs(db.bind.dialect.name), blob_rows)
+    return rows
+
+
+def with_texts(row) -> dict:
+    """
+    Returns the values of a row selected with the `TEXT_DATA_ATTRIBUTES`, with the
+    decompressed text fields in their place.
+
+    Args:
+        row (Row): The row.
 
-from src import models, schemas
+    Returns:
+        dict: The column names mapped to their values.
+    """
+    values = dict(row._mapping)
+    for field, attribute in zip(blobs.TEXT_FIELDS, TEXT_DATA_ATTRIBUTES):
+        values[field] = blobs.decompress(values.pop(attribute))
+    return values
 
 
-def create_snippet(db: Session, snippet_data: schemas.SnippetCreate) -> models.Snippet:
+async def create_snippet(
+    db: AsyncSession, snippet_data: schemas.SnippetCreate
+) -> models.Snippet:
     """
     Creates a new snippet in the database.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         snippet_data (schemas.SnippetCreate): The snippet data to create.
 
     Returns:
         models.Snippet: The created snippet.
     """
-    db_snippet = models.Snippet(**snippet_data.model_dump())
+    (values,) = await store_texts(db, [snippet_data.model_dump()])
+    db_snippet = models.Snippet(**values)
     db.add(db_snippet)
-    db.commit()
-    db.refresh(db_snippet)
+    await db.commit()
+    await db.refresh(db_snippet, TEXT_DATA_ATTRIBUTES)
+    response_cache.invalidate([db_snippet.id])
+    remember_revisions([db_snippet])
     return db_snippet
 
 
-def get_snippet(db: Session, snippet_id: int) -> models.Snippet:
+async def create_snippets(db: AsyncSession, rows: list[dict]) -> None:
+    """
+    Inserts many snippets with a single `executemany` and commits them.
+
+    Args:
+        db (AsyncSession): The database session.
+        rows (list[dict]): The column values of each snippet.
+    """
+    if not rows:
+        return
+    await db.execute(insert(models.Snippet), await store_texts(db, rows))
+    await db.commit()
+    response_cache.invalidate(())
+
+
+async def export_snippets(db: AsyncSession) -> AsyncIterator[list]:
+    """
+    Streams all active snippets in ID order, `EXPORT_CHUNK_SIZE` rows at a time, without
+    loading the whole table or keeping ORM objects in the session.
+
+    Args:
+        db (AsyncSession): The database session.
+
+    Yields:
+        list[dict]: The next chunk of snippets, with every column and text field.
+    """
+    text_data = [getattr(models.Snippet, name) for name in TEXT_DATA_ATTRIBUTES]
+    result = await db.stream(
+        select(*models.Snippet.__table__.columns, *text_data)
+        .where(models.Snippet.is_active == True)
+        .order_by(models.Snippet.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    async for rows in result.partitions():
+        yield [with_texts(row) for row in rows]
+
+
+async def count_test_runs(db: AsyncSession, language: str) -> tuple[int, int]:
+    """
+    Counts the active snippets of a language that have test code.
+
+    Args:
+        db (AsyncSession): The database session.
+        language (str): The language of the snippets.
+
+    Returns:
+        tuple[int, int]: The number of snippets and their largest ID (0 if there are none).
+    """
+    count, last_id = (
+        await db.execute(
+            select(func.count(), func.max(models.Snippet.id))
+            .where(models.Snippet.is_active == True)
+            .where(models.Snippet.language == language)
+            .where(models.Snippet.test_code_hash.is_not(None))
+        )
+    ).one()
+    return count, last_id or 0
+
+
+async def get_test_runs(
+    db: AsyncSession, language: str, after_id: int, last_id: int, limit: int
+) -> list[dict]:
+    """
+    Retrieves the code and test code of the active snippets of a language that have test
+    code, in ID order, one page at a time by keyset on the ID.
+
+    Args:
+        db (AsyncSession): The database session.
+        language (str): The language of the snippets.
+        after_id (int): Only return snippets with a larger ID.
+        last_id (int): Only return snippets up to this ID.
+        limit (int): The maximum number of snippets to return.
+
+    Returns:
+        list[dict]: The `id`, `code` and `test_code` of each snippet.
+    """
+    result = await db.execute(
+        select(
+            models.Snippet.id, models.Snippet.code_data, models.Snippet.test_code_data
+        )
+        .where(models.Snippet.is_active == True)
+        .where(models.Snippet.language == language)
+        .where(models.Snippet.test_code_hash.is_not(None))
+        .where(models.Snippet.id > after_id)
+        .where(models.Snippet.id <= last_id)
+        .order_by(models.Snippet.id)
+        .limit(limit)
+    )
+    return [
+        {
+            "id": snippet_id,
+            "code": blobs.decompress(code),
+            "test_code": blobs.decompress(test_code),
+        }
+        for snippet_id, code, test_code in result.all()
+    ]
+
+
+async def get_snippet(
+    db: AsyncSession, snippet_id: int, texts: bool = True
+) -> models.Snippet:
     """
     Retrieves a snippet by its ID.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         snippet_id (int): The ID of the snippet to retrieve.
+        texts (bool, optional): Whether to load the text fields. Defaults to True.
 
     Returns:
         models.Snippet: The retrieved snippet, or None if not found.
     """
-    return (
-        db.query(models.Snippet)
-        .filter(models.Snippet.id == snippet_id)
-        .filter(models.Snippet.is_active == True)
-        .first()
+    query = (
+        select(models.Snippet)
+        .where(models.Snippet.id == snippet_id)
+        .where(models.Snippet.is_active == True)
     )
+    if texts:
+        query = query.options(undefer_group("texts"))
+    return await db.scalar(query)
 
 
-def get_snippets(db: Session, skip: int = 0, limit: int = 100) -> list[models.Snippet]:
+async def get_snippets(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: str | None = None,
+    language: str | None = None,
+    test_result: str | None = None,
+    summary: bool = False,
+) -> tuple[list, str | None]:
     """
-    Retrieves a list of active snippets, with optional pagination.
+    Retrieves a page of active snippets, most recently updated first.
+
+    Pages are fetched by keyset on `(updated_at, id)`, so every page costs the same
+    regardless of how deep into the list it is.
 
     Args:
-        db (Session): The database session.
-        skip (int, optional): The number of snippets to skip. Defaults to 0.
+        db (AsyncSession): The database session.
         limit (int, optional): The maximum number of snippets to retrieve. Defaults to 100.
+        cursor (str, optional): The cursor returned with the previous page.
+        language (str, optional): Only return snippets in this language.
+        test_result (str, optional): Only return snippets with this test result.
+        summary (bool, optional): Only load the id, title, language and update time.
 
     Returns:
-        list[models.Snippet]: The list of retrieved snippets.
+        tuple[list, str | None]: The snippets (or summary rows), and the cursor of the
+            next page, or None if this is the last page.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
     """
-    return (
-        db.query(models.Snippet)
-        .filter(models.Snippet.is_active == True)
-        .order_by(models.Snippet.updated_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    if summary:
+        query = select(*SUMMARY_COLUMNS)
+    else:
+        query = select(models.Snippet).options(undefer_group("texts"))
+    query = query.where(models.Snippet.is_active == True)
+    if language is not None:
+        query = query.where(models.Snippet.language == language)
+    if test_result is not None:
+        query = query.where(models.Snippet.test_result == test_result)
+    if cursor is not None:
+        query = query.where(
+            tuple_(models.Snippet.updated_at, models.Snippet.id)
+            < tuple_(*decode_cursor(cursor))
+        )
+
+    query = query.order_by(
+        models.Snippet.updated_at.desc(), models.Snippet.id.desc()
+    ).limit(limit + 1)
+    result = await db.execute(query)
+    rows = result.all() if summary else result.scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.updated_at, last.id)
+
+
+def search_words(query: str) -> list[str]:
+    """
+    Splits search text into words the way the full-text index tokenizes snippets.
+
+    Args:
+        query (str): The search text.
+
+    Returns:
+        list[str]: The words, without punctuation or underscores.
+    """
+    return re.findall(r"[^\W_]+", query)
+
+
+def fts_query(query: str) -> str:
+    """
+    Converts free text into an FTS5 query matching every word, each as a prefix.
+    Words are quoted, so FTS5 operators in the input are not interpreted.
+
+    Args:
+        query (str): The search text.
+
+    Returns:
+        str: The FTS5 query, or an empty string if the text contains no words.
+    """
+    return " ".join(f'"{word}"*' for word in search_words(query))
+
+
+def highlight(fields: list[str], words: list[str]) -> str:
+    """
+    Builds an HTML excerpt of the first field matching any of the words, with the
+    matched words in `<mark>` tags.
+
+    Args:
+        fields (list[str]): The texts to search, in order of preference.
+        words (list[str]): The words to highlight, matched as prefixes.
+
+    Returns:
+        str: The HTML-escaped excerpt.
+    """
+    pattern = re.compile(
+        r"(?<![^\W_])(?:" + "|".join(map(re.escape, words)) + r")[^\W_]*",
+        re.IGNORECASE,
+    )
+    for field in fields:
+        match = pattern.search(field or "")
+        if match:
+            break
+    else:
+        field = next((field for field in fields if field), "")
+        match = None
+
+    start = max(0, match.start() - SEARCH_EXCERPT_CHARS // 3) if match else 0
+    end = min(len(field), start + SEARCH_EXCERPT_CHARS)
+    excerpt, position = [], start
+    for found in pattern.finditer(field, start, end):
+        excerpt.append(html.escape(field[position : found.start()]))
+        excerpt.append(f"<mark>{html.escape(found.group())}</mark>")
+        position = found.end()
+    excerpt.append(html.escape(field[position:end]))
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(field) else ""
+    return prefix + "".join(excerpt).strip() + suffix
+
+
+async def search_snippets(
+    db: AsyncSession,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    language: str | None = None,
+) -> tuple[list[dict], int | None]:
+    """
+    Searches the titles, descriptions and code of active snippets, best matches first.
+
+    Matches are ranked by BM25, weighting title over description over code. When more
+    than `SEARCH_RANK_WINDOW` snippets match, only the most recently created ones are
+    ranked and returned.
+
+    Args:
+        db (AsyncSession): The database session.
+        query (str): The search text.
+        limit (int, optional): The maximum number of results. Defaults to 20.
+        offset (int, optional): The number of results to skip. Defaults to 0.
+        language (str, optional): Only return snippets in this language.
+
+    Returns:
+        tuple[list[dict], int | None]: The results, each with the summary fields and an
+            HTML `highlight` excerpt, and the offset of the next page, or None if this is
+            the last page.
+    """
+    words = search_words(query)
+    if not words:
+        return [], None
+
+    params = {
+        "query": fts_query(query),
+        "language": language,
+        "window": SEARCH_RANK_WINDOW,
+        "limit": limit + 1,
+        "offset": offset,
+    }
+    statement = text(SEARCH_SQL).columns(updated_at=DateTime)
+    rows = (await db.execute(statement, params)).all()
+
+    results = [
+        {
+            "id": row.id,
+            "title": row.title,
+            "language": row.language,
+            "updated_at": row.updated_at,
+            "highlight": highlight(
+                [row.title, row.description, blobs.decompress(row.code_data)], words
+            ),
+        }
+        for row in rows[:limit]
+    ]
+    return results, offset + limit if len(rows) > limit else None
+
+
+def update_values(snippet_data: schemas.SnippetUpdate) -> dict:
+    """
+    Returns the columns to update: the fields set in the request, including empty strings,
+    but not fields explicitly set to null.
+
+    Args:
+        snippet_data (schemas.SnippetUpdate): The updated snippet data.
+
+    Returns:
+        dict: The column names mapped to their new values.
+    """
+    return snippet_data.model_dump(exclude_unset=True, exclude_none=True)
+
+
+def revision_fields(db_snippet: models.Snippet) -> dict:
+    """
+    Returns the fields of a snippet recorded in its revisions.
+
+    Args:
+        db_snippet (models.Snippet): The snippet, with its texts loaded.
+
+    Returns:
+        dict: The field names mapped to their values.
+    """
+    return {
+        field: getattr(db_snippet, field) or "" for field in revisions.REVISION_FIELDS
+    }
+
+
+def revision_state(db_snippet: models.Snippet) -> RevisionState:
+    """
+    Returns the current revision of a snippet.
+
+    Args:
+        db_snippet (models.Snippet): The snippet, with its texts loaded.
+
+    Returns:
+        RevisionState: The revision.
+    """
+    return RevisionState(
+        db_snippet.revision, db_snippet.updated_at, revision_fields(db_snippet)
     )
 
 
-def update_snippet(
-    db: Session, snippet_id: int, snippet_data: schemas.SnippetUpdate
+def remember_revisions(db_snippets: list[models.Snippet]) -> None:
+    """
+    Caches the current revision of committed snippets for their next update.
+
+    Args:
+        db_snippets (list[models.Snippet]): The snippets, with their texts loaded.
+    """
+    for db_snippet in db_snippets:
+        revision_cache.set(db_snippet.id, revision_state(db_snippet))
+
+
+def revision_row(
+    snippet_id: int,
+    number: int,
+    values: dict,
+    previous: dict | None,
+    created_at: datetime,
+) -> dict:
+    """
+    Returns the column values of a revision.
+
+    Args:
+        snippet_id (int): The ID of the snippet.
+        number (int): The revision number.
+        values (dict): The revision fields.
+        previous (dict, optional): The fields of the previous revision, if any.
+        created_at (datetime): The time the snippet was saved with these fields.
+
+    Returns:
+        dict: The column values.
+    """
+    keyframe, data = revisions.encode(number, values, previous)
+    changes = revisions.changed_fields(previous, values) if previous else []
+    return {
+        "snippet_id": snippet_id,
+        "number": number,
+        "keyframe": keyframe,
+        "changes": ",".join(changes),
+        "data": data,
+        "created_at": created_at,
+    }
+
+
+def has_changes(state: RevisionState, values: dict) -> bool:
+    return bool(revisions.changed_fields(state.fields, {**state.fields, **values}))
+
+
+async def apply_update(
+    db: AsyncSession, snippet_id: int, state: RevisionState, values: dict
+) -> models.Snippet | None:
+    """
+    Writes the changed fields of a snippet and records its new revision, without
+    committing. Revision 1 is recorded too on the first change of a snippet.
+
+    The update only applies if the snippet is still at the revision it is diffed against.
+    It returns the snippet with its texts, so the snippet is neither read before nor after.
+
+    Args:
+        db (AsyncSession): The database session.
+        snippet_id (int): The ID of the snippet.
+        state (RevisionState): The revision of the snippet the update is based on.
+        values (dict): The fields to update, changing at least one of them.
+
+    Returns:
+        models.Snippet: The updated snippet, or None if it is missing, deleted or no longer
+            at the revision of `state`.
+    """
+    current = {**state.fields, **values}
+    changes = revisions.changed_fields(state.fields, current)
+    number = state.number + 1
+    (stored,) = await store_texts(db, [{field: current[field] for field in changes}])
+    text_data = [getattr(models.Snippet, name) for name in TEXT_DATA_ATTRIBUTES]
+    row = (
+        await db.execute(
+            update(models.Snippet)
+            .where(models.Snippet.id == snippet_id)
+            .where(models.Snippet.is_active == True)
+            .where(models.Snippet.revision == state.number)
+            .values(**stored, revision=number)
+            .returning(models.Snippet, *text_data)
+            .execution_options(populate_existing=True)
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+
+    updated, *texts = row
+    for name, data in zip(TEXT_DATA_ATTRIBUTES, texts):
+        set_committed_value(updated, name, data)
+    fields = revision_fields(updated)
+    rows = [revision_row(snippet_id, number, fields, state.fields, updated.updated_at)]
+    if number == 2:
+        rows.insert(0, revision_row(snippet_id, 1, state.fields, None, state.saved_at))
+    await db.execute(insert(models.SnippetRevision), rows)
+    return updated
+
+
+async def change_snippet(
+    db: AsyncSession,
+    snippet_id: int,
+    values: dict,
+    db_snippet: models.Snippet | None = None,
+) -> models.Snippet | None:
+    """
+    Applies an update to a snippet with `apply_update`, reloading the snippet and
+    retrying if it changes concurrently, without committing.
+
+    The update is diffed against the cached revision of the snippet if there is one, and
+    otherwise against the snippet loaded from the database.
+
+    Args:
+        db (AsyncSession): The database session.
+        snippet_id (int): The ID of the snippet to update.
+        values (dict): The fields to update.
+        db_snippet (models.Snippet, optional): The snippet, if already loaded with its texts.
+
+    Returns:
+        models.Snippet: The updated snippet, or None if not found.
+
+    Raises:
+        RevisionConflict: If the snippet changed on every attempt.
+    """
+    for _ in range(UPDATE_ATTEMPTS):
+        state = revision_cache.get(snippet_id) if db_snippet is None else None
+        if state is not None and not has_changes(state, values):
+            state = None  # Only the snippet itself can tell that nothing changes
+        if state is None:
+            if db_snippet is None:
+                db_snippet = await get_snippet(db, snippet_id)
+                if db_snippet is None:
+                    return None
+            state = revision_state(db_snippet)
+            if not has_changes(state, values):
+                return db_snippet
+
+        updated = await apply_update(db, snippet_id, state, values)
+        if updated is not None:
+            return updated
+        revision_cache.invalidate(snippet_id)
+        if db_snippet is not None:
+            db.expunge(db_snippet)
+        db_snippet = None
+    raise revisions.RevisionConflict(f"Snippet {snippet_id} changed during the update")
+
+
+async def collect_blobs(db: AsyncSession) -> None:
+    """
+    Deletes the blobs no snippet refers to anymore, without committing.
+    Blob references are only counted on SQLite, where triggers maintain them.
+
+    Args:
+        db (AsyncSession): The database session.
+    """
+    if db.bind.dialect.name == "sqlite":
+        await db.execute(delete(models.Blob).where(models.Blob.refs == 0))
+
+
+async def update_snippet(
+    db: AsyncSession, snippet_id: int, snippet_data: schemas.SnippetUpdate
 ) -> models.Snippet:
     """
-    Updates an existing snippet in the database.
+    Updates an existing snippet in the database and records the change as a revision.
+    Updates that change nothing are not written.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         snippet_id (int): The ID of the snippet to update.
         snippet_data (schemas.SnippetUpdate): The updated snippet data.
 
     Returns:
         models.Snippet: The updated snippet, or None if not found.
+
+    Raises:
+        RevisionConflict: If the snippet kept changing concurrently.
     """
-    db_snippet = get_snippet(db, snippet_id)
-    if not db_snippet:
-        return None
-    for key, value in snippet_data.model_dump().items():
-        if value:
-            setattr(db_snippet, key, value)
-    db.commit()
-    db.refresh(db_snippet)
+    db_snippet = await change_snippet(db, snippet_id, update_values(snippet_data))
+    await collect_blobs(db)
+    await db.commit()
+    response_cache.invalidate([snippet_id])
+    if db_snippet is not None:
+        remember_revisions([db_snippet])
     return db_snippet
 
 
-def delete_snippet(db: Session, snippet_id: int) -> bool:
+async def update_snippets(
+    db: AsyncSession, snippet_ids: list[int], snippet_data: schemas.SnippetUpdate
+) -> list[int]:
+    """
+    Applies the same update to several snippets in a single transaction, recording a
+    revision for each changed snippet.
+
+    Args:
+        db (AsyncSession): The database session.
+        snippet_ids (list[int]): The IDs of the snippets to update.
+        snippet_data (schemas.SnippetUpdate): The updated snippet data.
+
+    Returns:
+        list[int]: The IDs of the updated snippets. Missing and deleted snippets are skipped.
+
+    Raises:
+        RevisionConflict: If a snippet kept changing concurrently.
+    """
+    values = update_values(snippet_data)
+    if not values or not snippet_ids:
+        return []
+
+    db_snippets = await db.scalars(
+        select(models.Snippet)
+        .options(undefer_group("texts"))
+        .where(models.Snippet.id.in_(snippet_ids))
+        .where(models.Snippet.is_active == True)
+        .order_by(models.Snippet.id)
+    )
+    updated = []
+    for db_snippet in db_snippets.all():
+        db_snippet = await change_snippet(db, db_snippet.id, values, db_snippet)
+        if db_snippet is not None:
+            updated.append(db_snippet)
+    await collect_blobs(db)
+    await db.commit()
+    response_cache.invalidate([db_snippet.id for db_snippet in updated])
+    remember_revisions(updated)
+    return [db_snippet.id for db_snippet in updated]
+
+
+def test_result_values(
+    test_result: str, message: str, metrics: dict | None = None
+) -> dict:
+    """
+    Returns the snippet column values recording the result of a test run.
+
+    Args:
+        test_result (str): The result, e.g. "success".
+        message (str): The result message.
+        metrics (dict, optional): The resource usage of the run, by `RUN_METRICS` name.
+            Metrics that are missing are cleared.
+
+    Returns:
+        dict: The column values, with the message as a text field.
+    """
+    metrics = metrics or {}
+    return {
+        "test_result": test_result,
+        "test_result_message": message,
+        **{f"test_{name}": metrics.get(name) for name in RUN_METRICS},
+    }
+
+
+async def update_test_result(
+    db: AsyncSession,
+    snippet_id: int,
+    test_result: str,
+    message: str,
+    metrics: dict | None = None,
+) -> bool:
+    """
+    Records the result of a test run on a snippet.
+
+    Args:
+        db (AsyncSession): The database session.
+        snippet_id (int): The ID of the snippet.
+        test_result (str): The result, e.g. "success".
+        message (str): The result message.
+        metrics (dict, optional): The resource usage of the run, by `RUN_METRICS` name.
+            Metrics that are missing are cleared.
+
+    Returns:
+        bool: True if the snippet was updated, False if it is missing or deleted.
+    """
+    (values,) = await store_texts(
+        db, [test_result_values(test_result, message, metrics)]
+    )
+    updated = await db.scalar(
+        update(models.Snippet)
+        .where(models.Snippet.id == snippet_id)
+        .where(models.Snippet.is_active == True)
+        .values(**values)
+        .returning(models.Snippet.id)
+        .execution_options(synchronize_session=False)
+    )
+    await collect_blobs(db)
+    await db.commit()
+    response_cache.invalidate([snippet_id])
+    return updated is not None
+
+
+async def update_test_results(db: AsyncSession, results: dict[int, dict]) -> None:
+    """
+    Records the results of many test runs with a single `executemany` and commits them.
+    Missing and deleted snippets are skipped.
+
+    Args:
+        db (AsyncSession): The database session.
+        results (dict[int, dict]): The results of `src.runner.run_code` by snippet ID.
+    """
+    if not results:
+        return
+
+    rows = await store_texts(
+        db,
+        [
+            test_result_values(result["result"], result["message"], result)
+            for result in results.values()
+        ],
+    )
+    for snippet_id, row in zip(results, rows):
+        row["snippet_id"] = snippet_id
+    snippets = models.Snippet.__table__
+    await db.execute(
+        update(snippets)
+        .where(snippets.c.id == bindparam("snippet_id"))
+        .where(snippets.c.is_active == True),
+        rows,
+    )
+    await collect_blobs(db)
+    await db.commit()
+    response_cache.invalidate(list(results))
+
+
+async def delete_snippets(db: AsyncSession, snippet_ids: list[int]) -> list[int]:
+    """
+    Marks several snippets as inactive (soft delete) in a single statement.
+
+    Args:
+        db (AsyncSession): The database session.
+        snippet_ids (list[int]): The IDs of the snippets to delete.
+
+    Returns:
+        list[int]: The IDs of the deleted snippets. Missing and deleted snippets are skipped.
+    """
+    if not snippet_ids:
+        return []
+
+    result = await db.scalars(
+        update(models.Snippet)
+        .where(models.Snippet.id.in_(snippet_ids))
+        .where(models.Snippet.is_active == True)
+        .values(is_active=False)
+        .returning(models.Snippet.id)
+        .execution_options(synchronize_session="fetch")
+    )
+    deleted = sorted(result.all())
+    await db.commit()
+    response_cache.invalidate(deleted)
+    for snippet_id in deleted:
+        revision_cache.invalidate(snippet_id)
+    return deleted
+
+
+async def delete_snippet(db: AsyncSession, snippet_id: int) -> bool:
     """
     Marks a snippet as inactive (soft delete).
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         snippet_id (int): The ID of the snippet to delete.
 
     Returns:
         bool: True if the snippet was deleted, False otherwise.
     """
-    db_snippet = get_snippet(db, snippet_id)
-    if db_snippet:
-        db_snippet.is_active = False
-        db.commit()
-        return True
-    return False
+    return await delete_snippets(db, [snippet_id]) == [snippet_id]
+
+
+async def get_revisions(
+    db: AsyncSession, snippet_id: int, limit: int = 100, before: int | None = None
+) -> list[dict] | None:
+    """
+    Lists the revisions of a snippet, latest first.
+
+    Args:
+        db (AsyncSession): The database session.
+        snippet_id (int): The ID of the snippet.
+        limit (int, optional): The maximum number of revisions. Defaults to 100.
+        before (int, optional): Only list revisions before this number.
+
+    Returns:
+        list[dict] | None: The number, keyframe flag, changed fields and creation time of
+            each revision, or None if the snippet is not found.
+    """
+    db_snippet = await get_snippet(db, snippet_id, texts=False)
+    if db_snippet is None:
+        return None
+    if db_snippet.revision == 1:  # Never changed, so revision 1 is not stored yet
+        rows = [(1, True, "", db_snippet.updated_at)]
+        if before is not None and before <= 1:
+            rows = []
+    else:
+        query = (
+            select(
+                models.SnippetRevision.number,
+                models.SnippetRevision.keyframe,
+                models.SnippetRevision.changes,
+                models.SnippetRevision.created_at,
+            )
+            .where(models.SnippetRevision.snippet_id == snippet_id)
+            .order_by(models.SnippetRevision.number.desc())
+        )
+        if before is not None:
+            query = query.where(models.SnippetRevision.number < before)
+        rows = (await db.execute(query.limit(limit))).all()
+
+    return [
+        {
+            "number": number,
+            "keyframe": keyframe,
+            "changes": changes.split(",") if changes else [],
+            "created_at": created_at,
+        }
+        for number, keyframe, changes, created_at in rows
+    ]
+
+
+async def get_revision(db: AsyncSession, snippet_id: int, number: int) -> dict | None:
+    """
+    Rebuilds a revision of a snippet from its latest keyframe and the diffs that follow.
+
+    Args:
+        db (AsyncSession): The database session.
+        snippet_id (int): The ID of the snippet.
+        number (int): The revision number.
+
+    Returns:
+        dict | None: The revision number, creation time and fields, or None if the
+            snippet or revision is not found.
+    """
+    db_snippet = await get_snippet(db, snippet_id, texts=False)
+    if db_snippet is None or not 1 <= number <= db_snippet.revision:
+        return None
+    if number == db_snippet.revision:
+        await db.refresh(db_snippet, TEXT_DATA_ATTRIBUTES)
+        return {
+            "number": number,
+            "created_at": db_snippet.updated_at,
+            **revision_fields(db_snippet),
+        }
+
+    revision = models.SnippetRevision
+    keyframe = (
+        select(func.max(revision.number))
+        .where(revision.snippet_id == snippet_id)
+        .where(revision.number <= number)
+        .where(revision.keyframe == True)
+        .scalar_subquery()
+    )
+    rows = (
+        await db.execute(
+            select(revision.keyframe, revision.data, revision.created_at)
+            .where(revision.snippet_id == snippet_id)
+            .where(revision.number.between(keyframe, number))
+            .order_by(revision.number)
+        )
+    ).all()
+    return {
+        "number": number,
+        "created_at": rows[-1].created_at,
+        **revisions.reconstruct([(row.keyframe, row.data) for row in rows]),
+    }
@@ -1,30 +1,195 @@
 """
 This module sets up the database connection and provides a database session generator.
 It uses SQLAlchemy to create an engine and a session factory.
+
+Requests use an asyncio engine (aiosqlite or asyncpg), so database I/O does not block the
+event loop that also serves streaming responses. The schema is created through it too, at
+startup, so an in-memory database has its tables on the connection requests use. A
+synchronous engine on the same database is kept for the migrations command line.
+
+Both engines size their connection pool from the environment and, for SQLite, apply
+performance pragmas to every new connection: WAL journaling so readers do not block the
+writer, `synchronous=NORMAL`, memory-mapped I/O, a larger page cache and a busy timeout so
+concurrent writers wait instead of failing. SQLite connections also get the `inflate` SQL
+function used by the full-text index to read compressed snippet code.
 """
 
 import os
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.blobs import inflate
 
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///db.sqlite3")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 
+# Async drivers used for each database backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
 
-def get_db():
+
+def sqlite_pragmas() -> dict[str, str | int]:
     """
-    Generates a database session for dependency injection.
+    Returns the pragmas applied to every new SQLite connection.
 
-    Yields:
-        Session: The database session.
+    Returns:
+        dict[str, str | int]: The pragma names mapped to their values.
+    """
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": -SQLITE_CACHE_SIZE_KB,  # Negative values are in KiB
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
     """
-    db = SessionLocal()
+    Applies `sqlite_pragmas` to a new DBAPI connection.
+    """
+    cursor = dbapi_connection.cursor()
     try:
-        yield db
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
     finally:
-        db.close()
+        cursor.close()
+
+
+def register_sqlite_functions(dbapi_connection, connection_record) -> None:
+    """
+    Registers the SQL functions of `src.blobs` on a new DBAPI connection.
+    """
+    dbapi_connection.create_function("inflate", 1, inflate, deterministic=True)
+
+
+def engine_options(database_url: URL) -> dict:
+    """
+    Returns the `create_engine` arguments for a database URL.
+
+    Args:
+        database_url (URL): The database URL.
+
+    Returns:
+        dict: The pool arguments and, for SQLite, the connection arguments.
+    """
+    options = {}
+    is_sqlite = database_url.get_backend_name() == "sqlite"
+    if is_sqlite and database_url.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in a single connection that must be shared
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_S,
+            pool_recycle=DB_POOL_RECYCLE_S,
+            pool_pre_ping=not is_sqlite,
+        )
+    if is_sqlite:
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+    return options
+
+
+def async_database_url(url: str) -> URL:
+    """
+    Returns a database URL with the async driver of its backend, e.g.
+    "sqlite:///db.sqlite3" becomes "sqlite+aiosqlite:///db.sqlite3".
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        URL: The URL with an async driver.
+    """
+    database_url = make_url(url)
+    driver = ASYNC_DRIVERS.get(database_url.get_backend_name())
+    if driver is None or database_url.get_driver_name() in ASYNC_DRIVERS.values():
+        return database_url
+    return database_url.set(drivername=f"{database_url.get_backend_name()}+{driver}")
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, **kwargs) -> Engine:
+    """
+    Creates an engine with a sized connection pool and, for SQLite, tuned pragmas.
+
+    Args:
+        url (str, optional): The database URL. Defaults to `SQLALCHEMY_DATABASE_URI`.
+        **kwargs: Extra arguments passed to `create_engine`, overriding the defaults.
+
+    Returns:
+        Engine: The new engine.
+    """
+    database_url = make_url(url)
+    engine = create_engine(database_url, **{**engine_options(database_url), **kwargs})
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        event.listen(engine, "connect", register_sqlite_functions)
+    return engine
+
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL, **kwargs) -> AsyncEngine:
+    """
+    Creates an asyncio engine with the same pool and pragmas as `create_db_engine`.
+
+    Args:
+        url (str, optional): The database URL. Defaults to `SQLALCHEMY_DATABASE_URI`.
+        **kwargs: Extra arguments passed to `create_async_engine`, overriding the defaults.
+
+    Returns:
+        AsyncEngine: The new engine.
+    """
+    database_url = async_database_url(url)
+    engine = create_async_engine(
+        database_url, **{**engine_options(database_url), **kwargs}
+    )
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+        event.listen(engine.sync_engine, "connect", register_sqlite_functions)
+    return engine
+
+
+def create_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    """
+    Creates a session factory for an async engine.
+    Objects are not expired on commit, since expired attributes cannot be lazily
+    reloaded outside an `await`.
+
+    Args:
+        engine (AsyncEngine): The engine.
+
+    Returns:
+        async_sessionmaker: The session factory.
+    """
+    return async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+engine = create_db_engine()  # Used by `python -m src.migrations`
+async_engine = create_async_db_engine()
+SessionLocal = create_session_factory(async_engine)
+
+
+async def get_db():
+    """
+    Generates an async database session for dependency injection.
+
+    Yields:
+        AsyncSession: The database session.
+    """
+    async with SessionLocal() as db:
+        yield db
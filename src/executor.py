@@ -0,0 +1,112 @@
+"""
+This module provides a bounded asynchronous execution pool for blocking sandbox work.
+It runs blocking calls on a fixed set of worker threads so the event loop keeps serving
+other requests, and rejects new jobs once the number of waiting jobs reaches the queue limit.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+SANDBOX_MAX_CONCURRENCY = int(
+    os.getenv("SANDBOX_MAX_CONCURRENCY", str(os.cpu_count() or 1))
+)
+SANDBOX_MAX_QUEUE = int(os.getenv("SANDBOX_MAX_QUEUE", "16"))
+
+
+class ExecutionPoolFull(Exception):
+    """
+    Raised when the execution pool has no free worker and its queue is full.
+    """
+
+    def __init__(self, running: int, queued: int):
+        super().__init__(f"Execution pool is full ({running} running, {queued} queued)")
+        self.running = running
+        self.queued = queued
+
+
+class ExecutionPool:
+    """
+    A bounded pool of worker threads with an admission queue.
+
+    At most `max_concurrency` jobs run at the same time and at most `max_queue` jobs
+    wait for a free worker. Submitting a job beyond that raises `ExecutionPoolFull`.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="sandbox"
+        )
+        self._pending = 0  # Jobs accepted but not yet finished
+        self._pending_lock = threading.Lock()
+
+    @property
+    def running(self) -> int:
+        """
+        The number of jobs currently running on a worker.
+        """
+        return min(self._pending, self.max_concurrency)
+
+    @property
+    def queued(self) -> int:
+        """
+        The number of jobs waiting for a free worker.
+        """
+        return max(0, self._pending - self.max_concurrency)
+
+    async def submit(self, fn, *args, **kwargs):
+        """
+        Runs a blocking function on a pool worker and waits for its result.
+
+        Args:
+            fn (callable): The blocking function to run.
+            *args: Positional arguments for the function.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            The return value of the function.
+
+        Raises:
+            ExecutionPoolFull: If all workers are busy and the queue is full.
+        """
+        with self._pending_lock:
+            if self._pending >= self.max_concurrency + self.max_queue:
+                raise ExecutionPoolFull(self.running, self.queued)
+            self._pending += 1
+
+        # The job is counted until its thread is done: cancelling the caller, e.g. when a
+        # streaming client disconnects, does not stop a job already running
+        future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        """
+        Returns the current occupancy of the pool.
+
+        Returns:
+            dict: The running and queued job counts and the configured limits.
+        """
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker threads once the jobs already submitted have finished.
+        """
+        self._executor.shutdown(wait=True)
+
+
+execution_pool = ExecutionPool(SANDBOX_MAX_CONCURRENCY, SANDBOX_MAX_QUEUE)
@@ -0,0 +1,237 @@
+"""
+This module provides the registry of languages whose snippets the sandbox can test.
+
+Each language defines its test harness, which combines the code and the test code into one
+script, the commands that run the script in a new process (`SANDBOX_MODE=cold`), from a file
+or from stdin, and the sandbox worker started once per warm pool slot (`SANDBOX_MODE=warm`,
+see `src.warm_pool`). The stdin commands run the script with the language's
+`script_runner` module, which its worker uses too. A language without a worker is always
+run cold.
+Registering a `Language` makes it available to `src.runner` and `POST /api/run/{language}`.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Callable
+
+from src.testcases import TestCase, split_python_tests
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass(frozen=True)
+class Language:
+    """
+    A language the sandbox can run tests for.
+
+    Attributes:
+        name (str): The language of a snippet, e.g. "python".
+        display_name (str): The name shown in messages.
+        script_name (str): The file name of the test script.
+        build_script (Callable[[str, str], str]): Builds the test script from the code and
+            the test code.
+        command (tuple[str, ...]): The command running the script in a new process, with
+            `{script}` and `{memory_limit_mb}` placeholders.
+        stdin_command (tuple[str, ...]): The command running a script read from stdin in a
+            new process, as if it was read from `script_name`, with a `{memory_limit_mb}`
+            placeholder.
+        worker (tuple[str, ...] | None): The command starting a warm sandbox worker, or
+            None if the language has no worker isolating its jobs like a new process
+            would, in which case it is always run cold.
+        version_command (tuple[str, ...]): The command printing the runtime version.
+        address_space_overhead_mb (int): The address space the runtime reserves for itself,
+            added to the memory limit of a cold run.
+        out_of_memory_markers (tuple[str, ...]): Error messages printed by the runtime when
+            a script exceeds the memory limit.
+        split_tests (Callable[[str], list[TestCase]], optional): Splits test code into
+            test cases run separately, see `src.testcases`. Without it, the test code is
+            always run as a whole.
+    """
+
+    name: str
+    display_name: str
+    script_name: str
+    build_script: Callable[[str, str], str]
+    command: tuple[str, ...]
+    stdin_command: tuple[str, ...]
+    worker: tuple[str, ...] | None
+    version_command: tuple[str, ...]
+    address_space_overhead_mb: int = 0
+    out_of_memory_markers: tuple[str, ...] = ()
+    split_tests: Callable[[str], list[TestCase]] | None = None
+
+    def cold_command(self, script: str | None, memory_limit_mb: int) -> list[str]:
+        """
+        Returns the command running a test script in a new process.
+
+        Args:
+            script (str, optional): The path of the test script, or None to read the
+                script from stdin.
+            memory_limit_mb (int): The memory limit in megabytes.
+
+        Returns:
+            list[str]: The command.
+        """
+        if script is None:
+            command, script = self.stdin_command, ""
+        else:
+            command = self.command
+        # Not str.format, as a command may embed source code
+        return [
+            arg.replace("{script}", script).replace(
+                "{memory_limit_mb}", str(memory_limit_mb)
+            )
+            for arg in command
+        ]
+
+
+LANGUAGES: dict[str, Language] = {}
+
+
+def register_language(language: Language) -> Language:
+    """
+    Adds a language to the registry, replacing any language with the same name.
+
+    Args:
+        language (Language): The language.
+
+    Returns:
+        Language: The registered language.
+    """
+    LANGUAGES[language.name] = language
+    return language
+
+
+def get_language(name: str | None) -> Language | None:
+    """
+    Looks up a registered language.
+
+    Args:
+        name (str, optional): The language of a snippet.
+
+    Returns:
+        Language: The language, or None if the sandbox cannot run it.
+    """
+    return LANGUAGES.get((name or "").lower())
+
+
+def build_python_script(code: str, test_code: str) -> str:
+    """
+    Builds the Python script that defines the code and runs the tests against it.
+
+    Args:
+        code (str): The Python code to test.
+        test_code (str): The Python test code.
+
+    Returns:
+        str: The script source.
+    """
+    lines = [code, "def test_code():"]
+    lines.extend(f"    {line}" for line in test_code.split("\n"))
+    lines.extend(["", "test_code()"])
+    return "\n".join(lines)
+
+
+def build_javascript_script(code: str, test_code: str) -> str:
+    """
+    Builds the JavaScript script that defines the code and runs the tests against it.
+    The tests can call Node's `assert` and use `await`.
+
+    Args:
+        code (str): The JavaScript code to test.
+        test_code (str): The JavaScript test code.
+
+    Returns:
+        str: The script source.
+    """
+    return "\n".join(
+        [
+            'globalThis.assert = require("assert");',
+            code,
+            ";(async function test_code() {",  # Ends the code's last statement
+            test_code,
+            "})();",
+        ]
+    )
+
+
+def build_ruby_script(code: str, test_code: str) -> str:
+    """
+    Builds the Ruby script that defines the code and runs the tests against it.
+    The tests can call the Minitest assertions, like `assert` and `assert_equal`.
+
+    Args:
+        code (str): The Ruby code to test.
+        test_code (str): The Ruby test code.
+
+    Returns:
+        str: The script source.
+    """
+    return "\n".join(
+        [
+            'require "minitest"',
+            "extend Minitest::Assertions",
+            "class << self",
+            "  attr_writer :assertions",
+            "  def assertions = @assertions ||= 0",
+            "end",
+            code,
+            test_code,
+        ]
+    )
+
+
+# Imports the script runner rather than running it, so Python caches its bytecode
+PYTHON_STDIN_BOOTSTRAP = (
+    f"import sys; sys.path.insert(0, {SRC_DIR!r}); import script_runner; "
+    "del sys.path[0]; sys.exit(script_runner.exec_source(sys.stdin.read()))"
+)
+
+PYTHON = register_language(
+    Language(
+        name="python",
+        display_name="Python",
+        script_name="test.py",
+        build_script=build_python_script,
+        command=("python3", "{script}"),
+        stdin_command=("python3", "-c", PYTHON_STDIN_BOOTSTRAP),
+        worker=("python3", os.path.join(SRC_DIR, "zygote.py")),
+        version_command=("python3", "-c", "import sys; print(sys.version)"),
+        out_of_memory_markers=("MemoryError",),
+        split_tests=split_python_tests,
+    )
+)
+JAVASCRIPT = register_language(
+    Language(
+        name="javascript",
+        display_name="JavaScript",
+        script_name="test.js",
+        build_script=build_javascript_script,
+        command=("node", "--max-old-space-size={memory_limit_mb}", "{script}"),
+        stdin_command=(
+            "node",
+            "--max-old-space-size={memory_limit_mb}",
+            os.path.join(SRC_DIR, "script_runner.js"),
+        ),
+        # Node.js cannot fork, so a warm worker could not give each job its own CPU time
+        # and memory limits and process group like a cold run has
+        worker=None,
+        version_command=("node", "--version"),
+        address_space_overhead_mb=2048,  # V8 reserves its code range up front
+        out_of_memory_markers=("heap out of memory",),
+    )
+)
+RUBY = register_language(
+    Language(
+        name="ruby",
+        display_name="Ruby",
+        script_name="test.rb",
+        build_script=build_ruby_script,
+        command=("ruby", "{script}"),
+        stdin_command=("ruby", os.path.join(SRC_DIR, "script_runner.rb")),
+        worker=("ruby", os.path.join(SRC_DIR, "zygote.rb")),
+        version_command=("ruby", "--version"),
+        address_space_overhead_mb=512,  # Ruby reserves its heap and thread stacks
+        out_of_memory_markers=("(NoMemoryError)",),
+    )
+)
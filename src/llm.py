@@ -0,0 +1,113 @@
+"""
+This module manages the shared asynchronous OpenAI client.
+A single client with a tuned keep-alive connection pool is reused by all generate endpoints,
+opened when the application starts and closed when it shuts down. HTTP/2 is used when the
+optional `h2` package is installed.
+"""
+
+import importlib.util
+import os
+
+import httpx
+import openai
+
+from src.logger import logger
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")
+)
+OPENAI_KEEPALIVE_EXPIRY_S = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_S", "60"))
+OPENAI_CONNECT_TIMEOUT_S = float(os.getenv("OPENAI_CONNECT_TIMEOUT_S", "5"))
+OPENAI_TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", "60"))
+
+# Read timeouts in seconds per generate endpoint, overridable with OPENAI_TIMEOUT_<NAME>_S.
+ENDPOINT_TIMEOUTS = {
+    "detect_language": 15.0,
+    "title": 20.0,
+    "code": 60.0,
+    "code_from_feedback": 60.0,
+    "tests": 60.0,
+    "tests_from_feedback": 60.0,
+    "regenerate": 60.0,
+}
+
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+_client: openai.AsyncOpenAI | None = None
+
+
+def endpoint_timeout(endpoint: str) -> openai.Timeout:
+    """
+    Returns the request timeout for a generate endpoint.
+
+    Args:
+        endpoint (str): The endpoint name, e.g. "detect_language".
+
+    Returns:
+        openai.Timeout: The timeout with the endpoint's read limit and the shared connect limit.
+    """
+    read = float(
+        os.getenv(
+            f"OPENAI_TIMEOUT_{endpoint.upper()}_S",
+            ENDPOINT_TIMEOUTS.get(endpoint, OPENAI_TIMEOUT_S),
+        )
+    )
+    return openai.Timeout(read, connect=OPENAI_CONNECT_TIMEOUT_S)
+
+
+def create_client() -> openai.AsyncOpenAI:
+    """
+    Creates an async OpenAI client with a pooled HTTP transport.
+
+    Returns:
+        openai.AsyncOpenAI: The new client.
+    """
+    http_client = openai.DefaultAsyncHttpxClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_S,
+        ),
+        timeout=openai.Timeout(OPENAI_TIMEOUT_S, connect=OPENAI_CONNECT_TIMEOUT_S),
+    )
+    return openai.AsyncOpenAI(
+        base_url=os.getenv("OPENAI_API_BASE") or None,  # Set custom API base URL
+        http_client=http_client,
+    )
+
+
+def get_client() -> openai.AsyncOpenAI:
+    """
+    Returns the shared OpenAI client, creating it on first use.
+
+    Returns:
+        openai.AsyncOpenAI: The shared client.
+    """
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+def open_client() -> None:
+    """
+    Creates the shared client at application startup.
+    A missing API key is logged rather than raised, so the rest of the API still starts.
+    """
+    try:
+        get_client()
+        logger.info(f"OpenAI client ready (http2={HTTP2_ENABLED})")
+    except openai.OpenAIError as e:
+        logger.warning(f"OpenAI client not configured: {e}")
+
+
+async def close_client() -> None:
+    """
+    Closes the shared client and its connection pool.
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
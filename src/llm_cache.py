@@ -0,0 +1,123 @@
+"""
+This module provides a response cache for LLM completions with request coalescing.
+Completions are keyed by prompt, model and messages; identical requests that arrive while
+a completion is in flight share a single upstream call, and cached streaming completions
+are replayed as a stream.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, Awaitable, Callable
+
+from src.cache import TTLCache
+from src.streams import SharedStream
+
+
+def llm_cache_key(prompt_name: str, model: str, messages: list, **params) -> str:
+    """
+    Computes the cache key of an LLM request.
+
+    Args:
+        prompt_name (str): The name of the system prompt used.
+        model (str): The model name.
+        messages (list): The messages sent to the model.
+        **params: Any other request parameters that affect the completion.
+
+    Returns:
+        str: The SHA-256 hex digest of the request.
+    """
+    payload = json.dumps(
+        [prompt_name, model, messages, params], sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CoalescingCache:
+    """
+    A size-bounded cache of LLM completions that coalesces concurrent identical requests.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.cache = TTLCache(maxsize, ttl=ttl)
+        self.coalesced = 0
+        self._in_flight: dict[str, asyncio.Future | SharedStream] = {}
+
+    async def complete(self, key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        """
+        Returns a cached completion, or fetches it once for all concurrent callers.
+
+        Args:
+            key (str): The cache key of the request.
+            fetch (callable): Returns an awaitable that performs the upstream request.
+
+        Returns:
+            str: The completion.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The upstream call runs in its own task so a caller disconnecting
+            # does not cancel it for the other callers.
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._complete_done(key, t))
+        return await asyncio.shield(task)
+
+    def _complete_done(self, key: str, task: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.cache.set(key, task.result())
+
+    async def stream(
+        self, key: str, open_stream: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """
+        Streams a completion, replaying it from the cache or sharing an in-flight stream.
+
+        Args:
+            key (str): The cache key of the request.
+            open_stream (callable): Returns the async iterator of the upstream stream.
+
+        Yields:
+            str: Each chunk of the completion.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            for chunk in cached:
+                yield chunk
+            return
+
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            self.coalesced += 1
+        else:
+            shared = SharedStream(open_stream())
+            self._in_flight[key] = shared
+            shared.task.add_done_callback(lambda _: self._stream_done(key, shared))
+
+        async for chunk in shared.subscribe():
+            yield chunk
+
+    def _stream_done(self, key: str, shared: SharedStream) -> None:
+        self._in_flight.pop(key, None)
+        if shared.succeeded:
+            self.cache.set(key, list(shared.chunks))
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters and the number of coalesced requests.
+
+        Returns:
+            dict: The cache statistics.
+        """
+        return {
+            **self.cache.stats(),
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
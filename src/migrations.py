@@ -0,0 +1,297 @@
+"""
+This module provides a minimal schema migrator.
+
+`Base.metadata.create_all` creates missing tables with their current indexes, but never
+changes a table that already exists. Schema changes to existing databases are applied here
+instead, as numbered migrations recorded in the `schema_migrations` table. Migrations are
+idempotent, so they can also run on a database that `create_all` just created in its final
+shape.
+
+Usage:
+    python -m src.migrations [--status]
+"""
+
+import argparse
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    select,
+    text,
+)
+
+from src import blobs, models
+from src.logger import logger
+
+# Snippets read and rewritten per batch by data migrations
+MIGRATION_BATCH_SIZE = 1000
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.now),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    A numbered schema change.
+    """
+
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def table_columns(connection: Connection, table: str) -> set[str]:
+    """
+    Returns the column names of a table.
+    """
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def index_snippets_by_activity(connection: Connection) -> None:
+    """
+    Replaces the single-column snippet indexes, which no query uses, and the full
+    `(updated_at, id)` index with a partial index over active snippets.
+    """
+    for name in (
+        "ix_snippets_id",  # Duplicates the primary key
+        "ix_snippets_title",  # Title search goes through the full-text index
+        "ix_snippets_language",  # The language filter rides on the list order
+        "ix_snippets_updated_at_id",
+    ):
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    models.ACTIVE_SNIPPETS_INDEX.create(connection, checkfirst=True)
+
+
+def move_texts_to_blobs(connection: Connection) -> None:
+    """
+    Moves the text fields of snippets from inline columns to `blobs`, and on SQLite
+    recreates the full-text index, which now reads the code from its blob.
+    The database file only shrinks after a `VACUUM`.
+    """
+    columns = table_columns(connection, "snippets")
+    if "code" not in columns:
+        return  # Created with blob storage
+
+    if connection.dialect.name == "sqlite":
+        for trigger in (
+            "snippets_fts_insert",
+            "snippets_fts_delete",
+            "snippets_fts_update",
+        ):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        connection.execute(text("DROP TABLE IF EXISTS snippets_fts"))
+    for field in blobs.TEXT_FIELDS:
+        if f"{field}_hash" not in columns:
+            connection.execute(
+                text(f"ALTER TABLE snippets ADD COLUMN {field}_hash VARCHAR")
+            )
+
+    select_texts = text(
+        f"SELECT id, {', '.join(blobs.TEXT_FIELDS)} FROM snippets "
+        "WHERE id > :last_id ORDER BY id LIMIT :limit"
+    )
+    set_hashes = text(
+        "UPDATE snippets SET "
+        + ", ".join(f"{field}_hash = :{field}_hash" for field in blobs.TEXT_FIELDS)
+        + " WHERE id = :id"
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select_texts, {"last_id": last_id, "limit": MIGRATION_BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+        stored, blob_rows = blobs.split_texts([dict(row._mapping) for row in rows])
+        if blob_rows:
+            connection.execute(models.insert_blobs(connection.dialect.name), blob_rows)
+        connection.execute(set_hashes, stored)
+        last_id = rows[-1].id
+
+    for field in blobs.TEXT_FIELDS:
+        connection.execute(text(f"ALTER TABLE snippets DROP COLUMN {field}"))
+    models.create_search_index(connection)
+
+
+def track_blob_references(connection: Connection) -> None:
+    """
+    Adds the blob reference counts and the snippet revision numbers, counts the references
+    to existing blobs and deletes the blobs no snippet refers to anymore.
+    """
+    if "refs" not in table_columns(connection, "blobs"):
+        connection.execute(
+            text("ALTER TABLE blobs ADD COLUMN refs INTEGER NOT NULL DEFAULT 0")
+        )
+    if "revision" not in table_columns(connection, "snippets"):
+        connection.execute(
+            text("ALTER TABLE snippets ADD COLUMN revision INTEGER NOT NULL DEFAULT 1")
+        )
+    for index in models.Blob.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+    refs = Counter()
+    select_hashes = text(
+        f"SELECT id, {models.HASH_COLUMNS} FROM snippets "
+        "WHERE id > :last_id ORDER BY id LIMIT :limit"
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select_hashes, {"last_id": last_id, "limit": MIGRATION_BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            refs.update({digest for digest in row[1:] if digest is not None})
+        last_id = rows[-1].id
+    connection.execute(text("UPDATE blobs SET refs = 0"))
+    if refs:
+        connection.execute(
+            text("UPDATE blobs SET refs = :refs WHERE hash = :hash"),
+            [{"hash": digest, "refs": count} for digest, count in refs.items()],
+        )
+    connection.execute(text("DELETE FROM blobs WHERE refs = 0"))
+    models.create_blob_refs(connection)
+
+
+def record_test_metrics(connection: Connection) -> None:
+    """
+    Adds the resource usage of the last test run to the snippets.
+    """
+    columns = table_columns(connection, "snippets")
+    for column in models.Snippet.__table__.columns:
+        if column.name.startswith("test_") and column.name not in columns:
+            column_type = column.type.compile(connection.dialect)
+            connection.execute(
+                text(f"ALTER TABLE snippets ADD COLUMN {column.name} {column_type}")
+            )
+
+
+MIGRATIONS = (
+    Migration(1, "Index active snippets by update time", index_snippets_by_activity),
+    Migration(2, "Move snippet texts to blob storage", move_texts_to_blobs),
+    Migration(3, "Count blob references for snippet revisions", track_blob_references),
+    Migration(4, "Record the resource usage of test runs", record_test_metrics),
+)
+
+
+def applied_versions(connection: Connection) -> set[int]:
+    """
+    Returns the versions of the migrations applied to a database.
+
+    Args:
+        connection (Connection): The database connection.
+
+    Returns:
+        set[int]: The applied versions.
+    """
+    if not inspect(connection).has_table(schema_migrations.name):
+        return set()
+    return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def pending_migrations(engine: Engine) -> list[Migration]:
+    """
+    Returns the migrations not yet applied to a database, in order.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        list[Migration]: The pending migrations.
+    """
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def migrate(engine: Engine) -> list[Migration]:
+    """
+    Applies the pending migrations, each in its own transaction.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        list[Migration]: The migrations that were applied.
+    """
+    with engine.connect() as connection:
+        return migrate_connection(connection)
+
+
+def migrate_connection(connection: Connection) -> list[Migration]:
+    """
+    Applies the pending migrations on a connection, each in its own transaction.
+
+    Args:
+        connection (Connection): The database connection, outside a transaction.
+
+    Returns:
+        list[Migration]: The migrations that were applied.
+    """
+    metadata.create_all(connection)
+    applied = applied_versions(connection)
+    connection.commit()
+    pending = [m for m in MIGRATIONS if m.version not in applied]
+    for migration in pending:
+        with connection.begin():
+            migration.upgrade(connection)
+            connection.execute(
+                schema_migrations.insert().values(
+                    version=migration.version, description=migration.description
+                )
+            )
+        logger.info(f"Applied migration {migration.version}: {migration.description}")
+    return pending
+
+
+def create_schema(connection: Connection) -> list[Migration]:
+    """
+    Creates the missing tables and applies the pending migrations on a connection.
+    Called through `AsyncConnection.run_sync` at startup, so the schema is created on the
+    connection requests use, even for an in-memory SQLite database that only lives there.
+
+    Args:
+        connection (Connection): The database connection, outside a transaction.
+
+    Returns:
+        list[Migration]: The migrations that were applied.
+    """
+    models.Base.metadata.create_all(connection)
+    connection.commit()
+    return migrate_connection(connection)
+
+
+if __name__ == "__main__":
+    from src.database import engine
+
+    parser = argparse.ArgumentParser(description="Migrates the database schema.")
+    parser.add_argument(
+        "--status", action="store_true", help="list pending migrations and exit"
+    )
+    args = parser.parse_args()
+    if args.status:
+        for migration in pending_migrations(engine):
+            print(f"pending {migration.version}: {migration.description}")
+    else:
+        with engine.connect() as connection:
+            create_schema(connection)
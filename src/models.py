@@ -1,33 +1,281 @@
 """
 This module defines the database models using SQLAlchemy's declarative base.
-It includes the Snippet model, which represents a code snippet with associated metadata.
+It includes the Snippet model, which represents a code snippet with associated metadata,
+the Blob model, which stores the large snippet texts (see `src.blobs`), the SnippetRevision
+model, which stores the history of snippets (see `src.revisions`), and on SQLite the FTS5
+full-text index over snippets and the blob reference counts, kept in sync by triggers.
 """
 
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import (
+    Column,
+    Float,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    DateTime,
+    Boolean,
+    Index,
+    event,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import declarative_base, deferred
+
+from src.blobs import TEXT_FIELDS, decompress
 
 Base = declarative_base()
 
 
+class Blob(Base):
+    """
+    Represents a compressed snippet text, stored once however many snippets use it.
+    """
+
+    __tablename__ = "blobs"
+    __table_args__ = (
+        # Finds the blobs to collect
+        Index("ix_blobs_unreferenced", "hash", sqlite_where=text("refs = 0")),
+    )
+
+    hash = Column(String, primary_key=True)  # SHA-256 of the text
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed UTF-8
+    refs = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+def insert_blobs(dialect_name: str):
+    """
+    Returns an INSERT into `blobs` that skips the texts already stored.
+
+    Args:
+        dialect_name (str): The name of the database dialect.
+
+    Returns:
+        Insert: The statement, to execute with `hash` and `data` values.
+    """
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    return dialect.insert(Blob).on_conflict_do_nothing()
+
+
+def blob_data(hash_column: Column):
+    """
+    Returns a deferred attribute loading the compressed text a hash column refers to.
+    The attributes of a snippet are loaded together with `undefer_group("texts")`, and
+    raise instead of emitting a query when accessed without it.
+    """
+    return deferred(
+        select(Blob.data)
+        .where(Blob.hash == hash_column)
+        .correlate_except(Blob)
+        .scalar_subquery(),
+        group="texts",
+        raiseload=True,
+    )
+
+
+def blob_text(data_attribute: str) -> property:
+    """
+    Returns a read-only property decompressing a `blob_data` attribute.
+    """
+    return property(lambda self: decompress(getattr(self, data_attribute)))
+
+
 class Snippet(Base):
     """
     Represents a code snippet with associated metadata.
+    The large text fields are stored in `blobs` and exposed as read-only properties.
     """
 
     __tablename__ = "snippets"
 
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True)
-    language = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    language = Column(String)
     description = Column(Text, default="")
-    code = Column(Text)
-    feedback = Column(Text, default="")
-    test_code = Column(Text, default="")
-    test_feedback = Column(Text, default="")
+    code_hash = Column(String, ForeignKey("blobs.hash"))
+    feedback_hash = Column(String, ForeignKey("blobs.hash"))
+    test_code_hash = Column(String, ForeignKey("blobs.hash"))
+    test_feedback_hash = Column(String, ForeignKey("blobs.hash"))
     test_result = Column(String, default="")
-    test_result_message = Column(Text, default="")
+    test_result_message_hash = Column(String, ForeignKey("blobs.hash"))
+    # Resource usage of the last test run, see `src.runner.RUN_METRICS`
+    test_wall_ms = Column(Float)
+    test_cpu_user_ms = Column(Float)
+    test_cpu_system_ms = Column(Float)
+    test_max_rss_kb = Column(Integer)
+    test_timed_out = Column(Boolean)
+    test_out_of_memory = Column(Boolean)
     is_active = Column(Boolean, default=True)
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    code_data = blob_data(code_hash)
+    feedback_data = blob_data(feedback_hash)
+    test_code_data = blob_data(test_code_hash)
+    test_feedback_data = blob_data(test_feedback_hash)
+    test_result_message_data = blob_data(test_result_message_hash)
+
+    code = blob_text("code_data")
+    feedback = blob_text("feedback_data")
+    test_code = blob_text("test_code_data")
+    test_feedback = blob_text("test_feedback_data")
+    test_result_message = blob_text("test_result_message_data")
+
+
+class SnippetRevision(Base):
+    """
+    Represents a past or current version of the editable fields of a snippet, stored as a
+    keyframe or as a diff against the previous revision.
+    """
+
+    __tablename__ = "snippet_revisions"
+
+    snippet_id = Column(Integer, ForeignKey("snippets.id"), primary_key=True)
+    number = Column(Integer, primary_key=True)
+    keyframe = Column(Boolean, nullable=False)
+    changes = Column(String, nullable=False, default="")  # Comma-separated fields
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON
+    created_at = Column(DateTime, nullable=False)
+
+
+# Serves the keyset-paginated list of active snippets. SQLite only uses a partial index
+# when the query repeats its condition, which SQLAlchemy renders as `is_active = 1`.
+# Changes to this index need a migration in `src.migrations`.
+ACTIVE_SNIPPETS_INDEX = Index(
+    "ix_snippets_active_updated_at",
+    Snippet.updated_at,
+    Snippet.id,
+    sqlite_where=text("is_active = 1"),
+    postgresql_where=text("is_active"),
+)
+
+# External-content FTS5 table over the searchable snippet columns of active snippets,
+# indexed by snippet ID. Title matches rank above description matches, which rank above
+# code matches. The code is read from its blob through the `inflate` SQL function.
+SNIPPETS_FTS_DDL = (
+    """
+    CREATE VIEW IF NOT EXISTS snippets_search AS
+    SELECT s.id, s.title, s.description, inflate(b.data) AS code
+    FROM snippets s LEFT JOIN blobs b ON b.hash = s.code_hash
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5(
+        title, description, code,
+        content='snippets_search', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS snippets_fts_insert AFTER INSERT ON snippets
+    WHEN new.is_active BEGIN
+        INSERT INTO snippets_fts(rowid, title, description, code)
+        VALUES (
+            new.id, new.title, new.description,
+            (SELECT inflate(data) FROM blobs WHERE hash = new.code_hash)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS snippets_fts_delete AFTER DELETE ON snippets
+    WHEN old.is_active BEGIN
+        INSERT INTO snippets_fts(snippets_fts, rowid, title, description, code)
+        VALUES (
+            'delete', old.id, old.title, old.description,
+            (SELECT inflate(data) FROM blobs WHERE hash = old.code_hash)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS snippets_fts_update
+    AFTER UPDATE OF title, description, code_hash, is_active ON snippets BEGIN
+        INSERT INTO snippets_fts(snippets_fts, rowid, title, description, code)
+        SELECT 'delete', old.id, old.title, old.description,
+            (SELECT inflate(data) FROM blobs WHERE hash = old.code_hash)
+        WHERE old.is_active;
+        INSERT INTO snippets_fts(rowid, title, description, code)
+        SELECT new.id, new.title, new.description,
+            (SELECT inflate(data) FROM blobs WHERE hash = new.code_hash)
+        WHERE new.is_active;
+    END
+    """,
+)
+
+SNIPPETS_FTS_REBUILD = (
+    "INSERT INTO snippets_fts(snippets_fts) VALUES ('rebuild')",
+    """
+    INSERT INTO snippets_fts(snippets_fts, rowid, title, description, code)
+    SELECT 'delete', v.id, v.title, v.description, v.code
+    FROM snippets_search v JOIN snippets s ON s.id = v.id WHERE NOT s.is_active
+    """,
+    "INSERT INTO snippets_fts(snippets_fts, rank) VALUES ('rank', 'bm25(10.0, 3.0, 1.0)')",
+)
+
+
+# Counts the snippets referring to each blob. A snippet using the same text in several
+# fields counts once, on both sides of an update.
+HASH_COLUMNS = ", ".join(f"{field}_hash" for field in TEXT_FIELDS)
+OLD_HASHES = ", ".join(f"old.{field}_hash" for field in TEXT_FIELDS)
+NEW_HASHES = ", ".join(f"new.{field}_hash" for field in TEXT_FIELDS)
+BLOB_REFS_DDL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blobs_refs_insert AFTER INSERT ON snippets BEGIN
+        UPDATE blobs SET refs = refs + 1 WHERE hash IN ({NEW_HASHES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blobs_refs_delete AFTER DELETE ON snippets BEGIN
+        UPDATE blobs SET refs = refs - 1 WHERE hash IN ({OLD_HASHES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blobs_refs_update
+    AFTER UPDATE OF {HASH_COLUMNS} ON snippets BEGIN
+        UPDATE blobs SET refs = refs - 1 WHERE hash IN ({OLD_HASHES});
+        UPDATE blobs SET refs = refs + 1 WHERE hash IN ({NEW_HASHES});
+    END
+    """,
+)
+
+
+def create_blob_refs(connection) -> None:
+    """
+    Creates the triggers counting blob references on SQLite.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for ddl in BLOB_REFS_DDL:
+        connection.execute(text(ddl))
+
+
+def create_search_index(connection) -> None:
+    """
+    Creates the full-text index and its triggers on SQLite, indexing existing snippets
+    when the index is new.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = 'snippets_fts'")
+    ).first()
+    for ddl in SNIPPETS_FTS_DDL:
+        connection.execute(text(ddl))
+    if not exists:
+        for statement in SNIPPETS_FTS_REBUILD:
+            connection.execute(text(statement))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def on_create(target, connection, **kw):
+    """
+    Creates the full-text index with the tables. Databases with the texts still inline in
+    `snippets` get it from the migration that moves the texts to `blobs`.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("snippets")}
+    if "code_hash" in columns:
+        create_search_index(connection)
+        create_blob_refs(connection)
@@ -0,0 +1,82 @@
+"""
+This module provides helpers for newline-delimited JSON (NDJSON) streams, used to import and
+export snippets without holding the whole library in memory.
+Lines are limited to `NDJSON_MAX_LINE_BYTES`, so a body without newlines is rejected
+instead of being buffered whole.
+"""
+
+import json
+import os
+from typing import AsyncIterator
+
+MEDIA_TYPE = "application/x-ndjson"
+
+NDJSON_MAX_LINE_BYTES = int(os.getenv("NDJSON_MAX_LINE_BYTES", str(1024 * 1024)))
+
+
+class LineTooLong(ValueError):
+    """
+    Raised when an NDJSON line is longer than the maximum line length.
+    """
+
+    def __init__(self, number: int, max_bytes: int):
+        super().__init__(f"Line {number}: longer than {max_bytes} bytes")
+        self.number = number
+        self.max_bytes = max_bytes
+
+
+async def read_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int | None = None
+) -> AsyncIterator[tuple[int, object]]:
+    """
+    Parses an NDJSON byte stream incrementally. Blank lines are skipped.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The byte stream, split at arbitrary positions.
+        max_line_bytes (int, optional): The maximum length of a line, without its newline.
+            Defaults to `NDJSON_MAX_LINE_BYTES`.
+
+    Yields:
+        tuple[int, object]: The 1-based line number and the decoded JSON value.
+
+    Raises:
+        LineTooLong: If a line is longer than `max_line_bytes`, as soon as that many bytes
+            of it have arrived.
+        ValueError: If a line is not valid JSON, with the line number in the message.
+    """
+    max_line_bytes = max_line_bytes or NDJSON_MAX_LINE_BYTES
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLong(number, max_line_bytes)
+            if line.strip():
+                yield number, decode_line(number, line)
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(number + 1, max_line_bytes)
+    if buffer.strip():
+        yield number + 1, decode_line(number + 1, buffer)
+
+
+def decode_line(number: int, line: bytes) -> object:
+    """
+    Decodes one NDJSON line.
+
+    Args:
+        number (int): The line number, used in error messages.
+        line (bytes): The line.
+
+    Returns:
+        object: The decoded JSON value.
+
+    Raises:
+        ValueError: If the line is not valid JSON.
+    """
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Line {number}: invalid JSON ({e.msg})") from e
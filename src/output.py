@@ -0,0 +1,161 @@
+"""
+This module provides the bounded capture of sandbox output.
+
+A test run may print without limit, so its stdout and stderr are never buffered whole: each
+stream keeps only its last `limit` bytes in a ring buffer, and a truncation marker reports
+how much was dropped before them. The sandbox workers (`src.zygote` and its Ruby
+counterpart) apply the same rule to the output they capture.
+
+Live output, sent to clients while a test runs, goes through `LiveOutput`, which forwards
+chunks from the sandbox thread to the event loop up to a total byte budget. The test cases
+of a run go on in parallel, so `CaseOutput` labels each line of a case with its name.
+"""
+
+import asyncio
+import codecs
+from typing import AsyncIterator, Callable
+
+TRUNCATION_MARKER = "[... {} bytes truncated ...]\n"
+LIVE_TRUNCATION_MARKER = "[... live output truncated, the result keeps the end ...]\n"
+
+# Longest partial line of a test case held back until it ends, in characters
+CASE_OUTPUT_LINE_LIMIT = 4096
+
+
+class OutputBuffer:
+    """
+    A ring buffer keeping the last `limit` bytes written to an output stream.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(0, limit)
+        self.data = bytearray()
+        self.dropped = 0  # Bytes written before the kept ones
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Appends output, dropping the oldest bytes beyond the limit.
+
+        Args:
+            chunk (bytes): The output.
+        """
+        self.data += chunk
+        excess = len(self.data) - self.limit
+        if excess > 0:
+            del self.data[:excess]
+            self.dropped += excess
+
+    def getvalue(self) -> str:
+        """
+        Returns the kept output, decoded, after a truncation marker if bytes were dropped.
+
+        Returns:
+            str: The output.
+        """
+        data = bytes(self.data)
+        if not self.dropped:
+            return data.decode("utf-8", errors="replace")
+        start = 0
+        while start < len(data) and data[start] & 0xC0 == 0x80:
+            start += 1  # Skip the rest of a character cut by the truncation
+        return TRUNCATION_MARKER.format(self.dropped + start) + data[start:].decode(
+            "utf-8", errors="replace"
+        )
+
+
+def output_decoder() -> codecs.IncrementalDecoder:
+    """
+    Returns a decoder for output read in chunks, which may split a character.
+
+    Returns:
+        codecs.IncrementalDecoder: A UTF-8 decoder replacing invalid bytes.
+    """
+    return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+class CaseOutput:
+    """
+    Labels the output of one test case of a run with the case name, line by line, before
+    passing it on. Partial lines are held until they end or the case ends, so the lines of
+    cases running in parallel never mix, unless they grow past `CASE_OUTPUT_LINE_LIMIT`
+    characters: they are then passed on as a line of their own.
+
+    The sandbox thread of the case calls `write`, then `close` once the case ended.
+    """
+
+    def __init__(self, name: str, on_output: Callable[[str, str], None]):
+        self.prefix = f"[{name}] "
+        self.on_output = on_output
+        self._partial = {"stdout": "", "stderr": ""}
+
+    def write(self, stream: str, text: str) -> None:
+        """
+        Passes on the complete lines of a chunk of output, labelled.
+
+        Args:
+            stream (str): "stdout" or "stderr".
+            text (str): The output.
+        """
+        lines = text.split("\n")
+        lines[0] = self._partial[stream] + lines[0]
+        partial = lines.pop()
+        if len(partial) >= CASE_OUTPUT_LINE_LIMIT:
+            lines.append(partial)
+            partial = ""
+        self._partial[stream] = partial
+        if lines:
+            self.on_output(stream, "".join(f"{self.prefix}{line}\n" for line in lines))
+
+    def close(self) -> None:
+        """
+        Passes on the last partial line of each stream.
+        """
+        for stream, partial in self._partial.items():
+            if partial:
+                self.on_output(stream, f"{self.prefix}{partial}\n")
+        self._partial = {"stdout": "", "stderr": ""}
+
+
+class LiveOutput:
+    """
+    Passes output chunks from a sandbox thread to the event loop, up to `limit` bytes in
+    total. Later chunks are dropped, with a marker sent in their place once.
+
+    The sandbox thread calls `write` and finally `close`; the event loop iterates over the
+    `(stream, text)` chunks.
+    """
+
+    def __init__(self, limit: int):
+        self.remaining = limit
+        self.dropped = 0
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def write(self, stream: str, text: str) -> None:
+        """
+        Forwards a chunk of output. Called from the sandbox thread.
+
+        Args:
+            stream (str): "stdout" or "stderr".
+            text (str): The output.
+        """
+        size = len(text.encode("utf-8"))
+        if size > self.remaining:
+            self.remaining = 0
+            self.dropped += size
+            if self.dropped > size:
+                return  # The marker was already sent
+            text = LIVE_TRUNCATION_MARKER
+        else:
+            self.remaining -= size
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (stream, text))
+
+    def close(self) -> None:
+        """
+        Ends the output. Safe to call from any thread.
+        """
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+
+    async def __aiter__(self) -> AsyncIterator[tuple[str, str]]:
+        while (item := await self._queue.get()) is not None:
+            yield item
@@ -0,0 +1,54 @@
+"""
+This module provides opaque cursors for keyset pagination.
+A cursor encodes the sort key of the last row of a page, so the next page is fetched with a
+`WHERE (updated_at, id) < (...)` condition instead of an `OFFSET` that grows with the page
+number.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a cursor cannot be decoded.
+    """
+
+
+def encode_cursor(updated_at: datetime, snippet_id: int) -> str:
+    """
+    Encodes the sort key of a row as a URL-safe cursor.
+
+    Args:
+        updated_at (datetime): The last update time of the row.
+        snippet_id (int): The ID of the row.
+
+    Returns:
+        str: The cursor.
+    """
+    payload = json.dumps([updated_at.isoformat(), snippet_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decodes a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        tuple[datetime, int]: The last update time and ID of the row.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, snippet_id = json.loads(payload)
+        if not isinstance(snippet_id, int):
+            raise TypeError("id must be an integer")
+        return datetime.fromisoformat(updated_at), snippet_id
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
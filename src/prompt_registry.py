@@ -0,0 +1,157 @@
+"""
+This module provides the registry of system prompts used by the generate endpoints.
+All prompt files are loaded and validated once at application startup and kept in memory.
+Changed files are picked up by polling their modification time, and every prompt carries a
+version hash that identifies its content in cache keys and logs.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from src.logger import logger
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+PROMPT_NAMES = (
+    "detect_language",
+    "generate_code",
+    "generate_code_from_feedback",
+    "generate_tests",
+    "generate_tests_from_feedback",
+    "generate_title",
+    "regenerate",
+)
+PROMPT_RELOAD_INTERVAL_S = float(os.getenv("PROMPT_RELOAD_INTERVAL_S", "2"))
+
+
+class PromptError(Exception):
+    """
+    Raised when a prompt file is missing, empty or unknown.
+    """
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """
+    A loaded system prompt.
+    """
+
+    name: str
+    text: str
+    version: str
+    mtime_ns: int
+
+    @property
+    def key(self) -> str:
+        """
+        The prompt name and version, e.g. "generate_title@1a2b3c4d5e6f".
+        """
+        return f"{self.name}@{self.version}"
+
+
+class PromptRegistry:
+    """
+    Loads prompt files from a directory and serves them from memory.
+
+    Args:
+        directory (str): The directory containing `<name>.txt` prompt files.
+        names (tuple[str, ...]): The prompt names that must be present.
+        reload_interval (float): Minimum seconds between checks for changed files.
+            0 disables hot reload.
+    """
+
+    def __init__(self, directory: str, names: tuple, reload_interval: float = 0):
+        self.directory = directory
+        self.names = tuple(names)
+        self.reload_interval = reload_interval
+        self._prompts: dict[str, Prompt] = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.txt")
+
+    def _read(self, name: str) -> Prompt:
+        path = self._path(name)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+        except FileNotFoundError as e:
+            raise PromptError(f"Prompt file {path} not found") from e
+        if not text:
+            raise PromptError(f"Prompt file {path} is empty")
+
+        version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        return Prompt(name=name, text=text, version=version, mtime_ns=mtime_ns)
+
+    def load(self) -> None:
+        """
+        Loads and validates every prompt.
+
+        Raises:
+            PromptError: If any prompt file is missing or empty.
+        """
+        prompts, errors = {}, []
+        for name in self.names:
+            try:
+                prompts[name] = self._read(name)
+            except PromptError as e:
+                errors.append(str(e))
+        if errors:
+            raise PromptError("; ".join(errors))
+
+        with self._lock:
+            self._prompts = prompts
+            self._last_check = time.monotonic()
+        logger.info(f"Loaded prompts: {self.versions()}")
+
+    def _reload_changed(self) -> None:
+        now = time.monotonic()
+        if not self.reload_interval or now - self._last_check < self.reload_interval:
+            return
+
+        with self._lock:
+            self._last_check = now
+            for name, prompt in list(self._prompts.items()):
+                try:
+                    if os.stat(self._path(name)).st_mtime_ns == prompt.mtime_ns:
+                        continue
+                    self._prompts[name] = self._read(name)
+                except (OSError, PromptError) as e:
+                    logger.error(f"Keeping prompt {prompt.key}, reload failed: {e}")
+                    continue
+                logger.info(f"Reloaded prompt {self._prompts[name].key}")
+
+    def get(self, name: str) -> Prompt:
+        """
+        Returns a prompt, reloading it first if its file has changed.
+
+        Args:
+            name (str): The prompt name, e.g. "generate_title".
+
+        Returns:
+            Prompt: The loaded prompt.
+
+        Raises:
+            PromptError: If the prompt is unknown or the registry has not been loaded.
+        """
+        self._reload_changed()
+        try:
+            return self._prompts[name]
+        except KeyError as e:
+            raise PromptError(f"Prompt {name} is not loaded") from e
+
+    def versions(self) -> dict[str, str]:
+        """
+        Returns the version hash of every loaded prompt.
+
+        Returns:
+            dict[str, str]: The prompt names mapped to their version hashes.
+        """
+        return {name: prompt.version for name, prompt in self._prompts.items()}
+
+
+prompt_registry = PromptRegistry(PROMPTS_DIR, PROMPT_NAMES, PROMPT_RELOAD_INTERVAL_S)
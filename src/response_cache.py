@@ -0,0 +1,153 @@
+"""
+This module provides the in-process cache of serialized snippet responses and the weak ETags
+used for conditional GETs.
+
+Every write to the snippets table goes through `crud`, which calls `invalidate` after
+committing. Invalidation bumps a version number: cached lists carry the version they were
+built at, so they stop matching immediately, and an entry read from the database while a
+write was committing is never stored. The cache assumes a single server process; entries
+also expire after `SNIPPET_CACHE_TTL_S` seconds to bound staleness from other writers.
+"""
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from src.cache import TTLCache
+
+SNIPPET_CACHE_SIZE = int(os.getenv("SNIPPET_CACHE_SIZE", "1024"))
+SNIPPET_CACHE_TTL_S = float(os.getenv("SNIPPET_CACHE_TTL_S", "30"))
+
+# Distinguishes list ETags of this process from those of a previous run, whose
+# version numbers started from the same value
+BOOT_ID = format(time.time_ns(), "x")
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """
+    A serialized response body with its ETag and extra headers.
+    """
+
+    etag: str
+    body: bytes
+    headers: tuple = ()
+
+
+class ResponseCache:
+    """
+    An LRU of serialized responses, invalidated by snippet writes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.cache = TTLCache(maxsize, ttl=ttl)
+        self.version = 0
+
+    def get(self, key) -> CachedResponse | None:
+        """
+        Returns a cached response.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            CachedResponse: The cached response, or None on a miss.
+        """
+        return self.cache.get(key)
+
+    def set(self, key, response: CachedResponse, version: int) -> None:
+        """
+        Caches a response built from data read at `version`. The response is dropped if a
+        write happened since, as it may already be stale.
+
+        Args:
+            key: The cache key.
+            response (CachedResponse): The response.
+            version (int): The value of `version` before the data was read.
+        """
+        if version == self.version:
+            self.cache.set(key, response)
+
+    def invalidate(self, snippet_ids=None) -> None:
+        """
+        Invalidates all cached lists and the given snippets.
+
+        Args:
+            snippet_ids (Iterable[int], optional): The changed snippets. Defaults to all.
+        """
+        self.version += 1
+        if snippet_ids is None:
+            self.cache.clear()
+            return
+        for snippet_id in snippet_ids:
+            self.cache.invalidate(("snippet", snippet_id))
+
+    def clear(self) -> None:
+        """
+        Removes every cached response.
+        """
+        self.invalidate()
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters and the current version.
+
+        Returns:
+            dict: The cache statistics.
+        """
+        return {**self.cache.stats(), "version": self.version}
+
+
+def snippet_etag(snippet_id: int, updated_at: datetime) -> str:
+    """
+    Returns the weak ETag of a snippet, derived from its last update time.
+
+    Args:
+        snippet_id (int): The ID of the snippet.
+        updated_at (datetime): The last update time of the snippet.
+
+    Returns:
+        str: The ETag.
+    """
+    return f'W/"{snippet_id}-{updated_at.timestamp():.6f}"'
+
+
+def list_etag(version: int, key: tuple) -> str:
+    """
+    Returns the weak ETag of a snippet list at a table version.
+
+    Args:
+        version (int): The table version the list was read at.
+        key (tuple): The list parameters.
+
+    Returns:
+        str: The ETag.
+    """
+    params = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:12]
+    return f'W/"{BOOT_ID}-{version}-{params}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Checks an `If-None-Match` header against an ETag, using weak comparison.
+
+    Args:
+        if_none_match (str, optional): The header value, a list of ETags or "*".
+        etag (str): The current ETag.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+response_cache = ResponseCache(SNIPPET_CACHE_SIZE, ttl=SNIPPET_CACHE_TTL_S)
@@ -0,0 +1,160 @@
+"""
+This module provides the delta encoding of snippet revisions.
+
+Every change to the editable fields of a snippet is recorded as a revision. A revision is
+stored as a line diff against the previous revision, so the history grows with the size of
+the edits. Every `REVISION_KEYFRAME_INTERVAL` revisions, a keyframe stores the full fields
+instead, so rebuilding a revision applies at most `REVISION_KEYFRAME_INTERVAL - 1` diffs.
+
+Revision 1, the snippet as created, is only stored when the snippet is first changed, so
+snippets that are never edited have no history rows.
+"""
+
+import difflib
+import json
+import os
+import zlib
+
+REVISION_KEYFRAME_INTERVAL = int(os.getenv("REVISION_KEYFRAME_INTERVAL", "20"))
+
+# Fields of a snippet recorded in its revisions
+REVISION_FIELDS = (
+    "title",
+    "language",
+    "description",
+    "code",
+    "feedback",
+    "test_code",
+    "test_feedback",
+)
+
+
+class RevisionConflict(Exception):
+    """
+    Raised when a snippet keeps changing while an update is being recorded.
+    """
+
+
+def is_keyframe(number: int) -> bool:
+    """
+    Checks whether a revision is stored as a keyframe.
+
+    Args:
+        number (int): The revision number, starting from 1.
+
+    Returns:
+        bool: True if the revision stores the full fields.
+    """
+    return (number - 1) % REVISION_KEYFRAME_INTERVAL == 0
+
+
+def diff_text(old: str, new: str) -> list:
+    """
+    Encodes a text as line operations on a previous version.
+
+    Args:
+        old (str): The previous text.
+        new (str): The new text.
+
+    Returns:
+        list: The operations: `[start, end]` copies lines of the previous text, and a
+            string inserts new lines.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    operations = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            operations.append([i1, i2])
+        elif j2 > j1:  # "replace" or "insert"
+            operations.append("".join(new_lines[j1:j2]))
+    return operations
+
+
+def patch_text(old: str, operations: list) -> str:
+    """
+    Applies the line operations of `diff_text` to the previous version of a text.
+
+    Args:
+        old (str): The previous text.
+        operations (list): The line operations.
+
+    Returns:
+        str: The new text.
+    """
+    old_lines = old.splitlines(keepends=True)
+    return "".join(
+        (
+            operation
+            if isinstance(operation, str)
+            else "".join(old_lines[slice(*operation)])
+        )
+        for operation in operations
+    )
+
+
+def encode(number: int, values: dict, previous: dict | None) -> tuple[bool, bytes]:
+    """
+    Encodes a revision for storage.
+
+    Args:
+        number (int): The revision number.
+        values (dict): The revision fields.
+        previous (dict, optional): The fields of the previous revision, or None for the
+            first revision.
+
+    Returns:
+        tuple[bool, bytes]: Whether the revision is a keyframe, and the compressed JSON of
+            the full fields of a keyframe or the diffs of the changed fields.
+    """
+    if previous is None or is_keyframe(number):
+        keyframe, payload = True, values
+    else:
+        keyframe, payload = False, {
+            field: diff_text(previous[field], values[field])
+            for field in changed_fields(previous, values)
+        }
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return keyframe, zlib.compress(data.encode("utf-8"))
+
+
+def changed_fields(previous: dict, values: dict) -> list[str]:
+    """
+    Returns the revision fields that differ between two versions of a snippet.
+
+    Args:
+        previous (dict): The previous fields.
+        values (dict): The new fields.
+
+    Returns:
+        list[str]: The changed field names, in `REVISION_FIELDS` order.
+    """
+    return [field for field in REVISION_FIELDS if previous[field] != values[field]]
+
+
+def reconstruct(revisions: list[tuple[bool, bytes]]) -> dict:
+    """
+    Rebuilds the fields of a revision from a keyframe and the diffs that follow it.
+
+    Args:
+        revisions (list[tuple[bool, bytes]]): The keyframe flag and stored data of each
+            revision, from the latest keyframe to the requested revision.
+
+    Returns:
+        dict: The revision fields.
+
+    Raises:
+        ValueError: If the revisions do not start with a keyframe.
+    """
+    if not revisions or not revisions[0][0]:
+        raise ValueError("Revisions must start with a keyframe")
+    values = {}
+    for keyframe, data in revisions:
+        payload = json.loads(zlib.decompress(data))
+        if keyframe:
+            values = payload
+        else:
+            for field, operations in payload.items():
+                values[field] = patch_text(values[field], operations)
+    return values
@@ -1,61 +1,76 @@
 """
 This module defines the endpoints for generating code snippets, titles, and tests.
 It also includes endpoints for detecting languages and improving code and tests based on feedback.
+The describe endpoint generates code, title and language concurrently over a single SSE stream.
+All generations are streamed as SSE events and can be resumed after a dropped connection.
+System prompts come from the in-memory prompt registry, and their versions are logged with each generation.
+Title generation and language detection are served from a coalescing response cache.
 """
 
+import asyncio
+import inspect
 import json
 import os
+from typing import AsyncIterator, Awaitable
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Header, HTTPException
 import openai
 
-from src import schemas
+from src.llm_cache import CoalescingCache, llm_cache_key
+from src.logger import logger
+from src.prompt_registry import Prompt, PromptError, prompt_registry
+from src.sse import as_events, resume_response, sse_response
+from src import llm, schemas
 
 router = APIRouter(prefix="/generate", tags=["generate"])
 
+OPENAI_MODEL = "gpt-3.5-turbo"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL_S = (
+    float(os.getenv("LLM_CACHE_TTL_S")) if os.getenv("LLM_CACHE_TTL_S") else None
+)
 
-def load_system_prompt(filename):
+llm_cache = CoalescingCache(LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL_S)
+
+
+def load_system_prompt(name: str) -> Prompt:
     """
-    Loads a system prompt from a file.
+    Returns a system prompt from the prompt registry and logs the version used.
 
     Args:
-        filename (str): The name of the file to load the prompt from.
+        name (str): The name of the prompt, e.g. "generate_title".
 
     Returns:
-        str: The content of the prompt file.
+        Prompt: The prompt, with its text and version hash.
 
     Raises:
-        HTTPException: If the prompt file is not found.
+        HTTPException: If the prompt is not loaded.
     """
     try:
-        with open(os.path.join("src", "prompts", filename), "r", encoding="utf-8") as f:
-            return f.read().strip()
-    except FileNotFoundError as e:
-        raise HTTPException(
-            status_code=500, detail=f"Prompt file {filename} not found"
-        ) from e
+        prompt = prompt_registry.get(name)
+    except PromptError as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    logger.info(f"Generating with prompt {prompt.key}")
+    return prompt
 
 
-async def chatgpt_stream_response(messages: list):
+async def chatgpt_stream_response(messages: list, endpoint: str = "default"):
     """
     Send messages to the ChatGPT API and stream the response.
 
     Args:
         messages (list): The list of messages to send to the ChatGPT API.
+        endpoint (str, optional): The calling endpoint, used to pick the request timeout.
 
     Yields:
         str: The content of each chunk in the stream response.
     """
     try:
-        client = openai.AsyncOpenAI()
-        if os.getenv("OPENAI_API_BASE"):
-            client.base_url = os.getenv("OPENAI_API_BASE")  # Set custom API base URL
-
-        stream = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        stream = await llm.get_client().chat.completions.create(
+            model=OPENAI_MODEL,
             messages=messages,
             stream=True,
+            timeout=llm.endpoint_timeout(endpoint),
         )
 
         async for chunk in stream:
@@ -68,26 +83,26 @@ async def chatgpt_stream_response(messages: list):
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {e}") from e
 
 
-async def chatgpt_response(messages: list, response_format: dict | None = None):
+async def chatgpt_response(
+    messages: list, response_format: dict | None = None, endpoint: str = "default"
+):
     """
     Send messages to the ChatGPT API and return the complete response.
 
     Args:
         messages (list): The list of messages to send to the ChatGPT API.
         response_format (dict, optional): The format of the response. Defaults to None.
+        endpoint (str, optional): The calling endpoint, used to pick the request timeout.
 
     Returns:
         str: The content of the response from the ChatGPT API.
     """
     try:
-        client = openai.OpenAI()
-        if os.getenv("OPENAI_API_BASE"):
-            client.base_url = os.getenv("OPENAI_API_BASE")
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await llm.get_client().chat.completions.create(
+            model=OPENAI_MODEL,
             response_format=response_format or {},
             messages=messages,
+            timeout=llm.endpoint_timeout(endpoint),
         )
 
         return response.choices[0].message.content
@@ -96,77 +111,197 @@ async def chatgpt_response(messages: list, response_format: dict | None = None):
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {e}") from e
 
 
-@router.post("/title")
-async def generate_title(title_gen_data: schemas.TitleGenRequest):
+def title_stream(description: str) -> AsyncIterator[str]:
     """
-    Generates a title for the given code description.
+    Streams a title for a code description through the LLM response cache.
 
     Args:
-        title_gen_data (schemas.TitleGenRequest): The request data containing the code description.
+        description (str): The code description.
 
     Returns:
-        StreamingResponse: The generated title as a streaming response.
+        AsyncIterator[str]: The title chunks.
     """
+    prompt = load_system_prompt("generate_title")
     messages = [
-        {"role": "system", "content": load_system_prompt("generate_title.txt")},
+        {"role": "system", "content": prompt.text},
         {
             "role": "user",
-            "content": json.dumps({"description": title_gen_data.description}),
+            "content": json.dumps({"description": description}),
         },
     ]
 
-    return StreamingResponse(
-        chatgpt_stream_response(messages), media_type="text/event-stream"
+    cache_key = llm_cache_key(prompt.key, OPENAI_MODEL, messages)
+    return llm_cache.stream(
+        cache_key, lambda: chatgpt_stream_response(messages, "title")
     )
 
 
-@router.post("/code")
-async def generate_code(code_gen_data: schemas.CodeGenRequest):
+def code_stream(description: str) -> AsyncIterator[str]:
     """
-    Generates code for the given code description.
+    Streams code for a code description.
 
     Args:
-        code_gen_data (schemas.CodeGenRequest): The request data containing the code description.
+        description (str): The code description.
 
     Returns:
-        StreamingResponse: The generated code as a streaming response.
+        AsyncIterator[str]: The code chunks.
     """
     messages = [
-        {"role": "system", "content": load_system_prompt("generate_code.txt")},
+        {"role": "system", "content": load_system_prompt("generate_code").text},
         {
             "role": "user",
-            "content": json.dumps({"description": code_gen_data.description}),
+            "content": json.dumps({"description": description}),
         },
     ]
 
-    return StreamingResponse(
-        chatgpt_stream_response(messages), media_type="text/event-stream"
-    )
+    return chatgpt_stream_response(messages, "code")
 
 
-@router.post("/detect_language", response_model=schemas.LanguageDetResponse)
-async def detect_language(language_gen_data: schemas.LanguageDetRequest):
+def language_detection(description: str) -> Awaitable[str]:
     """
-    Detects the programming language for the given code description.
+    Detects the programming language of a code description through the LLM response cache.
 
     Args:
-        language_gen_data (schemas.LanguageDetRequest): The request data containing the code description.
+        description (str): The code description.
 
     Returns:
-        schemas.LanguageDetResponse: The detected programming language.
+        Awaitable[str]: The detection result as a JSON string, e.g. '{"language": "python"}'.
     """
+    prompt = load_system_prompt("detect_language")
     messages = [
-        {"role": "system", "content": load_system_prompt("detect_language.txt")},
+        {"role": "system", "content": prompt.text},
         {
             "role": "user",
-            "content": json.dumps({"description": language_gen_data.description}),
+            "content": json.dumps({"description": description}),
         },
     ]
 
-    response = await chatgpt_response(messages, response_format={"type": "json_object"})
+    response_format = {"type": "json_object"}
+    cache_key = llm_cache_key(
+        prompt.key, OPENAI_MODEL, messages, response_format=response_format
+    )
+    return llm_cache.complete(
+        cache_key,
+        lambda: chatgpt_response(
+            messages, response_format=response_format, endpoint="detect_language"
+        ),
+    )
+
+
+async def multiplex_events(sources: dict) -> AsyncIterator[tuple[str, object]]:
+    """
+    Runs several generations concurrently and yields their output as tagged events.
+
+    Args:
+        sources (dict): Event names mapped to either an async iterator of chunks,
+            which produces one event per chunk, or an awaitable, which produces one event.
+
+    Yields:
+        tuple[str, object]: The event name and payload, named after their source, and an
+            `error` event for each failed source.
+    """
+    queue = asyncio.Queue()
+
+    async def pump(event: str, source) -> None:
+        try:
+            if inspect.isawaitable(source):
+                await queue.put((event, await source))
+            else:
+                async for chunk in source:
+                    await queue.put((event, chunk))
+        except Exception as e:
+            logger.exception(f"Error generating {event}: {e}")
+            message = e.detail if isinstance(e, HTTPException) else str(e)
+            await queue.put(("error", {"source": event, "message": message}))
+        finally:
+            await queue.put(None)
+
+    tasks = [
+        asyncio.ensure_future(pump(event, source)) for event, source in sources.items()
+    ]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is None:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/title")
+async def generate_title(title_gen_data: schemas.TitleGenRequest):
+    """
+    Generates a title for the given code description.
+
+    Args:
+        title_gen_data (schemas.TitleGenRequest): The request data containing the code description.
+
+    Returns:
+        StreamingResponse: The generated title as a streaming response.
+    """
+    return sse_response(as_events(title_stream(title_gen_data.description)), "title")
+
+
+@router.post("/code")
+async def generate_code(code_gen_data: schemas.CodeGenRequest):
+    """
+    Generates code for the given code description.
+
+    Args:
+        code_gen_data (schemas.CodeGenRequest): The request data containing the code description.
+
+    Returns:
+        StreamingResponse: The generated code as a streaming response.
+    """
+    return sse_response(as_events(code_stream(code_gen_data.description)), "code")
+
+
+@router.post("/detect_language", response_model=schemas.LanguageDetResponse)
+async def detect_language(language_gen_data: schemas.LanguageDetRequest):
+    """
+    Detects the programming language for the given code description.
+
+    Args:
+        language_gen_data (schemas.LanguageDetRequest): The request data containing the code description.
+
+    Returns:
+        schemas.LanguageDetResponse: The detected programming language.
+    """
+    response = await language_detection(language_gen_data.description)
     return json.loads(response)
 
 
+@router.post("/describe")
+async def describe(describe_data: schemas.DescribeRequest):
+    """
+    Generates code, a title and the language for a description over a single SSE stream.
+    The three upstream requests run concurrently and their output is interleaved as
+    `code`, `title` and `language` events, followed by a `done` event.
+
+    Args:
+        describe_data (schemas.DescribeRequest): The request data containing the code description.
+
+    Returns:
+        StreamingResponse: The multiplexed events as a streaming response.
+    """
+    description = describe_data.description
+    detection = language_detection(description)
+
+    async def detected_language() -> dict:
+        return json.loads(await detection)
+
+    sources = {
+        "title": title_stream(description),
+        "language": detected_language(),
+        "code": code_stream(description),
+    }
+    return sse_response(multiplex_events(sources), "describe")
+
+
 @router.post("/code_from_feedback")
 async def generate_code_from_feedback(feedback_data: schemas.CodeFeedbackRequest):
     """
@@ -181,7 +316,7 @@ async def generate_code_from_feedback(feedback_data: schemas.CodeFeedbackRequest
     messages = [
         {
             "role": "system",
-            "content": load_system_prompt("generate_code_from_feedback.txt"),
+            "content": load_system_prompt("generate_code_from_feedback").text,
         },
         {
             "role": "user",
@@ -196,8 +331,9 @@ async def generate_code_from_feedback(feedback_data: schemas.CodeFeedbackRequest
         },
     ]
 
-    return StreamingResponse(
-        chatgpt_stream_response(messages), media_type="text/event-stream"
+    return sse_response(
+        as_events(chatgpt_stream_response(messages, "code_from_feedback")),
+        "code_from_feedback",
     )
 
 
@@ -213,7 +349,7 @@ async def generate_tests(test_gen_data: schemas.TestGenRequest):
         StreamingResponse: The generated tests as a streaming response.
     """
     messages = [
-        {"role": "system", "content": load_system_prompt("generate_tests.txt")},
+        {"role": "system", "content": load_system_prompt("generate_tests").text},
         {
             "role": "user",
             "content": json.dumps(
@@ -227,9 +363,7 @@ async def generate_tests(test_gen_data: schemas.TestGenRequest):
         },
     ]
 
-    return StreamingResponse(
-        chatgpt_stream_response(messages), media_type="text/event-stream"
-    )
+    return sse_response(as_events(chatgpt_stream_response(messages, "tests")), "tests")
 
 
 @router.post("/tests_from_feedback")
@@ -246,7 +380,7 @@ async def generate_tests_from_feedback(feedback_data: schemas.TestsFeedbackReque
     messages = [
         {
             "role": "system",
-            "content": load_system_prompt("generate_tests_from_feedback.txt"),
+            "content": load_system_prompt("generate_tests_from_feedback").text,
         },
         {
             "role": "user",
@@ -263,8 +397,9 @@ async def generate_tests_from_feedback(feedback_data: schemas.TestsFeedbackReque
         },
     ]
 
-    return StreamingResponse(
-        chatgpt_stream_response(messages), media_type="text/event-stream"
+    return sse_response(
+        as_events(chatgpt_stream_response(messages, "tests_from_feedback")),
+        "tests_from_feedback",
     )
 
 
@@ -280,7 +415,7 @@ async def regenerate_code(regenerate_data: schemas.RegenerateRequest):
         StreamingResponse: The regenerated code as a streaming response.
     """
     messages = [
-        {"role": "system", "content": load_system_prompt("regenerate.txt")},
+        {"role": "system", "content": load_system_prompt("regenerate").text},
         {
             "role": "user",
             "content": json.dumps(
@@ -297,6 +432,52 @@ async def regenerate_code(regenerate_data: schemas.RegenerateRequest):
         },
     ]
 
-    return StreamingResponse(
-        chatgpt_stream_response(messages), media_type="text/event-stream"
+    return sse_response(
+        as_events(chatgpt_stream_response(messages, "regenerate")), "regenerate"
     )
+
+
+@router.get("/streams/{stream_id}")
+async def resume_stream(stream_id: str, last_event_id: str | None = Header(None)):
+    """
+    Resumes a recent generation stream after the client's last received event.
+    The generation itself is not repeated; buffered events are replayed and the live
+    stream is followed if it is still running.
+
+    Args:
+        stream_id (str): The stream ID from the `X-Stream-Id` header or an event ID.
+        last_event_id (str, optional): The `Last-Event-ID` header.
+
+    Returns:
+        StreamingResponse: The remaining events as a streaming response.
+
+    Raises:
+        HTTPException: If the stream is unknown or has expired.
+    """
+    response = resume_response(stream_id, last_event_id)
+    if response is None:
+        logger.warning(f"Stream not found: {stream_id}")
+        raise HTTPException(status_code=404, detail="Stream not found")
+    return response
+
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    Returns the LLM response cache counters.
+
+    Returns:
+        dict: The cache size, hit, miss, eviction and coalesced request counts.
+    """
+    return llm_cache.stats()
+
+
+@router.get("/prompts")
+async def prompt_versions():
+    """
+    Returns the version hash of every loaded system prompt.
+
+    Returns:
+        dict[str, str]: The prompt names mapped to their version hashes.
+    """
+    return prompt_registry.versions()
@@ -1,56 +1,287 @@
 """
-This module defines the endpoint for running Python code snippets and their associated tests.
+This module defines the endpoint for running code snippets and their associated tests, in
+any language registered in `src.languages` (`POST /api/run/python`, `/javascript`, ...).
 It validates the input data and returns the test results.
+Results are cached by the content of the run, so re-running an unchanged snippet skips the sandbox.
+`POST /api/run/{language}/stream` runs the tests the same way and streams their output as
+SSE events while they run.
+`POST /api/run/batch` runs the tests of every snippet of a language in the background (see
+`src.batch`), and `GET /api/run/batch/{job_id}` reports its progress.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import os
+from typing import Callable
 
-from src.database import get_db
-from src.runner import run_python_code
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.batch import batch_jobs
+from src.database import create_session_factory, get_db
+from src.executor import ExecutionPoolFull, execution_pool
+from src.languages import Language, get_language
+from src.output import LiveOutput
+from src.runner import run_cache_key, run_code_async, run_result_cache
 from src.logger import logger
+from src.sse import sse_response
 from src import crud, schemas
 
+# Bytes of output streamed live per run; the result still reports the end of the output
+SANDBOX_STREAM_LIMIT_BYTES = int(os.getenv("SANDBOX_STREAM_LIMIT_BYTES", "1048576"))
+
 router = APIRouter(prefix="/run", tags=["run"])
 
 
-@router.post("/python", status_code=200)
-async def run_python(
-    test_run_data: schemas.TestRunRequest, db: Session = Depends(get_db)
-):
+async def check_run_request(
+    language: str, test_run_data: schemas.TestRunRequest, db: AsyncSession
+) -> Language:
     """
-    Runs Python code and tests, returning the results.
+    Checks that a test run targets an existing snippet in a language the sandbox can run.
 
     Args:
-        test_run_data (schemas.TestRunRequest): The request data containing the code, test code, and snippet ID.
-        db (Session): The database session.
+        language (str): The language of the runner.
+        test_run_data (schemas.TestRunRequest): The request data.
+        db (AsyncSession): The database session.
 
     Returns:
-        dict: The result and message of the code execution.
+        Language: The language to run.
 
     Raises:
-        HTTPException: If the snippet is not found or an error occurs during code execution.
+        HTTPException: If the language is not supported or the snippet is not found.
     """
-    if test_run_data.language != "python":
+    runtime = get_language(language)
+    if runtime is None or test_run_data.language != runtime.name:
         logger.warning(
-            f"Unsupported language for running tests: {test_run_data.language}"
+            f"Unsupported language for running tests: {test_run_data.language} "
+            f"(requested {language})"
         )
         raise HTTPException(
             status_code=400,
-            detail="Only Python snippets are supported for running tests",
+            detail=f"{test_run_data.language or 'Unknown'} snippets cannot be run "
+            f"with the {language} runner",
         )
 
-    db_snippet = crud.get_snippet(db, test_run_data.snippet_id)
+    db_snippet = await crud.get_snippet(db, test_run_data.snippet_id, texts=False)
     if not db_snippet:
         logger.warning(f"Snippet not found: {test_run_data.snippet_id}")
         raise HTTPException(status_code=404, detail="Snippet not found")
+    await db.commit()  # Release the connection back to the pool while the sandbox runs
+    return runtime
+
+
+async def execute_run(
+    runtime: Language,
+    test_run_data: schemas.TestRunRequest,
+    db: AsyncSession,
+    on_output: Callable[[str, str], None] | None = None,
+) -> tuple[dict, bool]:
+    """
+    Runs the tests, or returns the cached result of the same run, and stores the result
+    on the snippet.
+
+    Args:
+        runtime (Language): The language to run.
+        test_run_data (schemas.TestRunRequest): The request data.
+        db (AsyncSession): The database session.
+        on_output (Callable[[str, str], None], optional): Called with each output chunk
+            while the tests run. Not called for a cached result.
+
+    Returns:
+        tuple[dict, bool]: The result, and whether it came from the cache.
 
+    Raises:
+        HTTPException: If the execution pool is full or an error occurs during code
+            execution.
+    """
     try:
-        result = run_python_code(test_run_data.code, test_run_data.test_code)
-        db_snippet.test_result = result["result"]
-        db_snippet.test_result_message = result["message"]
-        db.commit()
-        return result
+        cache_key = run_cache_key(
+            test_run_data.code, test_run_data.test_code, language=runtime.name
+        )
+        result = run_result_cache.get(cache_key)
+        cached = result is not None
+        if result is None:
+            result = await run_code_async(
+                runtime.name,
+                test_run_data.code,
+                test_run_data.test_code,
+                on_output=on_output,
+            )
+            if result["result"] != "error":  # Sandbox errors are not cached
+                run_result_cache.set(cache_key, result)
+
+        await crud.update_test_result(
+            db, test_run_data.snippet_id, result["result"], result["message"], result
+        )
+        return result, cached
+    except ExecutionPoolFull as e:
+        logger.warning(f"Rejecting test run: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many test runs in progress, please retry later",
+            headers={"Retry-After": "1"},
+        ) from e
     except Exception as e:
-        logger.exception(f"Error running Python code: {e}")
-        raise HTTPException(status_code=500, detail="Error running Python code") from e
+        logger.exception(f"Error running {runtime.display_name} code: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Error running {runtime.display_name} code"
+        ) from e
+
+
+@router.post("/batch", status_code=202, response_model=schemas.BatchRunStatus)
+async def start_batch_run(
+    batch_data: schemas.BatchRunRequest, db: AsyncSession = Depends(get_db)
+):
+    """
+    Starts running the tests of every active snippet of a language that has tests, storing
+    each result on its snippet. Declared before `POST /{language}`, which would match it.
+
+    Args:
+        batch_data (schemas.BatchRunRequest): The request data containing the language.
+        db (AsyncSession): The database session, whose engine the job uses.
+
+    Returns:
+        schemas.BatchRunStatus: The job, to poll with `GET /api/run/batch/{job_id}`.
+
+    Raises:
+        HTTPException: If the language is not supported, or a batch run of the language
+            is already in progress.
+    """
+    runtime = get_language(batch_data.language)
+    if runtime is None:
+        logger.warning(f"Unsupported language for a batch run: {batch_data.language}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"{batch_data.language or 'Unknown'} snippets cannot be run",
+        )
+    if batch_jobs.running(runtime.name) is not None:
+        logger.warning(f"Batch run of {runtime.name} snippets already in progress")
+        raise HTTPException(
+            status_code=409,
+            detail=f"A batch run of {runtime.display_name} snippets is in progress",
+        )
+    return batch_jobs.start(runtime.name, db.bind)
+
+
+@router.get("/batch/{job_id}", response_model=schemas.BatchRunStatus)
+async def get_batch_run(job_id: str):
+    """
+    Returns the progress of a batch run.
+
+    Args:
+        job_id (str): The ID of the job.
+
+    Returns:
+        schemas.BatchRunStatus: The job.
+
+    Raises:
+        HTTPException: If the job is unknown or expired.
+    """
+    job = batch_jobs.get(job_id)
+    if job is None:
+        logger.warning(f"Batch run not found: {job_id}")
+        raise HTTPException(status_code=404, detail="Batch run not found")
+    return job
+
+
+@router.post("/{language}", status_code=200, response_model=schemas.TestRunResult)
+async def run_tests(
+    language: str,
+    test_run_data: schemas.TestRunRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Runs code and tests in the sandbox of a language, returning the results.
+    A cached result is returned when the same code and tests were run recently.
+
+    Args:
+        language (str): The language to run, which must match the snippet's language.
+        test_run_data (schemas.TestRunRequest): The request data containing the code, test code, and snippet ID.
+        response (Response): The response, used to report cache hits in the `X-Cache` header.
+        db (AsyncSession): The database session.
+
+    Returns:
+        dict: The result and message of the code execution, with its resource usage.
+
+    Raises:
+        HTTPException: If the language is not supported, the snippet is not found, the
+            execution pool is full, or an error occurs during code execution.
+    """
+    runtime = await check_run_request(language, test_run_data, db)
+    result, cached = await execute_run(runtime, test_run_data, db)
+    response.headers["X-Cache"] = "HIT" if cached else "MISS"
+    return result
+
+
+async def run_events(
+    runtime: Language, test_run_data: schemas.TestRunRequest, engine: AsyncEngine
+):
+    """
+    Runs the tests while passing on their output.
+
+    The events are produced by a background task that can outlive the request, so the
+    result is stored with a session of its own rather than the request's.
+
+    Args:
+        runtime (Language): The language to run.
+        test_run_data (schemas.TestRunRequest): The request data.
+        engine (AsyncEngine): The database engine of the request.
+
+    Yields:
+        tuple[str, object]: `stdout` and `stderr` text chunks, up to
+            `SANDBOX_STREAM_LIMIT_BYTES` in total, then the `result`.
+    """
+    output = LiveOutput(SANDBOX_STREAM_LIMIT_BYTES)
+
+    async def execute() -> tuple[dict, bool]:
+        async with create_session_factory(engine)() as db:
+            return await execute_run(runtime, test_run_data, db, output.write)
+
+    run = asyncio.ensure_future(execute())
+    run.add_done_callback(lambda _: output.close())
+    try:
+        async for stream, text in output:
+            yield stream, text
+        result, _ = await run
+    finally:
+        run.cancel()  # Only has an effect if the client went away
+    yield "result", result
+
+
+@router.post("/{language}/stream")
+async def stream_tests(
+    language: str,
+    test_run_data: schemas.TestRunRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Runs code and tests in the sandbox of a language, streaming their output as SSE
+    `stdout` and `stderr` events while they run, then the `result` event with the body of
+    `POST /api/run/{language}`. A cached result is sent without output events.
+    The stream can be resumed with `GET /api/generate/streams/{stream_id}`.
+
+    Args:
+        language (str): The language to run, which must match the snippet's language.
+        test_run_data (schemas.TestRunRequest): The request data containing the code, test code, and snippet ID.
+        db (AsyncSession): The database session.
+
+    Returns:
+        StreamingResponse: The events as a streaming response. A full execution pool or a
+            failed run is reported by an `error` event.
+
+    Raises:
+        HTTPException: If the language is not supported or the snippet is not found.
+    """
+    runtime = await check_run_request(language, test_run_data, db)
+    return sse_response(run_events(runtime, test_run_data, db.bind), "run")
+
+
+@router.get("/stats")
+async def run_stats():
+    """
+    Returns the result cache counters and the execution pool occupancy.
+
+    Returns:
+        dict: The `cache` and `pool` statistics.
+    """
+    return {"cache": run_result_cache.stats(), "pool": execution_pool.stats()}
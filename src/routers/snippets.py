@@ -3,55 +3,297 @@ This module defines the endpoints for CRUD operations on code snippets.
 It includes endpoints for creating, retrieving, updating, and deleting snippets.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import get_db
 from src.logger import logger
+from src import ndjson
+from src.pagination import InvalidCursor
+from src.response_cache import (
+    CachedResponse,
+    etag_matches,
+    list_etag,
+    response_cache,
+    snippet_etag,
+)
+from src.revisions import RevisionConflict
 from src import crud, schemas
 
 router = APIRouter(prefix="/snippets", tags=["snippets"])
 
+SNIPPET_LIST_ADAPTERS = {
+    schema: TypeAdapter(list[schema])
+    for schema in (schemas.Snippet, schemas.SnippetSummary)
+}
+
+
+def cached_response(cached: CachedResponse, if_none_match: str | None) -> Response:
+    """
+    Returns a cached response, or an empty 304 response if the client's copy is current.
+
+    Args:
+        cached (CachedResponse): The cached response.
+        if_none_match (str, optional): The `If-None-Match` header of the request.
+
+    Returns:
+        Response: The response.
+    """
+    headers = {"ETag": cached.etag, **dict(cached.headers)}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
 
-@router.get("/", response_model=list[schemas.Snippet])
-async def get_snippets(db: Session = Depends(get_db)):
+@router.get("/", response_model=list[schemas.Snippet] | list[schemas.SnippetSummary])
+async def get_snippets(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    language: str | None = None,
+    test_result: str | None = None,
+    fields: Literal["full", "summary"] = "full",
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Retrieves a page of active snippets, most recently updated first.
+    When there are more snippets, the cursor of the next page is returned in the
+    `X-Next-Cursor` header.
+
+    Serialized pages are cached until the next write to the snippets table, and a
+    client sending the page's ETag in `If-None-Match` gets a 304 response.
+
+    Args:
+        limit (int): The maximum number of snippets to return.
+        cursor (str, optional): The cursor of the page to return.
+        language (str, optional): Only return snippets in this language.
+        test_result (str, optional): Only return snippets with this test result.
+        fields (str): "summary" to return only the id, title, language and update time.
+        if_none_match (str, optional): The ETags of the client's cached copies.
+        db (AsyncSession): The database session.
+
+    Returns:
+        list[schemas.Snippet] | list[schemas.SnippetSummary]: The page of snippets.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    key = ("list", limit, cursor, language, test_result, fields)
+    version = response_cache.version
+    cached = response_cache.get((*key, version))
+    if cached is None:
+        try:
+            snippets, next_cursor = await crud.get_snippets(
+                db,
+                limit=limit,
+                cursor=cursor,
+                language=language,
+                test_result=test_result,
+                summary=fields == "summary",
+            )
+        except InvalidCursor as e:
+            logger.warning(str(e))
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        schema = schemas.SnippetSummary if fields == "summary" else schemas.Snippet
+        adapter = SNIPPET_LIST_ADAPTERS[schema]
+        cached = CachedResponse(
+            etag=list_etag(version, key),
+            body=adapter.dump_json(
+                adapter.validate_python(snippets, from_attributes=True)
+            ),
+            headers=(("X-Next-Cursor", next_cursor),) if next_cursor else (),
+        )
+        response_cache.set((*key, version), cached, version)
+    return cached_response(cached, if_none_match)
+
+
+@router.get("/search", response_model=list[schemas.SnippetSearchResult])
+async def search_snippets(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    language: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
     """
-    Retrieves a list of active snippets.
+    Searches the titles, descriptions and code of active snippets, best matches first.
+    When there are more results, the offset of the next page is returned in the
+    `X-Next-Offset` header.
 
     Args:
-        db (Session): The database session.
+        response (Response): The response, used to set the `X-Next-Offset` header.
+        q (str): The search text. Every word must match, as a prefix.
+        limit (int): The maximum number of results to return.
+        offset (int): The number of results to skip.
+        language (str, optional): Only return snippets in this language.
+        db (AsyncSession): The database session.
 
     Returns:
-        list[schemas.Snippet]: The list of active snippets.
+        list[schemas.SnippetSearchResult]: The matching snippets with highlighted excerpts.
     """
-    return crud.get_snippets(db)
+    results, next_offset = await crud.search_snippets(
+        db, q, limit=limit, offset=offset, language=language
+    )
+    if next_offset is not None:
+        response.headers["X-Next-Offset"] = str(next_offset)
+    return results
 
 
 @router.post("/", response_model=schemas.Snippet)
 async def create_snippet(
-    snippet_data: schemas.SnippetCreate, db: Session = Depends(get_db)
+    snippet_data: schemas.SnippetCreate, db: AsyncSession = Depends(get_db)
 ):
     """
     Creates a new snippet.
 
     Args:
         snippet_data (schemas.SnippetCreate): The data for the new snippet.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         schemas.Snippet: The created snippet.
     """
-    return crud.create_snippet(db, snippet_data)
+    return await crud.create_snippet(db, snippet_data)
+
+
+@router.post("/import", response_model=schemas.SnippetImportResult)
+async def import_snippets(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Imports snippets from an NDJSON request body, one `schemas.SnippetImport` per line.
+    The body is parsed as it arrives and inserted in chunks of `IMPORT_CHUNK_SIZE` rows,
+    each committed in one transaction.
+
+    Args:
+        request (Request): The request, whose body is read as a stream.
+        db (AsyncSession): The database session.
+
+    Returns:
+        schemas.SnippetImportResult: The number of imported snippets.
+
+    Raises:
+        HTTPException: If a line is invalid (422) or longer than
+            `ndjson.NDJSON_MAX_LINE_BYTES` (400). Chunks before it stay imported, and the
+            error reports how many snippets were.
+    """
+    imported, rows = 0, []
+    try:
+        async for number, value in ndjson.read_lines(request.stream()):
+            try:
+                snippet = schemas.SnippetImport.model_validate(value)
+            except ValidationError as e:
+                raise ValueError(f"Line {number}: {e.errors()[0]['msg']}") from e
+            rows.append(snippet.model_dump(exclude_none=True))
+            if len(rows) >= crud.IMPORT_CHUNK_SIZE:
+                await crud.create_snippets(db, rows)
+                imported, rows = imported + len(rows), []
+        await crud.create_snippets(db, rows)
+        imported += len(rows)
+    except ndjson.LineTooLong as e:
+        logger.warning(f"Snippet import stopped after {imported} snippets: {e}")
+        raise HTTPException(
+            status_code=400, detail={"message": str(e), "imported": imported}
+        )
+    except ValueError as e:
+        logger.warning(f"Snippet import stopped after {imported} snippets: {e}")
+        raise HTTPException(
+            status_code=422, detail={"message": str(e), "imported": imported}
+        )
+    logger.info(f"Imported {imported} snippets")
+    return {"imported": imported}
+
+
+@router.get("/export")
+async def export_snippets(db: AsyncSession = Depends(get_db)):
+    """
+    Exports all active snippets as NDJSON, one `schemas.Snippet` per line, in ID order.
+    Rows are streamed from the database in chunks, so memory use does not grow with the
+    size of the library.
+
+    Args:
+        db (AsyncSession): The database session.
+
+    Returns:
+        StreamingResponse: The NDJSON stream.
+    """
+
+    async def lines():
+        async for rows in crud.export_snippets(db):
+            yield "".join(
+                schemas.Snippet.model_validate(row).model_dump_json() + "\n"
+                for row in rows
+            )
+
+    return StreamingResponse(
+        lines(),
+        media_type=ndjson.MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="snippets.ndjson"'},
+    )
+
+
+@router.post("/bulk/update", response_model=schemas.SnippetBulkResult)
+async def update_snippets(
+    bulk_data: schemas.SnippetBulkUpdate, db: AsyncSession = Depends(get_db)
+):
+    """
+    Applies the same update to several snippets.
+
+    Args:
+        bulk_data (schemas.SnippetBulkUpdate): The snippet IDs and the changes to apply.
+        db (AsyncSession): The database session.
+
+    Returns:
+        schemas.SnippetBulkResult: The IDs of the updated snippets.
+
+    Raises:
+        HTTPException: If a snippet kept changing during the update.
+    """
+    try:
+        ids = await crud.update_snippets(db, bulk_data.ids, bulk_data.changes)
+    except RevisionConflict as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=409, detail="Snippet changed, please retry")
+    return {"ids": ids}
+
+
+@router.post("/bulk/delete", response_model=schemas.SnippetBulkResult)
+async def delete_snippets(
+    bulk_data: schemas.SnippetBulkDelete, db: AsyncSession = Depends(get_db)
+):
+    """
+    Deletes several snippets.
+
+    Args:
+        bulk_data (schemas.SnippetBulkDelete): The IDs of the snippets to delete.
+        db (AsyncSession): The database session.
+
+    Returns:
+        schemas.SnippetBulkResult: The IDs of the deleted snippets.
+    """
+    ids = await crud.delete_snippets(db, bulk_data.ids)
+    return {"ids": ids}
 
 
 @router.get("/{snippet_id}", response_model=schemas.Snippet)
-async def get_snippet(snippet_id: int, db: Session = Depends(get_db)):
+async def get_snippet(
+    snippet_id: int,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Retrieves a snippet by its ID.
 
+    The serialized snippet is cached until it changes, and a client sending its ETag in
+    `If-None-Match` gets a 304 response.
+
     Args:
         snippet_id (int): The ID of the snippet to retrieve.
-        db (Session): The database session.
+        if_none_match (str, optional): The ETags of the client's cached copies.
+        db (AsyncSession): The database session.
 
     Returns:
         schemas.Snippet: The retrieved snippet.
@@ -59,32 +301,102 @@ async def get_snippet(snippet_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the snippet is not found.
     """
-    db_snippet = crud.get_snippet(db, snippet_id)
-    if not db_snippet:
+    version = response_cache.version
+    cached = response_cache.get(("snippet", snippet_id))
+    if cached is None:
+        db_snippet = await crud.get_snippet(db, snippet_id)
+        if not db_snippet:
+            logger.warning(f"Snippet not found: {snippet_id}")
+            raise HTTPException(status_code=404, detail="Snippet not found")
+        cached = CachedResponse(
+            etag=snippet_etag(db_snippet.id, db_snippet.updated_at),
+            body=schemas.Snippet.model_validate(db_snippet).model_dump_json().encode(),
+        )
+        response_cache.set(("snippet", snippet_id), cached, version)
+    return cached_response(cached, if_none_match)
+
+
+@router.get(
+    "/{snippet_id}/revisions", response_model=list[schemas.SnippetRevisionSummary]
+)
+async def get_snippet_revisions(
+    snippet_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    before: int | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Lists the revisions of a snippet, latest first.
+
+    Args:
+        snippet_id (int): The ID of the snippet.
+        limit (int): The maximum number of revisions to return.
+        before (int, optional): Only return revisions before this number.
+        db (AsyncSession): The database session.
+
+    Returns:
+        list[schemas.SnippetRevisionSummary]: The revisions.
+
+    Raises:
+        HTTPException: If the snippet is not found.
+    """
+    revisions = await crud.get_revisions(db, snippet_id, limit=limit, before=before)
+    if revisions is None:
         logger.warning(f"Snippet not found: {snippet_id}")
         raise HTTPException(status_code=404, detail="Snippet not found")
-    return db_snippet
+    return revisions
+
+
+@router.get("/{snippet_id}/revisions/{number}", response_model=schemas.SnippetRevision)
+async def get_snippet_revision(
+    snippet_id: int, number: int, db: AsyncSession = Depends(get_db)
+):
+    """
+    Retrieves the fields of a snippet at a revision.
+
+    Args:
+        snippet_id (int): The ID of the snippet.
+        number (int): The revision number.
+        db (AsyncSession): The database session.
+
+    Returns:
+        schemas.SnippetRevision: The revision.
+
+    Raises:
+        HTTPException: If the snippet or revision is not found.
+    """
+    revision = await crud.get_revision(db, snippet_id, number)
+    if revision is None:
+        logger.warning(f"Snippet revision not found: {snippet_id}/{number}")
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return revision
 
 
 @router.put("/{snippet_id}", response_model=schemas.Snippet)
 async def update_snippet(
-    snippet_id: int, snippet_data: schemas.SnippetUpdate, db: Session = Depends(get_db)
+    snippet_id: int,
+    snippet_data: schemas.SnippetUpdate,
+    db: AsyncSession = Depends(get_db),
 ):
     """
-    Updates a snippet by its ID.
+    Updates a snippet by its ID. Every change is recorded as a revision of the snippet.
 
     Args:
         snippet_id (int): The ID of the snippet to update.
         snippet_data (schemas.SnippetUpdate): The updated data for the snippet.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         schemas.Snippet: The updated snippet.
 
     Raises:
-        HTTPException: If the snippet is not found.
+        HTTPException: If the snippet is not found, or kept changing during the update.
     """
-    db_snippet = crud.update_snippet(db, snippet_id, snippet_data)
+    try:
+        db_snippet = await crud.update_snippet(db, snippet_id, snippet_data)
+    except RevisionConflict as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=409, detail="Snippet changed, please retry")
     if not db_snippet:
         logger.warning(f"Snippet not found: {snippet_id}")
         raise HTTPException(status_code=404, detail="Snippet not found")
@@ -92,17 +404,17 @@ async def update_snippet(
 
 
 @router.delete("/{snippet_id}", status_code=204)
-async def delete_snippet(snippet_id: int, db: Session = Depends(get_db)):
+async def delete_snippet(snippet_id: int, db: AsyncSession = Depends(get_db)):
     """
     Deletes a snippet by its ID.
 
     Args:
         snippet_id (int): The ID of the snippet to delete.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Raises:
         HTTPException: If the snippet is not found.
     """
-    if not crud.delete_snippet(db, snippet_id):
+    if not await crud.delete_snippet(db, snippet_id):
         logger.warning(f"Snippet not found: {snippet_id}")
         raise HTTPException(status_code=404, detail="Snippet not found")
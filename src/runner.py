@@ -1,13 +1,623 @@
 """
-This module provides a function to run Python code and tests in a secure subprocess.
-It sets resource limits (CPU time and memory) to prevent malicious or inefficient code execution.
+This module provides functions to run code and tests in a secure subprocess.
+It sets resource limits (CPU time and memory) to prevent malicious or inefficient code execution,
+and reports the resource usage of each run (see `RUN_METRICS`).
+Each language of `src.languages` is run with its own test harness and runtime.
+Runs are served by a pool of warm sandbox workers per language (`SANDBOX_MODE=warm`, the
+default) or by cold-starting a new interpreter per run (`SANDBOX_MODE=cold`, and always for
+languages without a worker).
+A cold run reads its script from stdin and runs in a work directory shared by all runs, on
+tmpfs when available (`SANDBOX_STAGING=stdin`, the default), or runs a script written to a
+new temporary directory (`SANDBOX_STAGING=disk`).
+The awaitable variant runs on the bounded sandbox execution pool so the event loop is never blocked.
+Test code that the language can split into test cases (see `src.testcases`) runs one case
+per sandbox run, up to `SANDBOX_CASE_CONCURRENCY` cases at a time, and reports each case.
+The timeout of such a run bounds the whole suite, including the time cases wait for a slot.
+Interactive runs share the warm pools and case threads above; batch runs pass a
+`SandboxCapacity` of their own.
+The output of a run is captured in ring buffers of `SANDBOX_OUTPUT_LIMIT_BYTES` per stream
+(see `src.output`), so a run printing without limit uses a bounded amount of memory, and
+can be passed to a callback while the run goes on.
 """
 
+import atexit
+import functools
+import hashlib
+import json
+import math
 import os
 import resource
+import selectors
+import shutil
+import signal
 import subprocess
 import tempfile
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from src.cache import TTLCache
+from src.executor import execution_pool
+from src.languages import Language, get_language
+from src.output import CaseOutput, OutputBuffer, output_decoder
+from src.testcases import TestCase
+from src.warm_pool import (
+    SANDBOX_WARM_POOL_SIZE,
+    WarmPoolError,
+    WorkerWaitTimeout,
+    get_warm_pool,
+)
+
+SANDBOX_MODE = os.getenv("SANDBOX_MODE", "warm")
+SANDBOX_STAGING = os.getenv("SANDBOX_STAGING", "stdin")
+SANDBOX_WORK_DIR = os.getenv("SANDBOX_WORK_DIR", "")
+RUN_CACHE_SIZE = int(os.getenv("RUN_CACHE_SIZE", "1024"))
+RUN_CACHE_TTL_S = float(os.getenv("RUN_CACHE_TTL_S", "600"))
+SANDBOX_OUTPUT_LIMIT_BYTES = int(os.getenv("SANDBOX_OUTPUT_LIMIT_BYTES", "65536"))
+SANDBOX_CASE_CONCURRENCY = int(
+    os.getenv("SANDBOX_CASE_CONCURRENCY", str(SANDBOX_WARM_POOL_SIZE))
+)
+
+# Resource usage reported with the result of a run: wall and user/system CPU time in
+# milliseconds, peak resident set size in kilobytes (None if unknown), and whether the run
+# was stopped by its time or memory limit
+RUN_METRICS = (
+    "wall_ms",
+    "cpu_user_ms",
+    "cpu_system_ms",
+    "max_rss_kb",
+    "timed_out",
+    "out_of_memory",
+)
+
+# Characters at the end of stderr searched for a language's out-of-memory error
+OUT_OF_MEMORY_TAIL = 2048
+
+run_result_cache = TTLCache(RUN_CACHE_SIZE, ttl=RUN_CACHE_TTL_S)
+
+# Runs the test cases of all runs, so a run's cases wait for the sandbox like other runs
+case_executor = ThreadPoolExecutor(
+    max_workers=max(1, SANDBOX_CASE_CONCURRENCY), thread_name_prefix="sandbox-case"
+)
+
+
+@dataclass(frozen=True)
+class SandboxCapacity:
+    """
+    Warm pool workers and test case threads reserved for a kind of run.
+
+    Attributes:
+        name (str): The name of the warm pools, see `src.warm_pool.get_warm_pool`.
+        pool_size (int): The number of workers of each warm pool.
+        case_executor (ThreadPoolExecutor): Runs the test cases of the runs.
+    """
+
+    name: str
+    pool_size: int
+    case_executor: ThreadPoolExecutor
+
+
+def resolve_language(language: str) -> Language:
+    """
+    Looks up a language the sandbox can run.
+
+    Args:
+        language (str): The language of the snippet.
+
+    Returns:
+        Language: The registered language.
+
+    Raises:
+        ValueError: If the language is not supported.
+    """
+    resolved = get_language(language)
+    if resolved is None:
+        raise ValueError(f"Unsupported language: {language}")
+    return resolved
+
+
+@functools.cache
+def runtime_version(language: str = "python") -> str:
+    """
+    Returns the version string of the runtime used by the sandbox for a language.
+
+    Args:
+        language (str, optional): The language. Defaults to "python".
+
+    Returns:
+        str: The runtime's version output.
+    """
+    return subprocess.run(
+        resolve_language(language).version_command,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+def run_cache_key(
+    code: str,
+    test_code: str,
+    timeout_ms=5000,
+    memory_limit_mb=256,
+    language="python",
+) -> str:
+    """
+    Computes the content-addressed cache key of a test run.
+
+    Args:
+        code (str): The code to run.
+        test_code (str): The test code to run.
+        timeout_ms (int, optional): The timeout in milliseconds. Defaults to 5000.
+        memory_limit_mb (int, optional): The memory limit in megabytes. Defaults to 256.
+        language (str, optional): The language of the code. Defaults to "python".
+
+    Returns:
+        str: The SHA-256 hex digest of the run inputs and the runtime version.
+    """
+    language = resolve_language(language).name
+    payload = json.dumps(
+        [
+            code,
+            test_code,
+            timeout_ms,
+            memory_limit_mb,
+            language,
+            runtime_version(language),
+        ]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cpu_limit_seconds(timeout_ms: int) -> int:
+    """
+    Returns the CPU time limit of a run. `RLIMIT_CPU` counts whole seconds, so the
+    timeout is rounded up, plus one second of headroom: the wall-clock timer always stops a
+    busy run first, and the CPU limit only catches a run the timer missed.
+
+    Args:
+        timeout_ms (int): The timeout in milliseconds.
+
+    Returns:
+        int: The CPU time limit in seconds.
+    """
+    return math.ceil(timeout_ms / 1000) + 1
+
+
+def _read_output(
+    proc: subprocess.Popen,
+    output_limit: int,
+    on_output: Callable[[str, str], None] | None,
+) -> dict[str, str]:
+    """
+    Reads the stdout and stderr of a process until both are closed, keeping the last
+    `output_limit` bytes of each.
+
+    Returns:
+        dict[str, str]: The kept stdout and stderr, after a truncation marker if needed.
+    """
+    streams = {proc.stdout.fileno(): "stdout", proc.stderr.fileno(): "stderr"}
+    buffers = {name: OutputBuffer(output_limit) for name in streams.values()}
+    decoders = {name: output_decoder() for name in streams.values()}
+    with selectors.DefaultSelector() as selector:
+        for fd in streams:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fd)
+                    continue
+                name = streams[key.fd]
+                buffers[name].write(data)
+                if on_output is not None and (text := decoders[name].decode(data)):
+                    on_output(name, text)
+    return {name: buffer.getvalue() for name, buffer in buffers.items()}
+
+
+@functools.cache
+def work_dir() -> str:
+    """
+    Returns the working directory of cold runs staged through stdin, created on first use
+    in `SANDBOX_WORK_DIR`, or in the tmpfs at /dev/shm if it exists, so that files written
+    by the tests stay off the disk.
+
+    Returns:
+        str: The path of the directory.
+    """
+    parent = SANDBOX_WORK_DIR or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+    path = tempfile.mkdtemp(prefix="sandbox-", dir=parent)
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def _run_cold(
+    language: Language,
+    source: str,
+    timeout_ms: int,
+    memory_limit_mb: int,
+    output_limit: int,
+    on_output: Callable[[str, str], None] | None = None,
+) -> dict:
+    """
+    Runs a script in a newly started interpreter process, staged as set by
+    `SANDBOX_STAGING`.
+
+    Returns:
+        dict: The process return code, stdout and stderr, whether it timed out, and its
+            resource usage (see `src.zygote.run_job`).
+    """
+    if SANDBOX_STAGING != "disk":
+        return _run_process(
+            language.cold_command(None, memory_limit_mb),
+            work_dir(),
+            source.encode("utf-8"),
+            language,
+            timeout_ms,
+            memory_limit_mb,
+            output_limit,
+            on_output,
+        )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Save code and test files
+        script = os.path.join(tmpdir, language.script_name)
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(source)
+        return _run_process(
+            language.cold_command(script, memory_limit_mb),
+            tmpdir,
+            None,
+            language,
+            timeout_ms,
+            memory_limit_mb,
+            output_limit,
+            on_output,
+        )
+
+
+def _run_process(
+    command: list[str],
+    cwd: str,
+    stdin: bytes | None,
+    language: Language,
+    timeout_ms: int,
+    memory_limit_mb: int,
+    output_limit: int,
+    on_output: Callable[[str, str], None] | None,
+) -> dict:
+    """
+    Runs a sandboxed process with the resource limits of a run, see `_run_cold`.
+    `stdin` is written to the process, which otherwise gets an empty stdin.
+    """
+    # Set resource limits
+    address_space = (memory_limit_mb + language.address_space_overhead_mb) * 1024 * 1024
+
+    cpu_seconds = cpu_limit_seconds(timeout_ms)
+
+    def set_resource_limits() -> None:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+
+    timed_out = threading.Event()
+
+    def kill_process(proc: subprocess.Popen):
+        timed_out.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    # Run tests in a subprocess, in its own process group
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        command,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL if stdin is None else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        preexec_fn=set_resource_limits,
+        start_new_session=True,
+    )
+
+    timer = threading.Timer(timeout_ms / 1000, kill_process, [proc])
+    timer.start()  # Start timer to kill process if it exceeds timeout
+
+    if stdin is not None:
+        # The interpreter reads the whole script before running it
+        try:
+            with proc.stdin:
+                proc.stdin.write(stdin)
+        except BrokenPipeError:
+            pass  # It exited early, its stderr tells why
+    with proc.stdout, proc.stderr:
+        output = _read_output(proc, output_limit, on_output)
+    # Reap the process with wait4 to get its own resource usage
+    _, wait_status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(wait_status)
+    timer.cancel()  # Cancel timer if process completes before timeout
+
+    return {
+        "returncode": proc.returncode,
+        **output,
+        "timed_out": timed_out.is_set(),
+        "wall_ms": (time.monotonic() - start) * 1000,
+        "cpu_user_ms": usage.ru_utime * 1000,
+        "cpu_system_ms": usage.ru_stime * 1000,
+        "max_rss_kb": usage.ru_maxrss,
+    }
+
+
+def run_result(
+    language: Language, outcome: dict, timeout_ms: int, memory_limit_mb: int
+) -> dict:
+    """
+    Builds the result of a finished run from the outcome reported by the sandbox.
+
+    A run stopped by its CPU time limit (SIGXCPU, or a kill after using up its CPU time)
+    counts as timed out. A run that printed the language's out-of-memory error, or was
+    killed without timing out, counts as out of memory.
+
+    Args:
+        language (Language): The language of the run.
+        outcome (dict): The return code, stderr, timeout flag and resource usage.
+        timeout_ms (int): The timeout in milliseconds.
+        memory_limit_mb (int): The memory limit in megabytes.
+
+    Returns:
+        dict: The result, message and `RUN_METRICS` of the run.
+    """
+    returncode = outcome["returncode"]
+    stderr = outcome["stderr"]
+    cpu_ms = outcome["cpu_user_ms"] + outcome["cpu_system_ms"]
+    timed_out = (
+        outcome["timed_out"]
+        or returncode == -signal.SIGXCPU
+        or (returncode < 0 and cpu_ms >= cpu_limit_seconds(timeout_ms) * 1000)
+    )
+    out_of_memory = not timed_out and (
+        returncode == -signal.SIGKILL
+        or any(
+            marker in stderr[-OUT_OF_MEMORY_TAIL:]
+            for marker in language.out_of_memory_markers
+        )
+    )
+
+    if returncode == 0:
+        result, message = "success", "Code Executed Successfully"
+    elif stderr.strip():
+        result, message = "failure", stderr
+    elif timed_out:
+        result, message = "failure", f"Timed out after {timeout_ms} ms"
+    elif out_of_memory:
+        result, message = "failure", f"Exceeded the {memory_limit_mb} MB memory limit"
+    else:
+        result, message = "failure", f"Exited with status {returncode}"
+
+    max_rss_kb = outcome["max_rss_kb"]
+    return {
+        "result": result,
+        "message": message,
+        "wall_ms": round(outcome["wall_ms"], 1),
+        "cpu_user_ms": round(outcome["cpu_user_ms"], 1),
+        "cpu_system_ms": round(outcome["cpu_system_ms"], 1),
+        "max_rss_kb": int(max_rss_kb) if max_rss_kb is not None else None,
+        "timed_out": timed_out,
+        "out_of_memory": out_of_memory,
+    }
+
+
+def _run_script(
+    language: Language,
+    source: str,
+    timeout_ms: int,
+    memory_limit_mb: int,
+    on_output: Callable[[str, str], None] | None,
+    capacity: SandboxCapacity | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """
+    Runs a test script in the sandbox, see `run_code`. A warm run waiting for a worker
+    past the `deadline` of its suite raises `WorkerWaitTimeout`.
+    """
+    try:
+        if SANDBOX_MODE == "cold" or language.worker is None:
+            outcome = _run_cold(
+                language,
+                source,
+                timeout_ms,
+                memory_limit_mb,
+                SANDBOX_OUTPUT_LIMIT_BYTES,
+                on_output,
+            )
+        else:
+            pool = (
+                get_warm_pool(language.worker, capacity.name, capacity.pool_size)
+                if capacity
+                else get_warm_pool(language.worker)
+            )
+            outcome = pool.run(
+                source,
+                timeout_ms,
+                memory_limit_mb,
+                SANDBOX_OUTPUT_LIMIT_BYTES,
+                on_output,
+                deadline,
+            )
+    except (OSError, subprocess.SubprocessError, WarmPoolError) as e:
+        return {"result": "error", "message": str(e)}
+
+    return run_result(language, outcome, timeout_ms, memory_limit_mb)
+
+
+def _run_case(
+    language: Language,
+    case: TestCase,
+    source: str,
+    deadline: float,
+    timeout_ms: int,
+    memory_limit_mb: int,
+    on_output: Callable[[str, str], None] | None,
+    capacity: SandboxCapacity | None,
+) -> dict:
+    """
+    Runs a test case of a suite in the sandbox with the time left until the suite's
+    deadline (a `time.monotonic` value), counting the wait for a warm worker. A case that
+    cannot start before the deadline is not run and counts as timed out.
+    """
+    not_run = {
+        "result": "failure",
+        "message": f"Not run: the tests timed out after {timeout_ms} ms",
+        "wall_ms": 0.0,
+        "cpu_user_ms": 0.0,
+        "cpu_system_ms": 0.0,
+        "max_rss_kb": None,
+        "timed_out": True,
+        "out_of_memory": False,
+    }
+    remaining_ms = math.floor((deadline - time.monotonic()) * 1000)
+    if remaining_ms <= 0:
+        return not_run
+    output = CaseOutput(case.name, on_output) if on_output else None
+    try:
+        return _run_script(
+            language,
+            source,
+            min(timeout_ms, remaining_ms),
+            memory_limit_mb,
+            output.write if output else None,
+            capacity,
+            deadline,
+        )
+    except WorkerWaitTimeout:
+        return not_run
+    finally:
+        if output:
+            output.close()
+
+
+def suite_result(cases: list[TestCase], results: list[dict], wall_ms: float) -> dict:
+    """
+    Combines the results of the test cases of a run.
+
+    Args:
+        cases (list[TestCase]): The test cases.
+        results (list[dict]): The result of each case.
+        wall_ms (float): The wall time of the whole run in milliseconds.
+
+    Returns:
+        dict: The result of the first case the sandbox failed to run, or the result and
+            message of the run, its `RUN_METRICS` (the total CPU time and the largest peak
+            resident set size of the cases), and the `tests` report of the cases.
+    """
+    for result in results:
+        if result["result"] == "error":
+            return result
+
+    tests = [
+        {
+            "name": case.name,
+            "result": result["result"],
+            "message": result["message"],
+            "wall_ms": result["wall_ms"],
+        }
+        for case, result in zip(cases, results)
+    ]
+    failed = [test for test in tests if test["result"] != "success"]
+    if failed:
+        message = f"{len(failed)} of {len(tests)} tests failed\n\n" + "\n\n".join(
+            f"{test['name']}:\n{test['message'].rstrip()}" for test in failed
+        )
+    else:
+        message = "Code Executed Successfully"
+
+    peaks = [result["max_rss_kb"] for result in results if result["max_rss_kb"]]
+    return {
+        "result": "failure" if failed else "success",
+        "message": message,
+        "wall_ms": round(wall_ms, 1),
+        "cpu_user_ms": round(sum(result["cpu_user_ms"] for result in results), 1),
+        "cpu_system_ms": round(sum(result["cpu_system_ms"] for result in results), 1),
+        "max_rss_kb": max(peaks, default=None),
+        "timed_out": any(result["timed_out"] for result in results),
+        "out_of_memory": any(result["out_of_memory"] for result in results),
+        "tests": tests,
+    }
+
+
+def run_code(
+    language: str,
+    code: str,
+    test_code: str,
+    timeout_ms=5000,
+    memory_limit_mb=256,
+    on_output: Callable[[str, str], None] | None = None,
+    capacity: SandboxCapacity | None = None,
+) -> dict:
+    """
+    Run code and test code in a secure subprocess with resource limits.
+
+    If the language splits the test code into several test cases, each case is run in its
+    own subprocess, in parallel, with the same memory limit. The timeout then bounds the
+    whole suite: each case runs with the time left when it starts, and cases that could not
+    start in time are reported as timed out.
+
+    Args:
+        language (str): The language of the code, see `src.languages`.
+        code (str): The code to run.
+        test_code (str): The test code to run.
+        timeout_ms (int, optional): The timeout in milliseconds. Defaults to 5000.
+        memory_limit_mb (int, optional): The memory limit in megabytes. Defaults to 256.
+        on_output (Callable[[str, str], None], optional): Called from the sandbox thread
+            with the stream name ("stdout" or "stderr") and text of each output chunk
+            while the run goes on. The output of a test case is passed line by line, each
+            line starting with the case name in brackets.
+        capacity (SandboxCapacity, optional): The warm pools and case threads to run on.
+            Defaults to those of interactive runs.
+
+    Returns:
+        dict: A dictionary containing the result and message of the code execution and,
+            unless the sandbox failed, its `RUN_METRICS`, and the `tests` report of
+            `suite_result` if the test code was split.
+
+    Raises:
+        ValueError: If the language is not supported.
+    """
+    language = resolve_language(language)
+    cases = language.split_tests(test_code) if language.split_tests else []
+    if len(cases) == 1:
+        test_code = cases[0].test_code
+    if len(cases) <= 1:
+        return _run_script(
+            language,
+            language.build_script(code, test_code),
+            timeout_ms,
+            memory_limit_mb,
+            on_output,
+            capacity,
+        )
+
+    start = time.monotonic()
+    deadline = start + timeout_ms / 1000
+    executor = capacity.case_executor if capacity else case_executor
+    futures = [
+        executor.submit(
+            _run_case,
+            language,
+            case,
+            language.build_script(code, case.test_code),
+            deadline,
+            timeout_ms,
+            memory_limit_mb,
+            on_output,
+            capacity,
+        )
+        for case in cases
+    ]
+    results = [future.result() for future in futures]
+    return suite_result(cases, results, (time.monotonic() - start) * 1000)
 
 
 def run_python_code(
@@ -28,50 +638,59 @@ def run_python_code(
     Returns:
         dict: A dictionary containing the result and message of the code execution.
     """
+    return run_code("python", code, test_code, timeout_ms, memory_limit_mb)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Save code and test files
-        with open(os.path.join(tmpdir, "test.py"), "w", encoding="utf-8") as f:
-            f.write(code)
-            f.write("\n")
-            f.write("def test_code():\n")
-            for line in test_code.split("\n"):
-                f.write(f"    {line}\n")
-            f.write("\n")
-            f.write("test_code()")
-
-        # Set resource limits
-        def set_resource_limits() -> None:
-            resource.setrlimit(resource.RLIMIT_CPU, (timeout_ms, timeout_ms))
-            resource.setrlimit(
-                resource.RLIMIT_AS,
-                (memory_limit_mb * 1024 * 1024, memory_limit_mb * 1024 * 1024),
-            )
 
-        def kill_process(proc: subprocess.Popen):
-            try:
-                proc.kill()
-            except OSError:
-                pass
+async def run_code_async(
+    language: str,
+    code: str,
+    test_code: str,
+    timeout_ms=5000,
+    memory_limit_mb=256,
+    on_output: Callable[[str, str], None] | None = None,
+) -> dict:
+    """
+    Run code and test code on the sandbox execution pool without blocking the event loop.
 
-        # Run tests in a subprocess
-        try:
-            proc = subprocess.Popen(
-                ["python3", os.path.join(tmpdir, "test.py")],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                preexec_fn=set_resource_limits,
-            )
+    Args:
+        language (str): The language of the code, see `src.languages`.
+        code (str): The code to run.
+        test_code (str): The test code to run.
+        timeout_ms (int, optional): The timeout in milliseconds. Defaults to 5000.
+        memory_limit_mb (int, optional): The memory limit in megabytes. Defaults to 256.
+        on_output (Callable[[str, str], None], optional): Called with each output chunk
+            while the run goes on, see `run_code`.
+
+    Returns:
+        dict: A dictionary containing the result and message of the code execution.
+
+    Raises:
+        ExecutionPoolFull: If the execution pool cannot accept another run.
+    """
+    return await execution_pool.submit(
+        run_code, language, code, test_code, timeout_ms, memory_limit_mb, on_output
+    )
+
+
+async def run_python_code_async(
+    code: str,
+    test_code: str,
+    timeout_ms=5000,
+    memory_limit_mb=256,
+) -> dict:
+    """
+    Run Python code and test code on the sandbox execution pool without blocking the event loop.
 
-            time = threading.Timer(timeout_ms / 1000, kill_process, [proc])
-            time.start()  # Start timer to kill process if it exceeds timeout
+    Args:
+        code (str): The Python code to run.
+        test_code (str): The Python test code to run.
+        timeout_ms (int, optional): The timeout in milliseconds. Defaults to 5000.
+        memory_limit_mb (int, optional): The memory limit in megabytes. Defaults to 256.
 
-            _stdout, stderr = proc.communicate()
-            time.cancel()  # Cancel timer if process completes before timeout
+    Returns:
+        dict: A dictionary containing the result and message of the code execution.
 
-            if proc.returncode == 0:
-                return {"result": "success", "message": "Code Executed Successfully"}
-            else:
-                return {"result": "failure", "message": stderr.decode("utf-8")}
-        except subprocess.CalledProcessError as e:
-            return {"result": "error", "message": str(e)}
+    Raises:
+        ExecutionPoolFull: If the execution pool cannot accept another run.
+    """
+    return await run_code_async("python", code, test_code, timeout_ms, memory_limit_mb)
@@ -5,7 +5,7 @@ It includes schemas for creating, updating, and retrieving snippets, as well as
 
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class SnippetCreate(BaseModel):
@@ -23,6 +23,26 @@ class SnippetCreate(BaseModel):
     is_active: bool = True
 
 
+class SnippetImport(SnippetCreate):
+    """
+    Schema for an imported snippet, which may carry the test results and timestamps of
+    an export. IDs are not imported; every snippet gets a new one.
+    """
+
+    test_result: str = ""
+    test_result_message: str = ""
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
+class SnippetImportResult(BaseModel):
+    """
+    Schema for the result of an import.
+    """
+
+    imported: int
+
+
 class SnippetUpdate(BaseModel):
     """
     Schema for updating a snippet.
@@ -37,9 +57,34 @@ class SnippetUpdate(BaseModel):
     test_feedback: str | None = None
 
 
+class SnippetBulkUpdate(BaseModel):
+    """
+    Schema for applying the same update to several snippets.
+    """
+
+    ids: list[int] = Field(..., max_length=1000)
+    changes: SnippetUpdate
+
+
+class SnippetBulkDelete(BaseModel):
+    """
+    Schema for deleting several snippets.
+    """
+
+    ids: list[int] = Field(..., max_length=1000)
+
+
+class SnippetBulkResult(BaseModel):
+    """
+    Schema for the result of a bulk operation.
+    """
+
+    ids: list[int]
+
+
 class Snippet(SnippetCreate):
     """
-    Schema for a snippet, including additional fields for ID and timestamps.
+    Schema for a snippet, including additional fields for ID, revision and timestamps.
     """
 
     model_config = ConfigDict(from_attributes=True)
@@ -47,10 +92,65 @@ class Snippet(SnippetCreate):
     id: int
     test_result: str
     test_result_message: str
+    test_wall_ms: float | None = None
+    test_cpu_user_ms: float | None = None
+    test_cpu_system_ms: float | None = None
+    test_max_rss_kb: int | None = None
+    test_timed_out: bool | None = None
+    test_out_of_memory: bool | None = None
+    revision: int
     created_at: datetime
     updated_at: datetime
 
 
+class SnippetSummary(BaseModel):
+    """
+    Schema for a snippet in a list, without its text fields.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    language: str
+    updated_at: datetime
+
+
+class SnippetSearchResult(SnippetSummary):
+    """
+    Schema for a search result, with an HTML excerpt highlighting the matched terms.
+    """
+
+    highlight: str
+
+
+class SnippetRevisionSummary(BaseModel):
+    """
+    Schema for a revision in the history of a snippet.
+    """
+
+    number: int
+    keyframe: bool
+    changes: list[str]
+    created_at: datetime
+
+
+class SnippetRevision(BaseModel):
+    """
+    Schema for the fields of a snippet at a revision.
+    """
+
+    number: int
+    created_at: datetime
+    title: str
+    language: str
+    description: str
+    code: str
+    feedback: str
+    test_code: str
+    test_feedback: str
+
+
 class LanguageDetRequest(BaseModel):
     """
     Schema for a language detection request.
@@ -75,6 +175,14 @@ class CodeGenRequest(BaseModel):
     description: str
 
 
+class DescribeRequest(BaseModel):
+    """
+    Schema for a combined code, title and language generation request.
+    """
+
+    description: str
+
+
 class TitleGenRequest(BaseModel):
     """
     Schema for a title generation request.
@@ -129,6 +237,63 @@ class TestRunRequest(BaseModel):
     test_code: str
 
 
+class TestCaseResult(BaseModel):
+    """
+    Schema for the result of one test case of a test run.
+    """
+
+    name: str
+    result: str
+    message: str
+    wall_ms: float
+
+
+class TestRunResult(BaseModel):
+    """
+    Schema for the result of a test run and its resource usage, which is missing when the
+    sandbox itself failed. Test code split into test cases also reports each case.
+    """
+
+    result: str
+    message: str
+    wall_ms: float | None = None
+    cpu_user_ms: float | None = None
+    cpu_system_ms: float | None = None
+    max_rss_kb: int | None = None
+    timed_out: bool = False
+    out_of_memory: bool = False
+    tests: list[TestCaseResult] | None = None
+
+
+class BatchRunRequest(BaseModel):
+    """
+    Schema for a request to run the tests of every snippet of a language.
+    """
+
+    language: str = "python"
+
+
+class BatchRunStatus(BaseModel):
+    """
+    Schema for the progress of a batch test run.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    language: str
+    status: str
+    total: int
+    completed: int
+    stored: int
+    passed: int
+    failed: int
+    errors: int
+    message: str
+    started_at: datetime
+    finished_at: datetime | None = None
+
+
 class RegenerateRequest(BaseModel):
     """
     Schema for a code regeneration request based on test results.
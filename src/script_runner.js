@@ -0,0 +1,33 @@
+/*
+ * This module runs a JavaScript test script the way `node test.js` would, for cold runs,
+ * which pipe the script to `node script_runner.js` instead of writing it to a file (see
+ * `Language.stdin_command`). The script is compiled as the body of a CommonJS module in the
+ * working directory.
+ *
+ * The module only depends on the Node.js standard library because it runs outside the
+ * application.
+ */
+
+"use strict";
+
+const fs = require("fs");
+const { createRequire } = require("module");
+const path = require("path");
+const vm = require("vm");
+
+const SCRIPT_NAME = "test.js";
+
+/**
+ * Runs a script in the current process.
+ *
+ * @param {string} source The script source.
+ */
+function runSource(source) {
+    const filename = path.join(process.cwd(), SCRIPT_NAME);
+    const module = { exports: {} };
+    const params = ["exports", "require", "module", "__filename", "__dirname"];
+    const body = vm.compileFunction(source, params, { filename: SCRIPT_NAME });
+    body(module.exports, createRequire(filename), module, filename, process.cwd());
+}
+
+runSource(fs.readFileSync(0, "utf8"));
@@ -0,0 +1,57 @@
+"""
+This module runs a Python test script the way `python3 test.py` would, for the sandbox
+worker (`src.zygote`) and for cold runs, which pipe the script to an interpreter importing
+this module instead of writing it to a file (see `Language.stdin_command`).
+
+Being imported, the module is loaded from cached bytecode. It imports what a failing script
+needs only when the script fails, so that it adds little to the start-up time of a run.
+
+The module only depends on the standard library because it runs outside the application.
+"""
+
+import builtins
+import sys
+
+SCRIPT_NAME = "test.py"
+
+
+class SourceLoader:
+    """
+    Gives the source of the script to `linecache`, which asks the `__loader__` of a module
+    for the lines of a file it cannot read, so tracebacks show the offending lines.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+
+    def get_source(self, name: str) -> str:
+        return self.source
+
+
+def exec_source(source: str) -> int:
+    """
+    Executes a script the way `python3 test.py` would and returns its exit status.
+    """
+    sys.argv = [SCRIPT_NAME]
+    namespace = {
+        "__name__": "__main__",
+        "__file__": SCRIPT_NAME,
+        "__loader__": SourceLoader(source),
+        "__builtins__": builtins,
+    }
+    try:
+        exec(compile(source, SCRIPT_NAME, "exec"), namespace)
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException as e:
+        import traceback
+
+        # Skip this function's own frame so the traceback starts in the script
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return 1
@@ -0,0 +1,37 @@
+# This module runs a Ruby test script the way `ruby test.rb` would, for the sandbox worker
+# (`src/zygote.rb`) and for cold runs, which pipe the script to `ruby script_runner.rb`
+# instead of writing it to a file (see `Language.stdin_command`).
+#
+# The module only depends on the Ruby standard library because it runs outside the
+# application.
+
+module ScriptRunner
+  SCRIPT_NAME = "test.rb"
+
+  module_function
+
+  # Evaluates a script the way `ruby test.rb` would and returns its exit status.
+  def exec_source(source)
+    $PROGRAM_NAME = SCRIPT_NAME
+    TOPLEVEL_BINDING.eval(source, SCRIPT_NAME, 1)
+    0
+  rescue SystemExit => e
+    e.status
+  rescue NoMemoryError
+    # The script's objects are still reachable, so print without allocating much
+    $stderr.write("#{SCRIPT_NAME}: failed to allocate memory (NoMemoryError)\n")
+    1
+  rescue Exception => e # rubocop:disable Lint/RescueException
+    report(e)
+    1
+  end
+
+  # Prints an error the way the interpreter would, without the sandbox's own frames.
+  def report(error)
+    backtrace = error.backtrace
+    error.set_backtrace(backtrace.reject { |line| line.start_with?("#{__dir__}/") }) if backtrace
+    $stderr.write(error.full_message(highlight: false))
+  end
+end
+
+exit ScriptRunner.exec_source($stdin.read) if $PROGRAM_NAME == __FILE__
@@ -0,0 +1,273 @@
+"""
+This module provides Server-Sent Events (SSE) responses for the generate endpoints and the
+live output of test runs.
+Event payloads are JSON-encoded so that chunks containing newlines or leading whitespace
+survive SSE line framing unchanged.
+
+Each generation is consumed in the background into a buffer that is kept for a while after
+it finishes. Consecutive text chunks are coalesced into one event, flushed when the
+endpoint's byte budget or latency budget is reached, whichever comes first. Idle connections
+receive heartbeat comments, and a client that lost its connection can resume from its
+`Last-Event-ID` without starting a new generation.
+"""
+
+import json
+import os
+import time
+import uuid
+from typing import AsyncIterator, NamedTuple
+
+from fastapi.responses import StreamingResponse
+
+from src.cache import TTLCache
+from src.streams import SharedStream
+
+SSE_BATCH_BYTES = int(os.getenv("SSE_BATCH_BYTES", "256"))
+SSE_BATCH_DELAY_MS = float(os.getenv("SSE_BATCH_DELAY_MS", "50"))
+SSE_HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", "15"))
+SSE_STREAM_BUFFER_SIZE = int(os.getenv("SSE_STREAM_BUFFER_SIZE", "256"))
+SSE_STREAM_TTL_S = float(os.getenv("SSE_STREAM_TTL_S", "300"))
+
+# Batch budgets (bytes, milliseconds) per endpoint, overridable with
+# SSE_BATCH_<NAME>_BYTES and SSE_BATCH_<NAME>_DELAY_MS. Titles are short, so they use
+# small budgets and appear promptly; code streams trade a little latency for fewer writes,
+# and test output, which can arrive in many small writes, even more.
+BATCH_BUDGETS = {
+    "title": (32, 30.0),
+    "code": (512, 60.0),
+    "describe": (512, 60.0),
+    "code_from_feedback": (512, 60.0),
+    "tests": (512, 60.0),
+    "tests_from_feedback": (512, 60.0),
+    "regenerate": (512, 60.0),
+    "run": (4096, 100.0),
+}
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Ask reverse proxies not to buffer the stream
+}
+
+HEARTBEAT = ": ping\n\n"
+
+# Recent generations by stream ID, kept so dropped clients can resume them
+stream_store = TTLCache(SSE_STREAM_BUFFER_SIZE, ttl=SSE_STREAM_TTL_S)
+
+
+class BatchBudget(NamedTuple):
+    """
+    Limits on how long text chunks may be held back before they are sent.
+    """
+
+    max_bytes: int
+    max_delay_ms: float
+
+
+def batch_budget(endpoint: str | None = None) -> BatchBudget:
+    """
+    Returns the batch budget of an endpoint.
+
+    Args:
+        endpoint (str, optional): The endpoint name, e.g. "code". Defaults to the global budget.
+
+    Returns:
+        BatchBudget: The byte and latency budgets.
+    """
+    max_bytes, max_delay_ms = BATCH_BUDGETS.get(
+        endpoint, (SSE_BATCH_BYTES, SSE_BATCH_DELAY_MS)
+    )
+    if endpoint:
+        name = endpoint.upper()
+        max_bytes = int(os.getenv(f"SSE_BATCH_{name}_BYTES", max_bytes))
+        max_delay_ms = float(os.getenv(f"SSE_BATCH_{name}_DELAY_MS", max_delay_ms))
+    return BatchBudget(max_bytes, max_delay_ms)
+
+
+def format_event(data, event: str | None = None, event_id: str | None = None) -> str:
+    """
+    Formats a single SSE event.
+
+    Args:
+        data: The JSON-serializable event payload.
+        event (str, optional): The event type. Defaults to the SSE default "message".
+        event_id (str, optional): The event ID reported back in `Last-Event-ID`.
+
+    Returns:
+        str: The framed event, terminated by a blank line.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_event_id(last_event_id: str | None, stream_id: str) -> int:
+    """
+    Returns the buffer index to resume from for a `Last-Event-ID` value.
+
+    Args:
+        last_event_id (str, optional): The `Last-Event-ID` sent by the client.
+        stream_id (str): The ID of the stream being resumed.
+
+    Returns:
+        int: The index of the first item the client has not received.
+    """
+    if not last_event_id:
+        return 0
+    event_stream_id, _, index = last_event_id.rpartition(":")
+    if event_stream_id != stream_id or not index.isdigit():
+        return 0
+    return int(index) + 1
+
+
+async def as_events(chunks: AsyncIterator[str], event: str = "message"):
+    """
+    Tags each chunk of a text stream with an event name.
+
+    Args:
+        chunks (AsyncIterator[str]): The text chunks.
+        event (str, optional): The event name. Defaults to "message".
+
+    Yields:
+        tuple[str, str]: The event name and the chunk.
+    """
+    async for chunk in chunks:
+        yield event, chunk
+
+
+async def coalesce(
+    shared: SharedStream, start: int, budget: BatchBudget
+) -> AsyncIterator[tuple[int, str | None, object]]:
+    """
+    Groups consecutive text chunks of the same event from a buffered stream.
+
+    A group is released when it holds `budget.max_bytes` bytes, when `budget.max_delay_ms`
+    has passed since its first chunk arrived, or when a different event follows. The first
+    group is released immediately so the time to first byte is not delayed. While the
+    stream is idle, heartbeats are released every `SSE_HEARTBEAT_S` seconds.
+
+    Args:
+        shared (SharedStream): The buffer of `(event, data)` items.
+        start (int): The index of the first item to release.
+        budget (BatchBudget): The byte and latency budgets.
+
+    Yields:
+        tuple[int, str | None, object]: The index of the last item in the group, the event
+            name and the payload, or `(index, None, None)` for a heartbeat.
+    """
+    index = start
+    items = shared.chunks
+    first = True
+    while True:
+        if not await shared.wait(index, SSE_HEARTBEAT_S):
+            yield index - 1, None, None
+            continue
+        if index >= len(items):
+            return
+
+        event, data = items[index]
+        index += 1
+        if isinstance(data, str) and not first:
+            pending = [data]
+            size = len(data.encode("utf-8"))
+            deadline = time.monotonic() + budget.max_delay_ms / 1000
+            while size < budget.max_bytes:
+                if index < len(items):
+                    next_event, next_data = items[index]
+                    if next_event != event or not isinstance(next_data, str):
+                        break
+                    pending.append(next_data)
+                    size += len(next_data.encode("utf-8"))
+                    index += 1
+                    continue
+                remaining = deadline - time.monotonic()
+                if shared.done or remaining <= 0:
+                    break
+                await shared.wait(index, remaining)
+            data = "".join(pending)
+        first = False
+        yield index - 1, event, data
+
+
+async def event_stream(
+    stream_id: str,
+    shared: SharedStream,
+    start: int = 0,
+    budget: BatchBudget | None = None,
+) -> AsyncIterator[str]:
+    """
+    Renders a buffered generation as SSE events, from `start` to the end of the stream.
+    Every event ID is `<stream_id>:<index of its last buffered item>`.
+
+    Args:
+        stream_id (str): The ID of the stream.
+        shared (SharedStream): The buffer of `(event, data)` items.
+        start (int, optional): The index of the first item to send. Defaults to 0.
+        budget (BatchBudget, optional): The batch budget. Defaults to the global budget.
+
+    Yields:
+        str: SSE events and heartbeat comments, then an `error` event if the
+            generation failed, and a final `done` event.
+    """
+    async for index, event, data in coalesce(shared, start, budget or batch_budget()):
+        if event is None:
+            yield HEARTBEAT
+        else:
+            yield format_event(data, event, f"{stream_id}:{index}")
+
+    if shared.error is not None:
+        error = shared.error
+        yield format_event({"message": getattr(error, "detail", str(error))}, "error")
+    yield format_event({}, "done", f"{stream_id}:{len(shared.chunks)}")
+
+
+def sse_response(
+    events: AsyncIterator[tuple[str, object]], endpoint: str | None = None
+) -> StreamingResponse:
+    """
+    Starts consuming a generation in the background and streams it as SSE.
+
+    Args:
+        events (AsyncIterator[tuple[str, object]]): The `(event, data)` items to send.
+        endpoint (str, optional): The endpoint name, used to pick the batch budget.
+
+    Returns:
+        StreamingResponse: The event stream, with the stream ID in the `X-Stream-Id` header.
+    """
+    stream_id = uuid.uuid4().hex
+    shared = SharedStream(events)
+    budget = batch_budget(endpoint)
+    stream_store.set(stream_id, (shared, budget))
+    return StreamingResponse(
+        event_stream(stream_id, shared, budget=budget),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-Id": stream_id},
+    )
+
+
+def resume_response(
+    stream_id: str, last_event_id: str | None
+) -> StreamingResponse | None:
+    """
+    Resumes a recent generation after the last event the client received.
+
+    Args:
+        stream_id (str): The ID of the stream to resume.
+        last_event_id (str, optional): The `Last-Event-ID` sent by the client.
+
+    Returns:
+        StreamingResponse: The remaining events, or None if the stream has expired.
+    """
+    entry = stream_store.get(stream_id)
+    if entry is None:
+        return None
+    shared, budget = entry
+    start = parse_event_id(last_event_id, stream_id)
+    return StreamingResponse(
+        event_stream(stream_id, shared, start, budget),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-Id": stream_id},
+    )
@@ -16,6 +16,9 @@ const runTestsBtn = document.getElementById('run-tests-btn');
 const testResults = document.getElementById('test-results');
 const regenerateBtn = document.getElementById('regenerate-btn');
 
+// Languages served by POST /api/run/{language}
+const RUNNABLE_LANGUAGES = ['python', 'javascript', 'ruby'];
+
 function updateSectionsVisibility(testResult) {
     const testGenerationSection = document.getElementById('test-generation-section');
     const regenerationSection = document.getElementById('regeneration-section');
@@ -37,7 +40,7 @@ function updateSectionsVisibility(testResult) {
 
     if (currentSnippetId !== null) {
         const snippet = snippets.find(s => s.id === currentSnippetId);
-        if (snippet.language !== 'python') {
+        if (!RUNNABLE_LANGUAGES.includes(snippet.language)) {
             runTestsBtn.disabled = true;
             runTestsBtn.classList.remove('bg-teal-500');
             runTestsBtn.classList.add('bg-gray-500', 'cursor-not-allowed');
@@ -60,12 +63,23 @@ function updateSectionsVisibility(testResult) {
 }
 
 async function fetchSnippets() {
-    const response = await fetch('/api/snippets');
-    if (!response.ok) {
-        console.error('Failed to fetch snippets:', response.status);
-        return [];
-    }
-    return await response.json();
+    // The sidebar only needs summaries; full snippets are fetched when selected
+    const snippets = [];
+    let cursor = null;
+    do {
+        const params = new URLSearchParams({fields: 'summary', limit: '200'});
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const response = await fetch(`/api/snippets?${params}`);
+        if (!response.ok) {
+            console.error('Failed to fetch snippets:', response.status);
+            break;
+        }
+        snippets.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return snippets;
 }
 
 let currentSnippetId = null;
@@ -158,6 +172,7 @@ snippetList.addEventListener('click', async e => {
         const snippetId = Number(e.target.dataset.id);
         const snippet = await fetchSnippetDetail(snippetId);
         if (snippet) {
+            Object.assign(snippets.find(s => s.id === snippetId), snippet);
             renderSnippetDetail(snippet);
             currentSnippetId = snippetId;
             renderSnippetList(snippets);
@@ -182,21 +197,96 @@ function processCodeString(codeString) {
 }
 
 async function streamResponse(response, callback) {
+    if (!response.ok) {
+        const errorText = await response.text();
+        callback(errorText);
+        return errorText;
+    }
+
+    let result = '';
+    await readEvents(response, (event, data) => {
+        if (event === 'message') {
+            result += data;
+            callback(data);
+        } else if (event === 'error') {
+            console.error('Generation failed:', data.message);
+        }
+    });
+
+    return result;
+}
+
+const MAX_STREAM_RESUMES = 3;
+
+async function readEventBlocks(response, onBlock) {
     const reader = response.body.getReader();
     let decoder = new TextDecoder();
 
-    let result = '';
+    let buffer = '';
     while (true) {
         const {value, done} = await reader.read();
         if (done) break;
-        
-        const decodedValue = decoder.decode(value);
-        result += decodedValue;
-        
-        callback(decodedValue);
+
+        buffer += decoder.decode(value, {stream: true});
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let id = null;
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('id: ')) {
+                    id = line.slice(4);
+                } else if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            if (data) {
+                onBlock(id, event, JSON.parse(data));
+            }
+        }
+    }
+}
+
+async function readEvents(response, callback) {
+    // Resumes from the last received event if the connection drops before `done`
+    const streamId = response.headers.get('X-Stream-Id');
+    let lastEventId = null;
+    let finished = false;
+
+    for (let resumes = 0; ; resumes++) {
+        try {
+            await readEventBlocks(response, (id, event, data) => {
+                if (id) {
+                    lastEventId = id;
+                }
+                if (event === 'done') {
+                    finished = true;
+                } else {
+                    callback(event, data);
+                }
+            });
+        } catch (error) {
+            console.warn('Stream interrupted:', error);
+        }
+
+        if (finished || !streamId || resumes >= MAX_STREAM_RESUMES) {
+            return;
+        }
+
+        response = await fetch(`/api/generate/streams/${streamId}`, {
+            headers: lastEventId ? {'Last-Event-ID': lastEventId} : {},
+        });
+        if (!response.ok) {
+            console.error('Failed to resume stream:', response.status);
+            return;
+        }
     }
-    
-    return result;
 }
 
 function highlightCode(codeElement) {
@@ -215,64 +305,44 @@ async function generateCode() {
     const codeElement = generatedCode.querySelector('code');
     codeElement.textContent = '';
 
-    const [codeResponse, titleResponse, langPromise] = [
-        fetch('/api/generate/code', {
-            method: 'POST',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({
-                description: codeDescription.value,
-            }),
-        }),
-        fetch('/api/generate/title', {
-            method: 'POST',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({
-                description: codeDescription.value,
-            }),
+    const response = await fetch('/api/generate/describe', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            description: codeDescription.value,
         }),
-        fetch('/api/generate/detect_language', {
-            method: 'POST',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({
-                description: codeDescription.value,
-            }),
-        }).then(response => response.json())
-    ];
-
-    const results = await Promise.allSettled([codeResponse, titleResponse, langPromise]);
-
-    const codeResult = results[0];
-    const titleResult = results[1];
-    const langResult = results[2];
-
-    if (codeResult.status === 'fulfilled') {
-        let codeData = await streamResponse(codeResult.value, data => {
+    });
+
+    if (!response.ok) {
+        codeElement.textContent = await response.text();
+        return;
+    }
+
+    let codeData = '';
+    await readEvents(response, (event, data) => {
+        if (event === 'code') {
+            codeData += data;
             codeElement.textContent += data;
             highlightCode(codeElement);
             updateSectionsVisibility();
-        });
-        codeData = processCodeString(codeData);
-        snippet.code = codeData;
-        codeElement.textContent = codeData;
-        highlightCode(codeElement);
-    }
-
-    if (titleResult.status === 'fulfilled') {
-        const titleData = await streamResponse(titleResult.value, data => {
+        } else if (event === 'title') {
             snippet.title += data;
-        });
-    }
-
-    if (langResult.status === 'fulfilled') {
-        const langData = langResult.value;
-        if (langData.language !== snippet.language) {
-            snippet.language = langData.language || '';
-        }
-        if (langData.language) {
-            codeElement.className = langData.language;
+        } else if (event === 'language') {
+            if (data.language !== snippet.language) {
+                snippet.language = data.language || '';
+            }
+            if (data.language) {
+                codeElement.className = data.language;
+            }
+        } else if (event === 'error') {
+            console.error(`Failed to generate ${data.source}:`, data.message);
         }
-        highlightCode(codeElement);
-    }
+    });
+
+    codeData = processCodeString(codeData);
+    snippet.code = codeData;
+    codeElement.textContent = codeData;
+    highlightCode(codeElement);
 
     await updateSnippet(snippet);
 }
@@ -377,10 +447,16 @@ async function improveTests() {
 
 improveTestsBtn.addEventListener('click', improveTests);
 
+function escapeHtml(text) {
+    const element = document.createElement('span');
+    element.textContent = text;
+    return element.innerHTML;
+}
+
 async function runTests() {
     const snippet = snippets.find(s => s.id === currentSnippetId);
 
-    const response = await fetch('/api/run/python', {
+    const response = await fetch(`/api/run/${snippet.language}`, {
         method: 'POST',
         headers: {'Content-Type': 'application/json'},
         body: JSON.stringify({
@@ -391,7 +467,15 @@ async function runTests() {
         }),
     });
     const data = await response.json();
+    // Test code split into test cases reports each case
+    const tests = (data.tests || []).map(test => `
+        <li class="${test.result === 'success' ? 'text-green-700' : 'text-red-700'}">
+            ${test.result === 'success' ? '&#10003;' : '&#10007;'} ${escapeHtml(test.name)}
+            (${test.wall_ms.toFixed(0)} ms)
+        </li>
+    `).join('');
     testResults.innerHTML = `
+        ${tests ? `<ul class="mb-4">${tests}</ul>` : ''}
         <div class="p-4 rounded mb-4 ${data.result === 'success' ? 'bg-green-300' : 'bg-red-300'}">
             ${data.message}
         </div>
@@ -441,6 +525,5 @@ document.addEventListener('DOMContentLoaded', async () => {
     if (snippets.length > 0) {
         const firstSnippetItem = document.querySelector('.snippet-item');
         firstSnippetItem.click();
-        renderSnippetDetail(snippets[0]);
     }
 });
\ No newline at end of file
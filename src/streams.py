@@ -0,0 +1,91 @@
+"""
+This module provides a shared stream: an async stream that is consumed once in the
+background and buffered, so any number of subscribers can read it concurrently or replay it
+from any position without triggering another upstream request.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+
+class SharedStream:
+    """
+    Buffers an async iterator of chunks and fans it out to subscribers.
+
+    The source is consumed by a background task, independently of the subscribers, so a
+    subscriber that goes away does not cancel the upstream request.
+    """
+
+    def __init__(self, source: AsyncIterator):
+        self.chunks: list = []
+        self.done = False
+        self.error: BaseException | None = None
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        Whether the source has been fully consumed without an error.
+        """
+        return self.done and self.error is None
+
+    async def wait(self, index: int, timeout: float | None = None) -> bool:
+        """
+        Waits until the chunk at `index` is buffered or the stream has ended.
+
+        Args:
+            index (int): The index of the chunk to wait for.
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: False if the timeout expired first, True otherwise.
+        """
+        changed = self._changed
+        if index < len(self.chunks) or self.done:
+            return True
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def subscribe(self, start: int = 0) -> AsyncIterator:
+        """
+        Yields the buffered chunks from `start` onwards, then follows the live stream.
+
+        Args:
+            start (int, optional): The index of the first chunk to yield. Defaults to 0.
+
+        Yields:
+            Each chunk of the stream.
+
+        Raises:
+            Exception: The error raised by the source, if it failed.
+        """
+        index = start
+        while True:
+            changed = self._changed
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
@@ -0,0 +1,161 @@
+"""
+This module splits test code into independent test cases, so that the sandbox can run them
+in parallel and report every failure of a run instead of stopping at the first one.
+
+Python test code is split into its pytest-style `test_*` functions that take no arguments,
+when it defines any, and otherwise into its top-level `assert` statements. Each case gets
+the other statements it may depend on (imports, helpers, variables) as its setup. An assert
+may depend on the asserts before it, e.g. when they advance the same iterator, so these run
+in its setup too, with their failures ignored. Test code that cannot be split, or holds a
+single case, is run as a whole, as before.
+"""
+
+import ast
+import textwrap
+from typing import NamedTuple
+
+# Longest case name taken from the source of a statement
+CASE_NAME_LENGTH = 80
+
+
+class TestCase(NamedTuple):
+    """
+    One independently runnable test case.
+
+    Attributes:
+        name (str): The test function's name, the first line of the assert statement, or
+            "test_code" for the whole test code.
+        test_code (str): The test code running the case, with its setup.
+    """
+
+    __test__ = False  # Not a pytest test class
+
+    name: str
+    test_code: str
+
+
+def statement_source(lines: list[str], node: ast.stmt) -> str:
+    """
+    Returns the source lines of a top-level statement, with its decorators.
+
+    Args:
+        lines (list[str]): The lines of the test code.
+        node (ast.stmt): The statement.
+
+    Returns:
+        str: The source of the statement.
+    """
+    decorators = getattr(node, "decorator_list", [])
+    start = min([node.lineno] + [decorator.lineno for decorator in decorators])
+    return "\n".join(lines[start - 1 : node.end_lineno])
+
+
+def is_test_function(node: ast.stmt) -> bool:
+    """
+    Checks whether a statement defines a test function the case can call: a function
+    named `test` or `test_*` whose parameters all have defaults. Functions taking
+    arguments, like parametrized helpers, are left to the code calling them.
+    """
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return False
+    if node.name != "test" and not node.name.startswith("test_"):
+        return False
+    args = node.args
+    positional = args.posonlyargs + args.args
+    return len(args.defaults) == len(positional) and None not in args.kw_defaults
+
+
+def references(node: ast.stmt, names: set[str]) -> bool:
+    return any(
+        isinstance(child, ast.Name) and child.id in names for child in ast.walk(node)
+    )
+
+
+def case_name(source: str) -> str:
+    name = source.strip().splitlines()[0]
+    if len(name) > CASE_NAME_LENGTH:
+        name = name[: CASE_NAME_LENGTH - 3] + "..."
+    return name
+
+
+def ignoring_failure(node: ast.stmt) -> str:
+    """
+    Returns the source of a statement run for its side effects, whatever it raises.
+    It is regenerated from the AST, as indenting the source would change multi-line
+    strings.
+    """
+    return f"try:\n    {ast.unparse(node)}\nexcept Exception:\n    pass"
+
+
+def split_python_tests(test_code: str) -> list[TestCase]:
+    """
+    Splits Python test code into test cases.
+
+    With `test_*` functions, each case is the code outside the test functions, except
+    statements calling them, followed by one test function and its call, so that a lone
+    test function is called too. Otherwise each top-level `assert` is a case, preceded by
+    the statements before it, and the last case is followed by the statements after it.
+
+    Args:
+        test_code (str): The Python test code.
+
+    Returns:
+        list[TestCase]: The cases, in source order, or a single case running the whole
+            test code if it cannot be split.
+    """
+    whole = [TestCase("test_code", test_code)]
+    test_code = textwrap.dedent(test_code)
+    try:
+        body = ast.parse(test_code).body
+    except SyntaxError:
+        return whole  # Let the run report the error
+    if any(
+        previous.end_lineno >= node.lineno for previous, node in zip(body, body[1:])
+    ):
+        return whole  # Statements sharing a line cannot be separated by lines
+
+    lines = test_code.split("\n")
+    sources = [statement_source(lines, node) for node in body]
+    tests = {node.name for node in body if is_test_function(node)}
+    if not tests:
+        return split_python_asserts(body, sources) or whole
+
+    # Statements calling the tests, like a `__main__` block, are left out
+    setup = [
+        source
+        for node, source in zip(body, sources)
+        if not is_test_function(node) and not references(node, tests)
+    ]
+    cases = []
+    for node, source in zip(body, sources):
+        if is_test_function(node):
+            call = f"{node.name}()"
+            if isinstance(node, ast.AsyncFunctionDef):
+                call = f"import asyncio\nasyncio.run({call})"
+            cases.append(TestCase(node.name, "\n".join(setup + [source, call])))
+    return cases  # Even a single one, which is only run if called
+
+
+def split_python_asserts(body: list[ast.stmt], sources: list[str]) -> list[TestCase]:
+    """
+    Splits top-level statements into one case per `assert`, see `split_python_tests`.
+
+    Returns:
+        list[TestCase]: The cases, or an empty list if there are fewer than two asserts.
+    """
+    asserts = [i for i, node in enumerate(body) if isinstance(node, ast.Assert)]
+    if len(asserts) < 2:
+        return []
+    setup = [
+        ignoring_failure(node) if isinstance(node, ast.Assert) else source
+        for node, source in zip(body, sources)
+    ]
+    cases = [
+        TestCase(case_name(sources[i]), "\n".join(setup[:i] + [sources[i]]))
+        for i in asserts
+    ]
+    last = asserts[-1]
+    cases[-1] = cases[-1]._replace(
+        test_code="\n".join([cases[-1].test_code] + sources[last + 1 :])
+    )
+    return cases
@@ -0,0 +1,262 @@
+"""
+This module manages pools of pre-started sandbox worker interpreters, one pool per language
+with a worker (see `src.zygote` and its Ruby counterpart). Batch runs (see `src.batch`) have
+pools of their own, so they never hold the workers of interactive runs.
+Jobs are written to an idle worker's stdin and its result is read back from stdout, so a
+test run reuses a warmed runtime instead of cold-starting a new interpreter process. When
+the output of a job is streamed, its chunks arrive on stdout before the result.
+"""
+
+import atexit
+import json
+import math
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import Callable
+
+from src.executor import SANDBOX_MAX_CONCURRENCY
+
+SANDBOX_WARM_POOL_SIZE = int(
+    os.getenv("SANDBOX_WARM_POOL_SIZE", str(SANDBOX_MAX_CONCURRENCY))
+)
+
+
+class WarmPoolError(Exception):
+    """
+    Raised when a sandbox worker cannot be started or stops responding.
+    """
+
+
+class WorkerWaitTimeout(Exception):
+    """
+    Raised when no worker became idle before the deadline of a run.
+    """
+
+
+class ZygoteWorker:
+    """
+    A single pre-started sandbox worker process.
+    """
+
+    def __init__(self, command: tuple[str, ...]):
+        try:
+            self.proc = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                start_new_session=True,  # Keep terminal signals away from the worker
+            )
+        except OSError as e:
+            raise WarmPoolError(f"Sandbox worker failed to start: {e}") from e
+        if not self.proc.stdout.readline():
+            self.close()
+            raise WarmPoolError("Sandbox worker failed to start")
+
+    def run(
+        self, job: dict, on_output: Callable[[str, str], None] | None = None
+    ) -> dict:
+        """
+        Sends a job to the worker and waits for its result.
+
+        Args:
+            job (dict): The job with `source`, `timeout_ms`, `memory_limit_mb` and
+                `output_limit` keys.
+            on_output (Callable[[str, str], None], optional): Called with the stream name
+                and text of each output chunk while the job runs. The output is only
+                streamed if given.
+
+        Returns:
+            dict: The job's return code, stdout, stderr and timeout flag.
+
+        Raises:
+            WarmPoolError: If the worker died or reported an internal error.
+        """
+        job = {**job, "stream": on_output is not None}
+        try:
+            self.proc.stdin.write(json.dumps(job).encode("utf-8") + b"\n")
+            self.proc.stdin.flush()
+            while True:
+                line = self.proc.stdout.readline()
+                if not line:
+                    raise WarmPoolError("Sandbox worker exited unexpectedly")
+                result = json.loads(line)
+                if "output" not in result:
+                    break
+                on_output(result["output"], result["data"])
+        except OSError as e:
+            raise WarmPoolError(f"Sandbox worker pipe failed: {e}") from e
+
+        if "error" in result:
+            raise WarmPoolError(f"Sandbox worker error: {result['error']}")
+        return result
+
+    def close(self) -> None:
+        """
+        Stops the worker process.
+        """
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+
+
+class WarmPool:
+    """
+    A fixed-size pool of sandbox workers running the same command, started on first use.
+    """
+
+    def __init__(self, size: int, command: tuple[str, ...]):
+        self.size = max(1, size)
+        self.command = command
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        """
+        Starts the workers if they are not running yet.
+        """
+        with self._lock:
+            if self._started:
+                return
+            workers = []
+            try:
+                for _ in range(self.size):
+                    workers.append(ZygoteWorker(self.command))
+            except WarmPoolError:
+                for worker in workers:
+                    worker.close()
+                raise
+            for worker in workers:
+                self._idle.put(worker)
+            self._started = True
+
+    def run(
+        self,
+        source: str,
+        timeout_ms: int,
+        memory_limit_mb: int,
+        output_limit: int,
+        on_output: Callable[[str, str], None] | None = None,
+        deadline: float | None = None,
+    ) -> dict:
+        """
+        Runs a script on an idle worker, blocking until one is available.
+
+        Args:
+            source (str): The script to run.
+            timeout_ms (int): The wall-clock timeout in milliseconds.
+            memory_limit_mb (int): The memory limit in megabytes.
+            output_limit (int): The bytes of stdout and of stderr kept in the result.
+            on_output (Callable[[str, str], None], optional): Called with each output
+                chunk while the script runs, see `ZygoteWorker.run`.
+            deadline (float, optional): The `time.monotonic` time by which the script must
+                end, including the wait for a worker. The timeout is shortened to fit it.
+
+        Returns:
+            dict: The job's return code, stdout, stderr and timeout flag.
+
+        Raises:
+            WarmPoolError: If the worker failed. It is replaced before the error is raised,
+                or by the next run if it cannot be started.
+            WorkerWaitTimeout: If the deadline passed before a worker was idle.
+        """
+        self.start()
+        try:
+            # None stands for a worker that could not be replaced
+            worker = self._idle.get(
+                timeout=(
+                    None if deadline is None else max(0, deadline - time.monotonic())
+                )
+            )
+        except queue.Empty:
+            raise WorkerWaitTimeout("No sandbox worker was idle before the deadline")
+        if deadline is not None:
+            remaining_ms = math.floor((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                self._idle.put(worker)
+                raise WorkerWaitTimeout(
+                    "No sandbox worker was idle before the deadline"
+                )
+            timeout_ms = min(timeout_ms, remaining_ms)
+        job = {
+            "source": source,
+            "timeout_ms": timeout_ms,
+            "memory_limit_mb": memory_limit_mb,
+            "output_limit": output_limit,
+        }
+
+        try:
+            if worker is None:
+                worker = ZygoteWorker(self.command)
+            return worker.run(job, on_output)
+        except Exception:
+            # The worker may be dead or in the middle of a job, so it is never reused
+            if worker is not None:
+                worker.close()
+            worker = None
+            try:
+                worker = ZygoteWorker(self.command)
+            except WarmPoolError:
+                pass  # Started again by the next run
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        """
+        Stops all idle workers.
+        """
+        with self._lock:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if worker is not None:
+                    worker.close()
+            self._started = False
+
+
+_warm_pools: dict[tuple[str, tuple[str, ...]], WarmPool] = {}
+_warm_pools_lock = threading.Lock()
+
+
+def get_warm_pool(
+    command: tuple[str, ...], name: str = "run", size: int = SANDBOX_WARM_POOL_SIZE
+) -> WarmPool:
+    """
+    Returns the warm pool of a sandbox worker command, creating it on first use.
+
+    Args:
+        command (tuple[str, ...]): The command starting a worker, see `Language.worker`.
+        name (str, optional): The name of the pools the pool belongs to, "run" for the
+            pools of interactive runs.
+        size (int, optional): The number of workers of the pool if it is created.
+
+    Returns:
+        WarmPool: The pool, with `size` workers once started.
+    """
+    with _warm_pools_lock:
+        pool = _warm_pools.get((name, command))
+        if pool is None:
+            pool = _warm_pools[(name, command)] = WarmPool(size, command)
+        return pool
+
+
+def shutdown_warm_pools() -> None:
+    """
+    Stops the idle workers of every pool.
+    """
+    with _warm_pools_lock:
+        pools = list(_warm_pools.values())
+    for pool in pools:
+        pool.shutdown()
+
+
+atexit.register(shutdown_warm_pools)
@@ -0,0 +1,249 @@
+"""
+This module is the sandbox worker ("zygote") process used by the warm interpreter pool.
+It is started once as a standalone `python3` process, imports commonly used modules, and
+then reads jobs from stdin as JSON lines. Each job is executed in a freshly forked child
+with its own resource limits, so the warmed parent is never modified by user code.
+
+The output of a job is kept in ring buffers of `output_limit` bytes per stream, like
+`src.output.OutputBuffer`. With `"stream": true`, each chunk is also sent as it arrives, in
+an `{"output": "stdout" | "stderr", "data": ...}` line before the job's result line.
+
+The module only depends on the standard library and `src.script_runner`, which runs the
+job's script, because it runs outside the application.
+"""
+
+import codecs
+import json
+import math
+import os
+import resource
+import selectors
+import signal
+import sys
+import time
+import traceback
+
+from script_runner import exec_source
+
+# Modules imported once by the zygote so every forked job finds them already loaded.
+WARM_MODULES = [
+    "bisect",
+    "collections",
+    "dataclasses",
+    "datetime",
+    "decimal",
+    "fractions",
+    "functools",
+    "heapq",
+    "itertools",
+    "json",
+    "math",
+    "operator",
+    "random",
+    "re",
+    "statistics",
+    "string",
+    "typing",
+]
+
+TRUNCATION_MARKER = "[... {} bytes truncated ...]\n"
+
+# Seconds between checks of a job that closed its output but has not exited yet
+REAP_INTERVAL_S = 0.005
+
+
+class OutputBuffer:
+    """
+    A ring buffer keeping the last `limit` bytes written to an output stream.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(0, limit)
+        self.data = bytearray()
+        self.dropped = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.data += chunk
+        excess = len(self.data) - self.limit
+        if excess > 0:
+            del self.data[:excess]
+            self.dropped += excess
+
+    def getvalue(self) -> str:
+        data = bytes(self.data)
+        if not self.dropped:
+            return data.decode("utf-8", errors="replace")
+        start = 0
+        while start < len(data) and data[start] & 0xC0 == 0x80:
+            start += 1  # Skip the rest of a character cut by the truncation
+        return TRUNCATION_MARKER.format(self.dropped + start) + data[start:].decode(
+            "utf-8", errors="replace"
+        )
+
+
+def send(message: dict) -> None:
+    """
+    Writes a message line to the pool.
+    """
+    sys.stdout.buffer.write(json.dumps(message).encode("utf-8") + b"\n")
+    sys.stdout.buffer.flush()
+
+
+def warm_up() -> None:
+    """
+    Imports the modules user code is likely to need.
+    """
+    for name in WARM_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+
+def set_resource_limits(timeout_ms: int, memory_limit_mb: int) -> None:
+    """
+    Applies the sandbox CPU and memory limits to the current process. `RLIMIT_CPU` counts
+    whole seconds: the job gets SIGXCPU once its CPU time reaches the timeout, rounded up,
+    plus one second, so the wall-clock timeout stops a busy job first.
+    """
+    cpu_seconds = math.ceil(timeout_ms / 1000) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    resource.setrlimit(
+        resource.RLIMIT_AS,
+        (memory_limit_mb * 1024 * 1024, memory_limit_mb * 1024 * 1024),
+    )
+
+
+def run_child(source: str, timeout_ms: int, memory_limit_mb: int, out_w, err_w):
+    """
+    Body of the forked job process. Never returns.
+    """
+    status = 1
+    try:
+        os.setsid()  # Own process group, so a timeout kills anything it spawns
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        for fd in (devnull, out_w, err_w):
+            os.close(fd)
+        set_resource_limits(timeout_ms, memory_limit_mb)
+        status = exec_source(source)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status & 0xFF)
+
+
+def kill_job(pid: int) -> None:
+    """
+    Kills a job's process group, or the job itself if it has not created the group yet.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def run_job(job: dict) -> dict:
+    """
+    Forks a child for the job, collects its output and enforces the wall-clock timeout.
+
+    Args:
+        job (dict): The job with `source`, `timeout_ms`, `memory_limit_mb` and
+            `output_limit` keys, and optionally `stream`.
+
+    Returns:
+        dict: The child's return code, the ends of its stdout and stderr, whether it timed out,
+            and its resource usage: wall and user/system CPU time in milliseconds and peak
+            resident set size in kilobytes.
+    """
+    timeout_ms = job["timeout_ms"]
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    start = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        os.close(out_r)
+        os.close(err_r)
+        run_child(job["source"], timeout_ms, job["memory_limit_mb"], out_w, err_w)
+    os.close(out_w)
+    os.close(err_w)
+
+    names = {out_r: "stdout", err_r: "stderr"}
+    buffers = {fd: OutputBuffer(job["output_limit"]) for fd in names}
+    decoders = {fd: codecs.getincrementaldecoder("utf-8")("replace") for fd in names}
+    selector = selectors.DefaultSelector()
+    selector.register(out_r, selectors.EVENT_READ)
+    selector.register(err_r, selectors.EVENT_READ)
+
+    deadline = time.monotonic() + timeout_ms / 1000
+    timed_out = False
+    while selector.get_map():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 and not timed_out:
+            timed_out = True
+            kill_job(pid)
+        for key, _ in selector.select(timeout=None if timed_out else remaining):
+            data = os.read(key.fd, 65536)
+            if data:
+                buffers[key.fd].write(data)
+                if job.get("stream"):
+                    text = decoders[key.fd].decode(data)
+                    if text:
+                        send({"output": names[key.fd], "data": text})
+            else:
+                selector.unregister(key.fd)
+                os.close(key.fd)
+    selector.close()
+
+    # The job can close its output and keep running, so the deadline holds while reaping
+    while True:
+        reaped, wait_status, usage = os.wait4(pid, 0 if timed_out else os.WNOHANG)
+        if reaped:
+            break
+        if time.monotonic() >= deadline:
+            timed_out = True
+            kill_job(pid)
+        else:
+            time.sleep(min(REAP_INTERVAL_S, deadline - time.monotonic()))
+    return {
+        "returncode": os.waitstatus_to_exitcode(wait_status),
+        "stdout": buffers[out_r].getvalue(),
+        "stderr": buffers[err_r].getvalue(),
+        "timed_out": timed_out,
+        "wall_ms": (time.monotonic() - start) * 1000,
+        "cpu_user_ms": usage.ru_utime * 1000,
+        "cpu_system_ms": usage.ru_stime * 1000,
+        "max_rss_kb": usage.ru_maxrss,
+    }
+
+
+def main() -> None:
+    """
+    Serves jobs from stdin until it is closed.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_up()
+
+    send({"ready": True})
+    for line in sys.stdin.buffer:
+        try:
+            result = run_job(json.loads(line))
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        send(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# This module is the Ruby sandbox worker ("zygote") used by the warm interpreter pool, the
+# Ruby counterpart of `src/zygote.py`. It is started once as a standalone `ruby` process,
+# requires commonly used libraries, and then reads jobs from stdin as JSON lines. Each job
+# is evaluated in a freshly forked child with its own resource limits, so the warmed parent
+# is never modified by user code.
+#
+# The output of a job is kept in ring buffers of `output_limit` bytes per stream. With
+# `"stream": true`, each chunk is also sent as it arrives, in an
+# `{"output": "stdout" | "stderr", "data": ...}` line before the job's result line.
+#
+# The module only depends on the Ruby standard library, bundled gems and
+# `src/script_runner.rb`, which runs the job's script, because it runs outside the
+# application.
+
+require "json"
+require_relative "script_runner"
+
+module Zygote
+  # Libraries required once by the zygote so every forked job finds them already loaded
+  WARM_LIBRARIES = %w[bigdecimal date minitest prime set time].freeze
+
+  TRUNCATION_MARKER = "[... %d bytes truncated ...]\n"
+
+  # Seconds between checks of a job that closed its output but has not exited yet
+  REAP_INTERVAL_S = 0.005
+
+  # A ring buffer keeping the last `limit` bytes written to an output stream.
+  class OutputBuffer
+    def initialize(limit)
+      @limit = [limit, 0].max
+      @data = String.new(encoding: Encoding::BINARY)
+      @dropped = 0
+    end
+
+    def write(chunk)
+      @data << chunk
+      excess = @data.bytesize - @limit
+      return unless excess.positive?
+
+      @data = @data.byteslice(excess, @limit)
+      @dropped += excess
+    end
+
+    def value
+      return Zygote.decode(@data.dup) if @dropped.zero?
+
+      # Skip the rest of a character cut by the truncation
+      start = @data.each_byte.take_while { |byte| byte & 0xC0 == 0x80 }.size
+      format(TRUNCATION_MARKER, @dropped + start) + Zygote.decode(@data.byteslice(start..))
+    end
+  end
+
+  # Decodes the output chunks of a stream, holding back a character split between chunks.
+  class OutputDecoder
+    def initialize
+      @pending = String.new(encoding: Encoding::BINARY)
+    end
+
+    def decode(chunk)
+      @pending << chunk
+      complete = @pending.bytesize
+      # Find the lead byte of the last character, if it is incomplete
+      (1..[3, complete].min).each do |back|
+        byte = @pending.getbyte(complete - back)
+        next if byte & 0xC0 == 0x80
+
+        length =
+          case byte
+          when 0xF0.. then 4
+          when 0xE0.. then 3
+          when 0xC0.. then 2
+          else 1
+          end
+        complete -= back if length > back
+        break
+      end
+      text = @pending.byteslice(0, complete)
+      @pending = @pending.byteslice(complete..)
+      Zygote.decode(text)
+    end
+  end
+
+  module_function
+
+  # Writes a message line to the pool.
+  def send_message(message)
+    $stdout.write(JSON.generate(message) + "\n")
+    $stdout.flush
+  end
+
+  # Requires the libraries user code is likely to need.
+  def warm_up
+    WARM_LIBRARIES.each do |name|
+      require name
+    rescue LoadError
+      nil
+    end
+  end
+
+  # A memory figure of the current process from /proc, in kilobytes.
+  def memory_status(field)
+    File.read("/proc/self/status")[/^#{field}:\s+(\d+)/, 1]&.to_i
+  rescue SystemCallError
+    nil
+  end
+
+  # Applies the sandbox CPU and memory limits to the current process. `RLIMIT_CPU` counts
+  # whole seconds, so the CPU limit is the timeout rounded up, plus one second so the
+  # wall-clock timeout stops a busy job first. The interpreter reserves a large address
+  # space of its own, so the memory limit is added to it.
+  def set_resource_limits(timeout_ms, memory_limit_mb)
+    cpu_seconds = (timeout_ms / 1000.0).ceil + 1
+    Process.setrlimit(Process::RLIMIT_CPU, cpu_seconds, cpu_seconds + 1)
+    memory = (memory_status("VmSize") || 0) * 1024 + memory_limit_mb * 1024 * 1024
+    Process.setrlimit(Process::RLIMIT_AS, memory, memory)
+  end
+
+  # Body of the forked job process. Never returns. Before exiting, the peak resident set
+  # size is written to `stats_w`, as Ruby cannot read the rusage of a single child.
+  def run_child(job, out_w, err_w, stats_w)
+    status = 1
+    begin
+      Process.setsid # Own process group, so a timeout kills anything it spawns
+      $stdin.reopen(File::NULL)
+      $stdout.reopen(out_w)
+      $stderr.reopen(err_w)
+      out_w.close
+      err_w.close
+      set_resource_limits(job["timeout_ms"], job["memory_limit_mb"])
+      status = ScriptRunner.exec_source(job["source"])
+    rescue Exception => e # rubocop:disable Lint/RescueException
+      $stderr.write(e.full_message(highlight: false))
+    ensure
+      $stdout.flush
+      $stderr.flush
+      stats_w.write(memory_status("VmHWM").to_s)
+      exit!(status & 0xFF)
+    end
+  end
+
+  # Kills a job's process group, or the job itself if it has not created the group yet.
+  def kill_job(pid)
+    Process.kill(:KILL, -pid)
+  rescue SystemCallError
+    begin
+      Process.kill(:KILL, pid)
+    rescue SystemCallError
+      nil
+    end
+  end
+
+  def decode(data)
+    data.force_encoding(Encoding::UTF_8).scrub
+  end
+
+  # Forks a child for the job, collects its output and enforces the wall-clock timeout.
+  # Returns the child's return code, the ends of its stdout and stderr, whether it timed out, and
+  # its resource usage: wall and user/system CPU time in milliseconds and peak resident set
+  # size in kilobytes, unknown if the child was killed.
+  def run_job(job)
+    out_r, out_w = IO.pipe
+    err_r, err_w = IO.pipe
+    stats_r, stats_w = IO.pipe
+
+    $stdout.flush
+    start = Process.clock_gettime(Process::CLOCK_MONOTONIC)
+    pid = fork do
+      out_r.close
+      err_r.close
+      stats_r.close
+      run_child(job, out_w, err_w, stats_w)
+    end
+    out_w.close
+    err_w.close
+    stats_w.close
+
+    names = { out_r => "stdout", err_r => "stderr" }
+    buffers = names.keys.to_h { |io| [io, OutputBuffer.new(job["output_limit"])] }
+    decoders = names.keys.to_h { |io| [io, OutputDecoder.new] }
+    readers = [out_r, err_r]
+    deadline = start + job["timeout_ms"] / 1000.0
+    timed_out = false
+    until readers.empty?
+      remaining = deadline - Process.clock_gettime(Process::CLOCK_MONOTONIC)
+      if remaining <= 0 && !timed_out
+        timed_out = true
+        kill_job(pid)
+      end
+      ready, = IO.select(readers, nil, nil, timed_out ? nil : [remaining, 0].max)
+      (ready || []).each do |io|
+        data = io.read_nonblock(65_536)
+        buffers[io].write(data)
+        if job["stream"]
+          text = decoders[io].decode(data)
+          send_message({ output: names[io], data: text }) unless text.empty?
+        end
+      rescue IO::WaitReadable
+        nil
+      rescue EOFError
+        readers.delete(io)
+        io.close
+      end
+    end
+
+    # The zygote runs one job at a time, so its children's CPU time grows by this job's
+    before = Process.times
+    # The job can close its output and keep running, so the deadline holds while reaping
+    status = nil
+    loop do
+      _, status = Process.wait2(pid, timed_out ? 0 : Process::WNOHANG)
+      break if status
+
+      remaining = deadline - Process.clock_gettime(Process::CLOCK_MONOTONIC)
+      if remaining <= 0
+        timed_out = true
+        kill_job(pid)
+      else
+        sleep([REAP_INTERVAL_S, remaining].min)
+      end
+    end
+    after = Process.times
+    max_rss_kb = stats_r.read
+    stats_r.close
+    {
+      returncode: status.exited? ? status.exitstatus : -status.termsig,
+      stdout: buffers[out_r].value,
+      stderr: buffers[err_r].value,
+      timed_out: timed_out,
+      wall_ms: (Process.clock_gettime(Process::CLOCK_MONOTONIC) - start) * 1000,
+      cpu_user_ms: (after.cutime - before.cutime) * 1000,
+      cpu_system_ms: (after.cstime - before.cstime) * 1000,
+      max_rss_kb: max_rss_kb.empty? ? nil : max_rss_kb.to_i,
+    }
+  end
+
+  # Serves jobs from stdin until it is closed.
+  def main
+    trap("INT", "IGNORE")
+    warm_up
+
+    send_message({ ready: true })
+    $stdin.each_line do |line|
+      result =
+        begin
+          run_job(JSON.parse(line))
+        rescue StandardError => e
+          { error: "#{e.class}: #{e.message}" }
+        end
+      send_message(result)
+    end
+  end
+end
+
+Zygote.main if $PROGRAM_NAME == __FILE__
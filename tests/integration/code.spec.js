@@ -14,15 +14,11 @@ describe("Code Generation Functionality", () => {
       "Write a Python function to add two numbers.",
     );
 
-    cy.intercept("POST", "/api/generate/code").as("generateCode");
-    cy.intercept("POST", "/api/generate/title").as("generateTitle");
-    cy.intercept("POST", "/api/generate/detect_language").as("detectLanguage");
+    cy.intercept("POST", "/api/generate/describe").as("describe");
 
     cy.get("#generate-code-btn").click();
 
-    cy.wait("@generateCode").its("response.statusCode").should("eq", 200);
-    cy.wait("@generateTitle").its("response.statusCode").should("eq", 200);
-    cy.wait("@detectLanguage").its("response.statusCode").should("eq", 200);
+    cy.wait("@describe").its("response.statusCode").should("eq", 200);
 
     cy.get("#generated-code code").should("contain.text", "def ");
     cy.get("#generated-code code").should("have.class", "python");
@@ -34,15 +30,11 @@ describe("Code Generation Functionality", () => {
       "Write a JavaScript function to add two numbers.",
     );
 
-    cy.intercept("POST", "/api/generate/code").as("generateCode");
-    cy.intercept("POST", "/api/generate/title").as("generateTitle");
-    cy.intercept("POST", "/api/generate/detect_language").as("detectLanguage");
+    cy.intercept("POST", "/api/generate/describe").as("describe");
 
     cy.get("#generate-code-btn").click();
 
-    cy.wait("@generateCode").its("response.statusCode").should("eq", 200);
-    cy.wait("@generateTitle").its("response.statusCode").should("eq", 200);
-    cy.wait("@detectLanguage").its("response.statusCode").should("eq", 200);
+    cy.wait("@describe").its("response.statusCode").should("eq", 200);
 
     cy.get("#generated-code code").should("contain.text", "function ");
     cy.get("#generated-code code").should("have.class", "javascript");
@@ -54,15 +46,11 @@ describe("Code Generation Functionality", () => {
       "Write a Ruby function to add two numbers.",
     );
 
-    cy.intercept("POST", "/api/generate/code").as("generateCode");
-    cy.intercept("POST", "/api/generate/title").as("generateTitle");
-    cy.intercept("POST", "/api/generate/detect_language").as("detectLanguage");
+    cy.intercept("POST", "/api/generate/describe").as("describe");
 
     cy.get("#generate-code-btn").click();
 
-    cy.wait("@generateCode").its("response.statusCode").should("eq", 200);
-    cy.wait("@generateTitle").its("response.statusCode").should("eq", 200);
-    cy.wait("@detectLanguage").its("response.statusCode").should("eq", 200);
+    cy.wait("@describe").its("response.statusCode").should("eq", 200);
 
     cy.get("#generated-code code").should("contain.text", "def ");
     cy.get("#generated-code code").should("have.class", "ruby");
@@ -252,14 +240,14 @@ describe("Code Generation Functionality", () => {
       "Write a Python function to add two numbers.",
     );
 
-    cy.intercept("POST", "/api/generate/code", {
+    cy.intercept("POST", "/api/generate/describe", {
       statusCode: 500,
       body: { detail: "OpenAI API error" },
-    }).as("generateCode");
+    }).as("describe");
 
     cy.get("#generate-code-btn").click();
 
-    cy.wait("@generateCode").its("response.statusCode").should("eq", 500);
+    cy.wait("@describe").its("response.statusCode").should("eq", 500);
     cy.get("#generated-code").should("contain.text", "OpenAI API error");
   });
 
@@ -292,14 +280,14 @@ describe("Code Generation Functionality", () => {
       "Write a Python function to add two numbers.",
     );
 
-    cy.intercept("POST", "/api/generate/code", {
+    cy.intercept("POST", "/api/generate/describe", {
       statusCode: 429,
       body: { detail: "Rate limit exceeded" },
-    }).as("generateCode");
+    }).as("describe");
 
     cy.get("#generate-code-btn").click();
 
-    cy.wait("@generateCode").its("response.statusCode").should("eq", 429);
+    cy.wait("@describe").its("response.statusCode").should("eq", 429);
     cy.get("#generated-code").should("contain.text", "Rate limit exceeded");
   });
 
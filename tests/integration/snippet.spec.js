@@ -1,3 +1,15 @@
+const describeEvents = (code, title, language) =>
+  [
+    ["code", code],
+    ["title", title],
+    ["language", { language }],
+    ["done", {}],
+  ]
+    .map(
+      ([event, data]) => `event: ${event}\ndata: ${JSON.stringify(data)}\n\n`,
+    )
+    .join("");
+
 describe("Snippet List Functionality", () => {
   // Setup before each test
   beforeEach(() => {
@@ -91,28 +103,20 @@ describe("Snippet List Functionality", () => {
     // Input description for the new snippet
     cy.get("#code-description").type("Write a function to add two numbers.");
 
-    // Intercept the generate code API request
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    // Intercept the describe API request
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Intercept the generate title API request
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Intercept the detect language API request
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     // Click the generate code button
     cy.get("#generate-code-btn").click();
 
-    // Wait for the generate code API request to complete
+    // Wait for the describe API request to complete
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     // Verify that the generated code is displayed
     cy.get("#generated-code code").should(
@@ -139,28 +143,20 @@ describe("Snippet List Functionality", () => {
     // Input description for the new snippet
     cy.get("#code-description").type("Write a function to add two numbers.");
 
-    // Intercept the generate code API request
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    // Intercept the describe API request
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Intercept the generate title API request
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Intercept the detect language API request
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     // Click the generate code button
     cy.get("#generate-code-btn").click();
 
-    // Wait for the generate code, title, and detect language API requests to complete
+    // Wait for the describe API request to complete
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     // Verify that the generated code is displayed
     cy.get("#generated-code code").should(
@@ -1,3 +1,18 @@
+const describeEvents = (code, title, language) =>
+  [
+    ["code", code],
+    ["title", title],
+    ["language", { language }],
+    ["done", {}],
+  ]
+    .map(
+      ([event, data]) => `event: ${event}\ndata: ${JSON.stringify(data)}\n\n`,
+    )
+    .join("");
+
+const messageEvents = (text) =>
+  `data: ${JSON.stringify(text)}\n\nevent: done\ndata: {}\n\n`;
+
 describe("Code Snippet Generator E2E Tests", () => {
   // Setup before each test
   beforeEach(() => {
@@ -98,27 +113,19 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should display test generation section after code generation", () => {
     // Simulate code generation
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Simulate title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type("Write a function to add two numbers.");
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#test-generation-section").should("be.visible");
@@ -126,34 +133,26 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should retain test generation section visibility after improving code", () => {
     // Simulate code generation
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Simulate title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type("Write a function to add two numbers.");
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#test-generation-section").should("be.visible");
 
     // Improve code
     cy.intercept("POST", "/api/generate/code_from_feedback", {
-      body: "def add(a: int, b: int) -> int: return a + b",
+      body: messageEvents("def add(a: int, b: int) -> int: return a + b"),
     }).as("improveCode");
 
     cy.get("#code-feedback").type("Add type hints to the parameters.");
@@ -170,54 +169,38 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should handle multiple code generations and retain test generation section visibility", () => {
     // Simulate initial code generation
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Simulate initial title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate initial language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type("Write a function to add two numbers.");
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#test-generation-section").should("be.visible");
 
     // Simulate second code generation
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def subtract(a, b): return a - b",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def subtract(a, b): return a - b",
+        "Subtraction Function",
+        "python",
+      ),
     }).as("generateCodeAgain");
 
-    // Simulate second title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Subtraction Function",
-    }).as("generateTitleAgain");
-
-    // Simulate second language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguageAgain");
-
     cy.get("#code-description")
       .clear()
       .type("Write a function to subtract two numbers.");
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCodeAgain");
-    cy.wait("@generateTitleAgain");
-    cy.wait("@detectLanguageAgain");
 
     cy.get("#generated-code code").should(
       "contain",
@@ -228,34 +211,26 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should enable the regenerate button when tests fail", () => {
     // Simulate code generation
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Simulate title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type("Write a function to add two numbers.");
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#test-generation-section").should("be.visible");
 
     // Simulate test generation
     cy.intercept("POST", "/api/generate/tests", {
-      body: "assert add(1, 2) == 3",
+      body: messageEvents("assert add(1, 2) == 3"),
     }).as("generateTests");
 
     cy.get("#generate-tests-btn").click();
@@ -284,34 +259,26 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should disable the regenerate button when tests pass", () => {
     // Simulate code generation
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Simulate title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type("Write a function to add two numbers.");
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#test-generation-section").should("be.visible");
 
     // Simulate test generation
     cy.intercept("POST", "/api/generate/tests", {
-      body: "assert add(1, 2) == 3",
+      body: messageEvents("assert add(1, 2) == 3"),
     }).as("generateTests");
 
     cy.get("#generate-tests-btn").click();
@@ -337,27 +304,19 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should highlight generated Python code correctly", () => {
     // Simulate code generation for Python
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b): return a + b",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b): return a + b",
+        "Addition Function",
+        "python",
+      ),
     }).as("generateCode");
 
-    // Simulate title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "python"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type("Write a function to add two numbers.");
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#generated-code code").should("have.class", "python");
@@ -370,20 +329,14 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should highlight generated JavaScript code correctly", () => {
     // Simulate code generation for JavaScript
-    cy.intercept("POST", "/api/generate/code", {
-      body: "function add(a, b) { return a + b; }",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "function add(a, b) { return a + b; }",
+        "Addition Function",
+        "javascript",
+      ),
     }).as("generateCode");
 
-    // Simulate title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "javascript"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type(
       "Write a function to add two numbers in JavaScript.",
@@ -391,8 +344,6 @@ describe("Code Snippet Generator E2E Tests", () => {
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#generated-code code").should("have.class", "javascript");
@@ -405,20 +356,14 @@ describe("Code Snippet Generator E2E Tests", () => {
 
   it("should highlight generated Ruby code correctly", () => {
     // Simulate code generation for Ruby
-    cy.intercept("POST", "/api/generate/code", {
-      body: "def add(a, b)\n  a + b\nend",
+    cy.intercept("POST", "/api/generate/describe", {
+      body: describeEvents(
+        "def add(a, b)\n  a + b\nend",
+        "Addition Function",
+        "ruby",
+      ),
     }).as("generateCode");
 
-    // Simulate title generation
-    cy.intercept("POST", "/api/generate/title", {
-      body: "Addition Function",
-    }).as("generateTitle");
-
-    // Simulate language detection
-    cy.intercept("POST", "/api/generate/detect_language", {
-      body: '{"language": "ruby"}',
-    }).as("detectLanguage");
-
     cy.get("#create-snippet-btn").click();
     cy.get("#code-description").type(
       "Write a function to add two numbers in Ruby.",
@@ -426,8 +371,6 @@ describe("Code Snippet Generator E2E Tests", () => {
     cy.get("#generate-code-btn").click();
 
     cy.wait("@generateCode");
-    cy.wait("@generateTitle");
-    cy.wait("@detectLanguage");
 
     cy.get("#generated-code code").should("not.be.empty");
     cy.get("#generated-code code").should("have.class", "ruby");
@@ -1,59 +1,57 @@
 from fastapi.testclient import TestClient
 import pytest
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from src.database import get_db, SQLALCHEMY_DATABASE_URL
+from src.database import (
+    create_async_db_engine,
+    create_db_engine,
+    create_session_factory,
+    get_db,
+)
 from src.models import Base
+from src.crud import revision_cache
+from src.response_cache import response_cache
 from src.app import app
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
-
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-
-@pytest.fixture(scope="session")
-def connection():
-    connection = engine.connect()
-    yield connection
-    connection.close()
+@pytest.fixture(scope="function")
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.sqlite3'}"
 
 
 @pytest.fixture(scope="function")
-def db_session(connection):
-    transaction = connection.begin()
-    options = dict(bind=connection, binds={})
-    session = TestingSessionLocal(**options)
-
+def db_session(database_url):
+    engine = create_db_engine(database_url)
     Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
 
     yield session
 
     session.close()
-    transaction.rollback()
+    engine.dispose()
 
 
 @pytest.fixture(scope="function")
-def client(request, db_session):
+def client(request, db_session, database_url):
     dependency_overrides = getattr(
         request,
         "param",
         {},
     )
+    async_engine = create_async_db_engine(database_url)
+    TestingSessionLocal = create_session_factory(async_engine)
 
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            db_session.close()
+    async def override_get_db():
+        async with TestingSessionLocal() as session:
+            yield session
 
     dependency_overrides[get_db] = override_get_db
     app.dependency_overrides.update(dependency_overrides)
+    response_cache.clear()
+    revision_cache.clear()
 
     with TestClient(app) as c:
         yield c
+        c.portal.call(async_engine.dispose)
 
     app.dependency_overrides.clear()
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import runner
+from src.batch import BatchJob, MemoryBudget, run_batch, run_memory_mb, run_snippet
+from src.languages import PYTHON
+from src.runner import SandboxCapacity
+from src.warm_pool import get_warm_pool
+
+
+def test_memory_budget_throttles_runs():
+    budget = MemoryBudget(512)
+
+    async def main():
+        await budget.reserve(256)
+        await budget.reserve(256)
+        third = asyncio.ensure_future(budget.reserve(256))
+        await asyncio.sleep(0)
+        assert not third.done()
+
+        await budget.release(256)
+        await asyncio.wait_for(third, 1)
+
+    asyncio.run(main())
+    assert budget.reserved_mb == 512
+
+
+def test_memory_budget_admits_oversized_run_alone():
+    budget = MemoryBudget(128)
+
+    async def main():
+        await asyncio.wait_for(budget.reserve(256), 1)
+        second = asyncio.ensure_future(budget.reserve(64))
+        await asyncio.sleep(0)
+        assert not second.done()
+        await budget.release(256)
+        await asyncio.wait_for(second, 1)
+
+    asyncio.run(main())
+    assert budget.reserved_mb == 64
+
+
+def test_run_memory_mb_counts_parallel_cases(monkeypatch):
+    monkeypatch.setattr(
+        "src.batch.batch_capacity",
+        SandboxCapacity("batch", 2, ThreadPoolExecutor(max_workers=2)),
+    )
+    test_code = "".join(f"def test_{i}():\n    assert True\n" for i in range(3))
+
+    assert run_memory_mb(PYTHON, "assert True", 256) == 256
+    assert run_memory_mb(PYTHON, test_code, 256) == 512
+
+
+def test_run_snippet_does_not_take_interactive_workers(monkeypatch):
+    monkeypatch.setattr(runner, "SANDBOX_MODE", "warm")
+    pool = get_warm_pool(PYTHON.worker)
+    pool.start()
+    busy = [pool._idle.get() for _ in range(pool.size)]
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(run_snippet, PYTHON, "", "assert True")
+            assert future.result(timeout=10)["result"] == "success"
+    finally:
+        for worker in busy:
+            pool._idle.put(worker)
+
+
+def test_run_batch_rejects_concurrency_above_its_pools(monkeypatch):
+    monkeypatch.setattr("src.batch.BATCH_CONCURRENCY", 2)
+    with pytest.raises(ValueError):
+        asyncio.run(run_batch(BatchJob("python"), None, 3))
@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src import app as app_module, database
+from src.database import (
+    create_async_db_engine,
+    create_db_engine,
+    create_session_factory,
+)
+
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    with engine.connect() as connection:
+        pragma = lambda name: connection.execute(text(f"PRAGMA {name}")).scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 5000
+        assert pragma("cache_size") == -65536
+    assert engine.pool.size() == 5
+    engine.dispose()
+
+
+def test_in_memory_engine_skips_pool_sizes():
+    engine = create_db_engine("sqlite:///:memory:")
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+    engine.dispose()
+
+
+def test_app_creates_schema_on_in_memory_database(monkeypatch):
+    async_engine = create_async_db_engine("sqlite:///:memory:")
+    monkeypatch.setattr(app_module, "async_engine", async_engine)
+    monkeypatch.setattr(database, "SessionLocal", create_session_factory(async_engine))
+
+    with TestClient(app_module.app) as client:
+        snippet_id = client.post("/api/snippets", json={"title": "Add"}).json()["id"]
+        response = client.get(f"/api/snippets/{snippet_id}")
+        assert response.status_code == 200
+        assert response.json()["title"] == "Add"
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.executor import ExecutionPool, ExecutionPoolFull
+
+
+def test_execution_pool_runs_blocking_function():
+    pool = ExecutionPool(max_concurrency=2, max_queue=0)
+
+    async def main():
+        return await asyncio.gather(pool.submit(sum, [1, 2]), pool.submit(max, 3, 4))
+
+    assert asyncio.run(main()) == [3, 4]
+    assert pool.stats()["running"] == 0
+    pool.shutdown()
+
+
+def test_execution_pool_keeps_event_loop_responsive():
+    pool = ExecutionPool(max_concurrency=1, max_queue=0)
+
+    async def main():
+        job = asyncio.ensure_future(pool.submit(time.sleep, 0.3))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        await job
+        return elapsed
+
+    assert asyncio.run(main()) < 0.2
+    pool.shutdown()
+
+
+def test_execution_pool_rejects_when_queue_is_full():
+    pool = ExecutionPool(max_concurrency=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(pool.submit(release.wait))
+        queued = asyncio.ensure_future(pool.submit(release.wait))
+        await asyncio.sleep(0)
+        assert pool.stats()["running"] == 1
+        assert pool.stats()["queued"] == 1
+
+        with pytest.raises(ExecutionPoolFull):
+            await pool.submit(release.wait)
+
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+    pool.shutdown()
+
+
+def test_execution_pool_counts_cancelled_job_until_it_ends():
+    pool = ExecutionPool(max_concurrency=1, max_queue=0)
+    release = threading.Event()
+
+    async def main():
+        job = asyncio.ensure_future(pool.submit(release.wait))
+        await asyncio.sleep(0.05)
+        job.cancel()
+        await asyncio.sleep(0)
+        # The thread still runs, so the pool stays full
+        assert pool.stats()["running"] == 1
+        with pytest.raises(ExecutionPoolFull):
+            await pool.submit(release.wait)
+
+        release.set()
+        for _ in range(100):
+            if pool.stats()["running"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.submit(sum, [1, 2]) == 3
+
+    asyncio.run(main())
+    pool.shutdown()
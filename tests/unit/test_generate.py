@@ -0,0 +1,137 @@
+import json
+
+from src.routers import generate
+
+
+def parse_events(body: str) -> list[tuple[str, object]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_detect_language_is_cached(client, monkeypatch):
+    calls = []
+
+    async def fake_chatgpt_response(messages, response_format=None, endpoint=None):
+        calls.append(messages)
+        return json.dumps({"language": "ruby"})
+
+    monkeypatch.setattr(generate, "chatgpt_response", fake_chatgpt_response)
+    generate.llm_cache.cache.clear()
+
+    for _ in range(3):
+        response = client.post(
+            "/api/generate/detect_language", json={"description": "Rails app"}
+        )
+        assert response.status_code == 200
+        assert response.json() == {"language": "ruby"}
+
+    assert len(calls) == 1
+    assert client.get("/api/generate/cache").json()["hits"] >= 2
+
+
+def test_title_stream_is_replayed_from_cache(client, monkeypatch):
+    calls = []
+
+    async def fake_chatgpt_stream_response(messages, endpoint=None):
+        calls.append(messages)
+        for chunk in ["Binary", " search"]:
+            yield chunk
+
+    monkeypatch.setattr(
+        generate, "chatgpt_stream_response", fake_chatgpt_stream_response
+    )
+    generate.llm_cache.cache.clear()
+
+    for _ in range(2):
+        response = client.post(
+            "/api/generate/title", json={"description": "binary search"}
+        )
+        assert response.status_code == 200
+        events = parse_events(response.text)
+        text = "".join(data for event, data in events if event == "message")
+        assert text == "Binary search"
+        assert events[-1] == ("done", {})
+
+    assert len(calls) == 1
+
+
+def test_prompt_versions(client):
+    response = client.get("/api/generate/prompts")
+    assert response.status_code == 200
+    assert "generate_title" in response.json()
+
+
+def test_describe_multiplexes_events(client, monkeypatch):
+    async def fake_chatgpt_response(messages, response_format=None, endpoint=None):
+        return json.dumps({"language": "python"})
+
+    async def fake_chatgpt_stream_response(messages, endpoint=None):
+        chunks = {"title": ["Add", " numbers"], "code": ["def add", "(a, b):\n"]}
+        for chunk in chunks[endpoint]:
+            yield chunk
+
+    monkeypatch.setattr(generate, "chatgpt_response", fake_chatgpt_response)
+    monkeypatch.setattr(
+        generate, "chatgpt_stream_response", fake_chatgpt_stream_response
+    )
+    generate.llm_cache.cache.clear()
+
+    response = client.post("/api/generate/describe", json={"description": "add"})
+    assert response.status_code == 200
+    events = parse_events(response.text)
+
+    assert events[-1] == ("done", {})
+    assert "".join(d for e, d in events if e == "code") == "def add(a, b):\n"
+    assert "".join(d for e, d in events if e == "title") == "Add numbers"
+    assert ("language", {"language": "python"}) in events
+
+
+def test_describe_reports_failed_source(client, monkeypatch):
+    async def failing_chatgpt_response(messages, response_format=None, endpoint=None):
+        raise RuntimeError("upstream down")
+
+    async def fake_chatgpt_stream_response(messages, endpoint=None):
+        yield endpoint
+
+    monkeypatch.setattr(generate, "chatgpt_response", failing_chatgpt_response)
+    monkeypatch.setattr(
+        generate, "chatgpt_stream_response", fake_chatgpt_stream_response
+    )
+    generate.llm_cache.cache.clear()
+
+    response = client.post("/api/generate/describe", json={"description": "x"})
+    events = parse_events(response.text)
+
+    assert ("error", {"source": "language", "message": "upstream down"}) in events
+    assert ("code", "code") in events
+    assert events[-1] == ("done", {})
+
+
+def test_stream_can_be_resumed(client, monkeypatch):
+    async def fake_chatgpt_stream_response(messages, endpoint=None):
+        for chunk in ["def", " add", "(a, b):"]:
+            yield chunk
+
+    monkeypatch.setattr(
+        generate, "chatgpt_stream_response", fake_chatgpt_stream_response
+    )
+    monkeypatch.setattr("src.sse.SSE_BATCH_BYTES", 1)  # One event per chunk
+
+    response = client.post("/api/generate/code", json={"description": "add"})
+    stream_id = response.headers["X-Stream-Id"]
+    first_id = response.text.split("\n")[0].removeprefix("id: ")
+
+    resumed = client.get(
+        f"/api/generate/streams/{stream_id}", headers={"Last-Event-ID": first_id}
+    )
+    assert resumed.status_code == 200
+    assert parse_events(resumed.text) == [
+        ("message", " add"),
+        ("message", "(a, b):"),
+        ("done", {}),
+    ]
+
+    assert client.get("/api/generate/streams/unknown").status_code == 404
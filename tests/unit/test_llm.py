@@ -0,0 +1,23 @@
+import asyncio
+
+from src import llm
+
+
+def test_endpoint_timeout(monkeypatch):
+    assert llm.endpoint_timeout("detect_language").read == 15.0
+    assert llm.endpoint_timeout("unknown").read == llm.OPENAI_TIMEOUT_S
+
+    monkeypatch.setenv("OPENAI_TIMEOUT_TITLE_S", "3")
+    assert llm.endpoint_timeout("title").read == 3.0
+    assert llm.endpoint_timeout("title").connect == llm.OPENAI_CONNECT_TIMEOUT_S
+
+
+def test_shared_client_is_reused(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm, "_client", None)
+
+    client = llm.get_client()
+    assert llm.get_client() is client
+
+    asyncio.run(llm.close_client())
+    assert llm._client is None
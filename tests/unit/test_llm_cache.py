@@ -0,0 +1,74 @@
+import asyncio
+
+from src.llm_cache import CoalescingCache, llm_cache_key
+
+
+def test_llm_cache_key_depends_on_all_inputs():
+    messages = [{"role": "user", "content": "hi"}]
+    key = llm_cache_key("a.txt", "model", messages)
+    assert key == llm_cache_key("a.txt", "model", list(messages))
+    assert key != llm_cache_key("b.txt", "model", messages)
+    assert key != llm_cache_key("a.txt", "other", messages)
+    assert key != llm_cache_key("a.txt", "model", messages, response_format={})
+
+
+def test_complete_coalesces_concurrent_requests():
+    cache = CoalescingCache(maxsize=8)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "python"
+
+    async def main():
+        results = await asyncio.gather(*(cache.complete("k", fetch) for _ in range(5)))
+        assert results == ["python"] * 5
+        assert await cache.complete("k", fetch) == "python"  # Served from the cache
+
+    asyncio.run(main())
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_complete_does_not_cache_errors():
+    cache = CoalescingCache(maxsize=8)
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def main():
+        try:
+            await cache.complete("k", fail)
+        except RuntimeError:
+            pass
+        assert await cache.complete("k", lambda: asyncio.sleep(0, "ok")) == "ok"
+
+    asyncio.run(main())
+
+
+def test_stream_is_shared_and_replayed():
+    cache = CoalescingCache(maxsize=8)
+    opened = 0
+
+    async def upstream():
+        nonlocal opened
+        opened += 1
+        for chunk in ["Sort", " a", " list"]:
+            await asyncio.sleep(0.001)
+            yield chunk
+
+    async def collect():
+        return [chunk async for chunk in cache.stream("k", upstream)]
+
+    async def main():
+        first, second = await asyncio.gather(collect(), collect())
+        await asyncio.sleep(0)  # Let the done callback store the completion
+        replayed = await collect()
+        return first, second, replayed
+
+    first, second, replayed = asyncio.run(main())
+    assert first == second == replayed == ["Sort", " a", " list"]
+    assert opened == 1
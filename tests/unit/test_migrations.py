@@ -0,0 +1,142 @@
+import asyncio
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session, undefer_group
+
+from src import crud, migrations
+from src.database import (
+    create_async_db_engine,
+    create_db_engine,
+    create_session_factory,
+)
+from src.models import Base, Blob, Snippet
+
+# The schema before migrations, with the FTS index added by `create_all` before the texts
+# moved to blobs
+LEGACY_SCHEMA = (
+    """
+    CREATE TABLE snippets (
+        id INTEGER PRIMARY KEY, title VARCHAR, language VARCHAR, description TEXT,
+        code TEXT, feedback TEXT, test_code TEXT, test_feedback TEXT,
+        test_result VARCHAR, test_result_message TEXT, is_active BOOLEAN,
+        created_at DATETIME, updated_at DATETIME
+    )
+    """,
+    "CREATE INDEX ix_snippets_id ON snippets (id)",
+    "CREATE INDEX ix_snippets_title ON snippets (title)",
+    "CREATE INDEX ix_snippets_language ON snippets (language)",
+    "CREATE INDEX ix_snippets_updated_at_id ON snippets (updated_at, id)",
+    """
+    CREATE VIRTUAL TABLE snippets_fts USING fts5(
+        title, description, code, content='snippets', content_rowid='id'
+    )
+    """,
+)
+
+
+def snippet_indexes(engine):
+    return {index["name"] for index in inspect(engine).get_indexes("snippets")}
+
+
+def test_migrate_legacy_database(database_url):
+    engine = create_db_engine(database_url)
+    with engine.begin() as connection:
+        for ddl in LEGACY_SCHEMA:
+            connection.execute(text(ddl))
+        connection.execute(
+            text(
+                "INSERT INTO snippets (id, title, code, test_code, is_active) VALUES "
+                "(1, 'One', 'def square(x): ...', 'assert True', 1), "
+                "(2, 'Two', 'def square(x): ...', NULL, 1), "
+                "(3, 'Three', 'def square(x): ...', '', 0)"
+            )
+        )
+
+    Base.metadata.create_all(engine)
+    assert [m.version for m in migrations.migrate(engine)] == [1, 2, 3, 4]
+    assert snippet_indexes(engine) == {"ix_snippets_active_updated_at"}
+    assert migrations.migrate(engine) == []
+
+    with Session(engine) as db:
+        snippets = db.scalars(
+            select(Snippet).options(undefer_group("texts")).order_by(Snippet.id)
+        ).all()
+        assert [s.code for s in snippets] == ["def square(x): ..."] * 3
+        assert [s.test_code for s in snippets] == ["assert True", "", ""]
+        # The shared code is stored once, and counts its references
+        assert sorted(db.scalars(select(Blob.refs))) == [1, 3]
+        assert [s.revision for s in snippets] == [1, 1, 1]
+
+        # Only active snippets are indexed
+        search = text(
+            "SELECT rowid FROM snippets_fts WHERE snippets_fts MATCH 'square'"
+        )
+        assert db.scalars(search).all() == [1, 2]
+        db.execute(
+            text("INSERT INTO snippets_fts(snippets_fts) VALUES ('integrity-check')")
+        )
+    engine.dispose()
+
+
+def test_migrate_fresh_database(database_url):
+    engine = create_db_engine(database_url)
+    Base.metadata.create_all(engine)
+    assert migrations.migrate(engine) == list(migrations.MIGRATIONS)
+    assert snippet_indexes(engine) == {"ix_snippets_active_updated_at"}
+    engine.dispose()
+
+
+def query_plans(database_url, call) -> list[str]:
+    """
+    Runs `call(db)` and returns the EXPLAIN QUERY PLAN of each SELECT it executed.
+    """
+    statements = []
+
+    async def main():
+        engine = create_async_db_engine(database_url)
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def capture(connection, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        async with create_session_factory(engine)() as db:
+            await call(db)
+            plans = []
+            for statement, parameters in statements:
+                connection = await db.connection()
+                rows = await connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+                plans.append(" | ".join(row.detail for row in rows))
+        await engine.dispose()
+        return plans
+
+    return asyncio.run(main())
+
+
+def test_snippet_list_uses_partial_index(client, database_url):
+    client.post("/api/snippets/", json={"title": "One", "language": "python"})
+    client.post("/api/snippets/", json={"title": "Two", "language": "python"})
+    cursor = client.get("/api/snippets?limit=1").headers["X-Next-Cursor"]
+
+    async def call(db):
+        await crud.get_snippets(db)
+        await crud.get_snippets(db, cursor=cursor)
+        await crud.get_snippets(db, language="python", summary=True)
+
+    plans = query_plans(database_url, call)
+    assert len(plans) == 3
+    for plan in plans:
+        assert "USING INDEX ix_snippets_active_updated_at" in plan
+        assert "TEMP B-TREE" not in plan
+    # The cursor seeks into the index instead of scanning it
+    assert plans[1].startswith("SEARCH")
+
+
+def test_snippet_lookup_uses_primary_key(client, database_url):
+    async def call(db):
+        await crud.get_snippet(db, 1)
+
+    (plan,) = query_plans(database_url, call)
+    assert "USING INTEGER PRIMARY KEY" in plan
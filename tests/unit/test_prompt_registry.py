@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from src.prompt_registry import (
+    PROMPT_NAMES,
+    PROMPTS_DIR,
+    PromptError,
+    PromptRegistry,
+)
+
+
+def test_all_prompts_load():
+    registry = PromptRegistry(PROMPTS_DIR, PROMPT_NAMES)
+    registry.load()
+    assert set(registry.versions()) == set(PROMPT_NAMES)
+    assert registry.get("generate_title").text
+
+
+def test_missing_prompt_fails_load(tmp_path):
+    (tmp_path / "a.txt").write_text("prompt a")
+    registry = PromptRegistry(str(tmp_path), ("a", "b"))
+    with pytest.raises(PromptError, match="b.txt not found"):
+        registry.load()
+
+
+def test_changed_prompt_is_reloaded(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("first version")
+    registry = PromptRegistry(str(tmp_path), ("a",), reload_interval=1e-9)
+    registry.load()
+    first = registry.get("a")
+
+    path.write_text("second version")
+    os.utime(path, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+    second = registry.get("a")
+    assert second.text == "second version"
+    assert second.version != first.version
+
+
+def test_broken_reload_keeps_previous_prompt(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("first version")
+    registry = PromptRegistry(str(tmp_path), ("a",), reload_interval=1e-9)
+    registry.load()
+
+    path.unlink()
+    assert registry.get("a").text == "first version"
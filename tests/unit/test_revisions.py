@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from src import crud, revisions, schemas
+from src.database import create_async_db_engine, create_session_factory
+
+FIELDS = dict.fromkeys(revisions.REVISION_FIELDS, "")
+
+
+def test_diff_and_patch_text():
+    old = "def f(x):\n    return x\n\nprint(f(1))\n"
+    new = "def f(x):\n    return x * 2\n\nprint(f(1))\nprint(f(2))"
+    operations = revisions.diff_text(old, new)
+    assert revisions.patch_text(old, operations) == new
+    # Unchanged lines are copied by position, not stored
+    assert "def f(x):\n" not in operations
+
+
+def test_reconstruct_from_keyframe(monkeypatch):
+    monkeypatch.setattr(revisions, "REVISION_KEYFRAME_INTERVAL", 3)
+    versions = [{**FIELDS, "code": "a = 1\n" * 50 + f"b = {n}\n"} for n in range(1, 6)]
+    stored, previous = [], None
+    for number, values in enumerate(versions, start=1):
+        stored.append(revisions.encode(number, values, previous))
+        previous = values
+
+    assert [keyframe for keyframe, _ in stored] == [True, False, False, True, False]
+    assert revisions.reconstruct(stored[:3]) == versions[2]
+    assert revisions.reconstruct(stored[3:]) == versions[4]
+    assert len(stored[1][1]) < len(stored[0][1])
+    with pytest.raises(ValueError):
+        revisions.reconstruct(stored[1:3])
+
+
+def test_update_retries_stale_revision(client, database_url):
+    snippet_id = client.post("/api/snippets/", json={"code": "x = 1\n"}).json()["id"]
+
+    async def main():
+        engine = create_async_db_engine(database_url)
+        SessionLocal = create_session_factory(engine)
+        async with SessionLocal() as stale, SessionLocal() as other:
+            db_snippet = await crud.get_snippet(stale, snippet_id)
+            await stale.commit()
+            await crud.change_snippet(other, snippet_id, {"code": "x = 2\n"})
+            await other.commit()
+
+            updated = await crud.change_snippet(
+                stale, snippet_id, {"code": "x = 3\n"}, db_snippet
+            )
+            await stale.commit()
+            second = await crud.get_revision(stale, snippet_id, 2)
+        await engine.dispose()
+        return updated.revision, second["code"]
+
+    assert asyncio.run(main()) == (3, "x = 2\n")
+
+
+def test_update_is_diffed_against_cached_revision(client, database_url):
+    snippet_id = client.post("/api/snippets/", json={"code": "x = 1\n"}).json()["id"]
+    client.put(f"/api/snippets/{snippet_id}", json={"code": "x = 2\n"})
+    stale = crud.revision_cache.get(snippet_id)
+    client.put(f"/api/snippets/{snippet_id}", json={"code": "x = 3\n"})
+
+    async def main():
+        engine = create_async_db_engine(database_url)
+        SessionLocal = create_session_factory(engine)
+        statements = []
+        event.listen(
+            engine.sync_engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2].split()[0]),
+        )
+        async with SessionLocal() as db:
+            updated = await crud.update_snippet(
+                db, snippet_id, schemas.SnippetUpdate(code="x = 4\n")
+            )
+            assert "SELECT" not in statements  # Neither read before nor after
+
+            crud.revision_cache.set(snippet_id, stale)  # As if another process updated
+            updated = await crud.update_snippet(
+                db, snippet_id, schemas.SnippetUpdate(code="x = 5\n")
+            )
+            assert updated.code == "x = 5\n"
+            history = [
+                (await crud.get_revision(db, snippet_id, number))["code"]
+                for number in range(1, 6)
+            ]
+        await engine.dispose()
+        return updated.revision, history
+
+    assert asyncio.run(main()) == (5, [f"x = {n}\n" for n in range(1, 6)])
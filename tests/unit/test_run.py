@@ -0,0 +1,242 @@
+import json
+import shutil
+import time
+
+import pytest
+
+from src import batch, runner
+from src.executor import ExecutionPool
+
+
+def test_run_python(client):
+    snippet_id = client.post("/api/snippets", json={}).json()["id"]
+
+    response = client.post(
+        "/api/run/python",
+        json={
+            "snippet_id": snippet_id,
+            "code": "def add(a, b):\n    return a + b",
+            "language": "python",
+            "test_code": "assert add(1, 2) == 3",
+        },
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["result"] == "success"
+    assert result["wall_ms"] > 0 and result["max_rss_kb"] > 0
+    assert not result["timed_out"]
+
+    snippet = client.get(f"/api/snippets/{snippet_id}").json()
+    assert snippet["test_result"] == "success"
+    assert snippet["test_wall_ms"] == result["wall_ms"]
+    assert snippet["test_max_rss_kb"] == result["max_rss_kb"]
+    assert snippet["test_timed_out"] is False
+
+
+def test_run_python_reports_each_test(client):
+    snippet_id = client.post("/api/snippets", json={}).json()["id"]
+
+    response = client.post(
+        "/api/run/python",
+        json={
+            "snippet_id": snippet_id,
+            "code": "def add(a, b):\n    return a + b",
+            "language": "python",
+            "test_code": "def test_add():\n    assert add(1, 2) == 3\n\n"
+            "def test_add_zero():\n    assert add(0, 1) == 0",
+        },
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["result"] == "failure"
+    assert [(test["name"], test["result"]) for test in result["tests"]] == [
+        ("test_add", "success"),
+        ("test_add_zero", "failure"),
+    ]
+
+
+def test_run_python_unsupported_language(client):
+    snippet_id = client.post("/api/snippets", json={}).json()["id"]
+
+    response = client.post(
+        "/api/run/python",
+        json={
+            "snippet_id": snippet_id,
+            "code": "",
+            "language": "cobol",
+            "test_code": "",
+        },
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_run_javascript(client):
+    snippet_id = client.post("/api/snippets", json={}).json()["id"]
+    payload = {
+        "snippet_id": snippet_id,
+        "code": "const add = (a, b) => a + b",
+        "language": "javascript",
+        "test_code": "assert.strictEqual(add(1, 2), 3)",
+    }
+
+    response = client.post("/api/run/javascript", json=payload)
+    assert response.status_code == 200
+    assert response.json()["result"] == "success"
+
+    # The runner must match the snippet's language
+    assert client.post("/api/run/python", json=payload).status_code == 400
+
+
+def test_run_python_pool_full(client, monkeypatch):
+    snippet_id = client.post("/api/snippets", json={}).json()["id"]
+
+    runner.run_result_cache.clear()
+    full_pool = ExecutionPool(max_concurrency=1, max_queue=0)
+    full_pool._pending = 1  # Pretend a run is already in progress
+    monkeypatch.setattr(runner, "execution_pool", full_pool)
+
+    response = client.post(
+        "/api/run/python",
+        json={
+            "snippet_id": snippet_id,
+            "code": "",
+            "language": "python",
+            "test_code": "",
+        },
+    )
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_run_python_cached_result(client):
+    first_id = client.post("/api/snippets", json={}).json()["id"]
+    second_id = client.post("/api/snippets", json={}).json()["id"]
+    payload = {
+        "code": "def mul(a, b):\n    return a * b",
+        "language": "python",
+        "test_code": "assert mul(2, 3) == 7",
+    }
+
+    first = client.post("/api/run/python", json={"snippet_id": first_id, **payload})
+    assert first.headers["X-Cache"] == "MISS"
+    hits = client.get("/api/run/stats").json()["cache"]["hits"]
+
+    second = client.post("/api/run/python", json={"snippet_id": second_id, **payload})
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert client.get("/api/run/stats").json()["cache"]["hits"] == hits + 1
+
+    snippet = client.get(f"/api/snippets/{second_id}").json()
+    assert snippet["test_result"] == "failure"
+    assert "AssertionError" in snippet["test_result_message"]
+
+
+def test_run_python_stream(client):
+    snippet_id = client.post("/api/snippets", json={}).json()["id"]
+    runner.run_result_cache.clear()
+    payload = {
+        "snippet_id": snippet_id,
+        "code": "print('hello')",
+        "language": "python",
+        "test_code": "print('world')\nassert False",
+    }
+
+    response = client.post("/api/run/python/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (fields.get("event"), json.loads(fields["data"]))
+        for fields in (
+            dict(line.split(": ", 1) for line in block.split("\n"))
+            for block in response.text.strip().split("\n\n")
+        )
+    ]
+    assert "".join(data for event, data in events if event == "stdout") == (
+        "hello\nworld\n"
+    )
+    assert any(event == "stderr" for event, _ in events)
+    event, result = events[-2]
+    assert event == "result" and result["result"] == "failure"
+    assert events[-1] == ("done", {})
+
+    snippet = client.get(f"/api/snippets/{snippet_id}").json()
+    assert snippet["test_result"] == "failure"
+    assert snippet["test_wall_ms"] == result["wall_ms"]
+
+    payload["language"] = "ruby"
+    assert client.post("/api/run/python/stream", json=payload).status_code == 400
+
+
+def test_run_batch(client, monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(batch, "BATCH_COMMIT_SIZE", 2)
+    code = "def add(a, b):\n    return a + b"
+    tests = ["assert add(1, 2) == 3", "assert add(1, 2) == 0", "assert add(2, 2) == 4"]
+    snippet_ids = [
+        client.post(
+            "/api/snippets",
+            json={"language": "python", "code": code, "test_code": test_code},
+        ).json()["id"]
+        for test_code in tests
+    ]
+    untested_id = client.post(
+        "/api/snippets", json={"language": "python", "code": code}
+    ).json()["id"]
+
+    response = client.post("/api/run/batch", json={"language": "python"})
+    assert response.status_code == 202
+    job = response.json()
+    for _ in range(300):
+        if job["status"] != "running":
+            break
+        time.sleep(0.1)
+        job = client.get(f"/api/run/batch/{job['id']}").json()
+
+    assert job["status"] == "completed"
+    assert (job["total"], job["completed"], job["stored"]) == (3, 3, 3)
+    assert (job["passed"], job["failed"], job["errors"]) == (2, 1, 0)
+    results = [
+        client.get(f"/api/snippets/{snippet_id}").json()["test_result"]
+        for snippet_id in snippet_ids + [untested_id]
+    ]
+    assert results == ["success", "failure", "success", ""]
+
+    assert client.get("/api/run/batch/unknown").status_code == 404
+    assert client.post("/api/run/batch", json={"language": "cobol"}).status_code == 400
+
+
+def test_run_batch_stores_results_of_failed_job(client, monkeypatch):
+    run_snippet = batch.run_snippet
+
+    def failing_run_snippet(language, code, test_code):
+        if test_code == "assert broken()":
+            time.sleep(0.5)  # Lets the other runs complete
+            raise RuntimeError("Sandbox gone")
+        return run_snippet(language, code, test_code)
+
+    monkeypatch.setattr(batch, "run_snippet", failing_run_snippet)
+    code = "def add(a, b):\n    return a + b"
+    snippet_ids = [
+        client.post(
+            "/api/snippets",
+            json={"language": "python", "code": code, "test_code": test_code},
+        ).json()["id"]
+        for test_code in ["assert add(1, 2) == 3", "assert broken()"]
+    ]
+
+    job = client.post("/api/run/batch", json={"language": "python"}).json()
+    for _ in range(300):
+        if job["status"] != "running":
+            break
+        time.sleep(0.1)
+        job = client.get(f"/api/run/batch/{job['id']}").json()
+
+    assert job["status"] == "failed"
+    assert job["message"] == "Sandbox gone"
+    assert job["stored"] == 1
+    results = [
+        client.get(f"/api/snippets/{snippet_id}").json()["test_result"]
+        for snippet_id in snippet_ids
+    ]
+    assert results == ["success", ""]
@@ -1,4 +1,18 @@
-from src.runner import run_python_code
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import runner
+from src.runner import run_code, run_python_code
+
+
+@pytest.fixture(autouse=True, params=["cold", "warm"])
+def sandbox_mode(request, monkeypatch):
+    monkeypatch.setattr(runner, "SANDBOX_MODE", request.param)
+    return request.param
 
 
 def test_run_python_code_success():
@@ -30,6 +44,139 @@ assert add(-1, 1) == 0
     assert "AssertionError" in result["message"]
 
 
+def test_run_python_code_reports_each_test(monkeypatch):
+    monkeypatch.setattr(runner, "case_executor", ThreadPoolExecutor(max_workers=2))
+    code = """
+def add(a, b):
+    return a - b  # Intentional bug
+"""
+    test_code = """
+def test_zero():
+    assert add(0, 0) == 0
+
+def test_positive():
+    assert add(1, 2) == 3
+
+def test_same():
+    assert add(2, 2) == 4
+"""
+    result = run_python_code(code, test_code)
+    assert result["result"] == "failure"
+    assert [(test["name"], test["result"]) for test in result["tests"]] == [
+        ("test_zero", "success"),
+        ("test_positive", "failure"),
+        ("test_same", "failure"),
+    ]
+    # Every failure is reported, not only the first one
+    assert result["message"].startswith("2 of 3 tests failed")
+    assert result["message"].count("AssertionError") == 2
+    assert all(test["wall_ms"] > 0 for test in result["tests"])
+
+
+def test_run_python_code_labels_output_of_each_test(monkeypatch):
+    monkeypatch.setattr(runner, "case_executor", ThreadPoolExecutor(max_workers=2))
+    test_code = """
+def test_a():
+    print("one", end="")
+    print(" two")
+    print("three", end="")
+
+def test_b():
+    print("four")
+"""
+    chunks = []
+    result = run_code(
+        "python",
+        "",
+        test_code,
+        on_output=lambda stream, text: chunks.append((stream, text)),
+    )
+    assert result["result"] == "success"
+    lines = "".join(text for stream, text in chunks if stream == "stdout").splitlines()
+    assert sorted(lines) == ["[test_a] one two", "[test_a] three", "[test_b] four"]
+
+
+def test_run_python_code_passes_on_long_partial_lines(monkeypatch):
+    monkeypatch.setattr("src.output.CASE_OUTPUT_LINE_LIMIT", 100)
+    test_code = """
+import sys
+import time
+
+def test_a():
+    for _ in range(20):
+        sys.stdout.write("x" * 50)
+        sys.stdout.flush()
+        time.sleep(0.01)
+
+def test_b():
+    pass
+"""
+    chunks = []
+    result = run_code(
+        "python",
+        "",
+        test_code,
+        on_output=lambda stream, text: chunks.append((stream, text)),
+    )
+    assert result["result"] == "success"
+    lines = "".join(text for stream, text in chunks).splitlines()
+    assert all(line.startswith("[test_a] x") for line in lines)
+    assert len(lines) > 1  # Passed on before the case ended
+    assert sum(line.count("x") for line in lines) == 1000
+
+
+def test_run_python_code_timeout_bounds_the_suite(monkeypatch):
+    monkeypatch.setattr(runner, "case_executor", ThreadPoolExecutor(max_workers=1))
+    test_code = "".join(f"def test_{i}():\n    time.sleep(0.8)\n\n" for i in range(4))
+    start = time.monotonic()
+    result = run_python_code("import time", test_code, timeout_ms=1000)
+    assert time.monotonic() - start < 2.5
+    assert result["result"] == "failure" and result["timed_out"]
+    assert [test["result"] for test in result["tests"]][0] == "success"
+    assert "Not run" in result["tests"][-1]["message"]
+
+
+def test_run_python_code_suite_deadline_counts_worker_wait(sandbox_mode):
+    if sandbox_mode == "cold":
+        pytest.skip("only warm runs wait for a worker")
+    capacity = runner.SandboxCapacity(
+        "deadline-test", 1, ThreadPoolExecutor(max_workers=3)
+    )
+    test_code = "".join(f"def test_{i}():\n    time.sleep(0.8)\n\n" for i in range(3))
+    run_code("python", "", "pass", capacity=capacity)  # Start the worker
+    start = time.monotonic()
+    result = run_code("python", "import time", test_code, 1000, capacity=capacity)
+    assert time.monotonic() - start < 1.5
+    assert [test["result"] for test in result["tests"]][0] == "success"
+    assert result["timed_out"]
+
+
+def test_run_python_code_reports_each_top_level_assert(monkeypatch):
+    monkeypatch.setattr(runner, "case_executor", ThreadPoolExecutor(max_workers=2))
+    code = """
+class Stack(list):
+    def push(self, item):
+        self.append(item)
+"""
+    test_code = """
+s = Stack()
+s.push(1)
+s.push(2)
+assert s.pop() == 1
+assert s.pop() == 1
+assert not s
+"""
+    result = run_python_code(code, test_code)
+    assert result["result"] == "failure"
+    # Each assert sees the stack the asserts before it left, whether they passed or not
+    assert [(test["name"], test["result"]) for test in result["tests"]] == [
+        ("assert s.pop() == 1", "failure"),
+        ("assert s.pop() == 1", "success"),
+        ("assert not s", "success"),
+    ]
+    assert result["message"].startswith("1 of 3 tests failed")
+
+
 def test_run_python_code_timeout():
     code = """
 def infinite_loop():
@@ -41,6 +188,25 @@ infinite_loop()
 """
     result = run_python_code(code, test_code, timeout_ms=1000)
     assert result["result"] == "failure"
+    assert result["timed_out"] and not result["out_of_memory"]
+    assert result["wall_ms"] >= 1000
+
+
+def test_run_python_code_timeout_after_closing_output():
+    code = """
+import os
+import time
+"""
+    test_code = """
+os.close(1)
+os.close(2)
+time.sleep(8)
+"""
+    start = time.monotonic()
+    result = run_python_code(code, test_code, timeout_ms=1000)
+    assert time.monotonic() - start < 5
+    assert result["result"] == "failure"
+    assert result["timed_out"]
 
 
 def test_run_python_code_memory_limit():
@@ -55,3 +221,172 @@ memory_exhausted()
 """
     result = run_python_code(code, test_code, memory_limit_mb=50)
     assert result["result"] == "failure"
+    assert result["out_of_memory"] and not result["timed_out"]
+
+
+def test_run_python_code_metrics():
+    code = "import resource"
+    test_code = "assert resource.getrlimit(resource.RLIMIT_CPU)[0] == 3"  # 1.5 s + 1
+    result = run_python_code(code, test_code, timeout_ms=1500)
+    assert result["result"] == "success", result["message"]
+    assert result["wall_ms"] > 0
+    assert result["cpu_user_ms"] + result["cpu_system_ms"] > 0
+    assert result["max_rss_kb"] > 0
+    assert not result["timed_out"] and not result["out_of_memory"]
+
+
+def test_run_python_code_traceback_shows_source():
+    code = """
+def add(a, b):
+    return a - b
+"""
+    test_code = """
+assert add(1, 2) == 3, "add is broken"
+"""
+    result = run_python_code(code, test_code)
+    assert result["result"] == "failure"
+    assert 'File "' in result["message"]
+    assert "assert add(1, 2) == 3" in result["message"]
+    assert "AssertionError: add is broken" in result["message"]
+
+
+def test_run_python_code_exit_status():
+    result = run_python_code("import sys", "sys.exit(0)")
+    assert result["result"] == "success"
+
+    result = run_python_code("import sys", "sys.exit(3)")
+    assert result["result"] == "failure"
+
+
+def test_run_python_code_output_is_bounded(monkeypatch):
+    monkeypatch.setattr(runner, "SANDBOX_OUTPUT_LIMIT_BYTES", 1000)
+    chunks = []
+
+    result = run_code(
+        "python",
+        "import sys\nfor i in range(100000):\n    print('é', i, file=sys.stderr)",
+        "assert False",
+        on_output=lambda stream, text: chunks.append((stream, text)),
+    )
+    assert result["result"] == "failure"
+    assert result["message"].startswith("[... ")
+    assert "bytes truncated ...]" in result["message"]
+    assert len(result["message"].encode("utf-8")) < 1100
+    assert result["message"].rstrip().endswith("AssertionError")
+
+    streamed = "".join(text for stream, text in chunks if stream == "stderr")
+    assert streamed.startswith("é 0\né 1\n")
+    assert result["message"].split("\n", 1)[1] in streamed
+
+
+requires_node = pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+requires_ruby = pytest.mark.skipif(shutil.which("ruby") is None, reason="needs ruby")
+
+LANGUAGE_CASES = [
+    pytest.param(
+        "javascript",
+        "function add(a, b) {\n    return a - b;\n}\nmodule.exports = { add }",
+        "assert(add(0, 0) === 0)",
+        "assert.strictEqual(add(1, 2), 3)",
+        "AssertionError",
+        marks=requires_node,
+    ),
+    pytest.param(
+        "ruby",
+        "def add(a, b)\n  a - b\nend",
+        "assert_equal 0, add(0, 0)",
+        "assert_equal 3, add(1, 2)",
+        "Expected: 3",
+        marks=requires_ruby,
+    ),
+]
+
+
+@pytest.mark.parametrize("language, code, passing, failing, error", LANGUAGE_CASES)
+def test_run_code_languages(language, code, passing, failing, error):
+    assert run_code(language, code, passing)["result"] == "success"
+
+    result = run_code(language, code, failing)
+    assert result["result"] == "failure"
+    assert error in result["message"]
+    assert runner.resolve_language(language).script_name in result["message"]
+
+
+@pytest.mark.parametrize(
+    "language, code",
+    [
+        pytest.param("javascript", "while (true) {}", marks=requires_node),
+        pytest.param("ruby", "loop {}", marks=requires_ruby),
+        pytest.param(
+            "ruby", "STDOUT.close\nSTDERR.close\nsleep 8", marks=requires_ruby
+        ),
+    ],
+)
+def test_run_code_languages_timeout(language, code):
+    result = run_code(language, code, "", timeout_ms=500)
+    assert result["result"] == "failure"
+    assert result["timed_out"]
+
+
+@requires_node
+def test_run_code_javascript_has_resource_limits():
+    test_code = """
+const { execSync } = require("child_process");
+assert.strictEqual(execSync("ulimit -t", { shell: "/bin/sh" }).toString().trim(), "2");
+"""
+    result = run_code("javascript", "", test_code, timeout_ms=1000)
+    assert result["result"] == "success", result["message"]
+
+
+@pytest.mark.parametrize(
+    "language, code",
+    [
+        pytest.param(
+            "javascript",
+            "const a = [];\nwhile (true) a.push(new Array(1e5).fill(1));",
+            marks=requires_node,
+        ),
+        pytest.param(
+            "ruby", "a = []\nloop { a << 'x' * 1_000_000 }", marks=requires_ruby
+        ),
+    ],
+)
+def test_run_code_languages_memory_limit(language, code):
+    result = run_code(language, code, "", memory_limit_mb=50)
+    assert result["result"] == "failure"
+    assert result["out_of_memory"]
+
+
+@pytest.mark.parametrize(
+    "language, code, passing, failing, error",
+    [
+        (
+            "python",
+            "def add(a, b):\n    return a - b",
+            "assert add(0, 0) == 0",
+            "assert add(1, 2) == 3",
+            "assert add(1, 2) == 3",  # The source line is shown
+        ),
+        *LANGUAGE_CASES,
+    ],
+)
+def test_run_code_cold_staging(
+    monkeypatch, sandbox_mode, language, code, passing, failing, error
+):
+    if sandbox_mode == "warm":
+        pytest.skip("Staging only applies to cold runs")
+    script_name = runner.resolve_language(language).script_name
+
+    for staging in ("stdin", "disk"):
+        monkeypatch.setattr(runner, "SANDBOX_STAGING", staging)
+        assert run_code(language, code, passing)["result"] == "success"
+        result = run_code(language, code, failing)
+        assert result["result"] == "failure"
+        assert error in result["message"]
+        assert script_name in result["message"]
+    assert os.listdir(runner.work_dir()) == []  # Scripts are never written
+
+
+def test_run_code_unsupported_language():
+    with pytest.raises(ValueError):
+        run_code("cobol", "", "")
@@ -1,3 +1,10 @@
+import json
+
+from sqlalchemy import text
+
+from src import ndjson
+
+
 def test_create_snippets(client):
     response = client.post(
         "/api/snippets",
@@ -78,3 +85,244 @@ def test_delete_snippet(client):
 
     get_response = client.get(f"/api/snippets/{snippet_id}")
     assert get_response.status_code == 404
+
+
+def test_get_snippets_pages_with_cursor(client):
+    for i in range(5):
+        client.post("/api/snippets", json={"title": f"Snippet {i}"})
+
+    titles, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/snippets", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        titles += [snippet["title"] for snippet in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert titles == [f"Snippet {i}" for i in reversed(range(5))]
+
+    response = client.get("/api/snippets", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_get_snippets_filters_and_summary(client):
+    client.post("/api/snippets", json={"title": "Py", "language": "python"})
+    client.post("/api/snippets", json={"title": "Rb", "language": "ruby"})
+
+    response = client.get(
+        "/api/snippets", params={"language": "ruby", "fields": "summary"}
+    )
+    assert response.status_code == 200
+    [snippet] = response.json()
+    assert set(snippet) == {"id", "title", "language", "updated_at"}
+    assert snippet["title"] == "Rb"
+
+    response = client.get("/api/snippets", params={"test_result": "success"})
+    assert response.json() == []
+
+
+def test_search_snippets(client):
+    client.post(
+        "/api/snippets",
+        json={"title": "Binary search", "code": "def binary_search(arr, x): ..."},
+    )
+    client.post(
+        "/api/snippets",
+        json={"title": "Sort <list>", "code": "def sort(arr): # no search here"},
+    )
+    deleted = client.post("/api/snippets", json={"title": "Search deleted"}).json()
+    client.delete(f"/api/snippets/{deleted['id']}")
+
+    response = client.get("/api/snippets/search", params={"q": "searc"})
+    assert response.status_code == 200
+    results = response.json()
+    # Title matches rank first, soft-deleted snippets are not returned
+    assert [r["title"] for r in results] == ["Binary search", "Sort <list>"]
+    assert results[0]["highlight"] == "Binary <mark>search</mark>"
+    assert "&lt;list&gt;" not in results[1]["highlight"]
+    assert "<mark>search</mark> here" in results[1]["highlight"]
+
+    response = client.get("/api/snippets/search", params={"q": "search", "limit": 1})
+    assert len(response.json()) == 1
+    assert response.headers["X-Next-Offset"] == "1"
+
+
+def test_search_follows_updates(client, db_session):
+    snippet = client.post("/api/snippets", json={"title": "Quick sort"}).json()
+    client.put(f"/api/snippets/{snippet['id']}", json={"title": "Merge sort"})
+
+    search = lambda q: client.get("/api/snippets/search", params={"q": q}).json()
+    assert search("quick") == []
+    assert [r["id"] for r in search("merge")] == [snippet["id"]]
+    assert search("()") == []
+    db_session.execute(
+        text("INSERT INTO snippets_fts(snippets_fts) VALUES ('integrity-check')")
+    )
+
+
+def test_update_snippet_sets_empty_strings(client):
+    snippet = client.post(
+        "/api/snippets", json={"title": "Title", "feedback": "Too slow"}
+    ).json()
+
+    response = client.put(f"/api/snippets/{snippet['id']}", json={"feedback": ""})
+    assert response.status_code == 200
+    assert response.json()["feedback"] == ""
+    assert response.json()["title"] == "Title"
+    assert response.json()["updated_at"] > snippet["updated_at"]
+
+    client.delete(f"/api/snippets/{snippet['id']}")
+    response = client.put(f"/api/snippets/{snippet['id']}", json={"title": "New"})
+    assert response.status_code == 404
+
+
+def test_bulk_update_and_delete(client):
+    ids = [client.post("/api/snippets", json={}).json()["id"] for _ in range(3)]
+
+    response = client.post(
+        "/api/snippets/bulk/update",
+        json={"ids": ids[:2] + [999], "changes": {"language": "ruby"}},
+    )
+    assert response.json() == {"ids": ids[:2]}
+    languages = [client.get(f"/api/snippets/{i}").json()["language"] for i in ids]
+    assert languages == ["ruby", "ruby", ""]
+
+    response = client.post("/api/snippets/bulk/delete", json={"ids": ids[1:]})
+    assert response.json() == {"ids": ids[1:]}
+    assert [s["id"] for s in client.get("/api/snippets").json()] == ids[:1]
+
+
+def test_import_and_export_snippets(client):
+    lines = [
+        '{"title": "One", "language": "python", "test_result": "success"}',
+        "",
+        '{"title": "Two", "code": "print(2)", "updated_at": "2024-01-01T00:00:00"}',
+    ]
+    response = client.post(
+        "/api/snippets/import",
+        content="\n".join(lines),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"imported": 2}
+
+    response = client.get("/api/snippets/export")
+    assert response.status_code == 200
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [s["title"] for s in exported] == ["One", "Two"]
+    assert exported[0]["test_result"] == "success"
+    assert exported[1]["updated_at"] == "2024-01-01T00:00:00"
+
+    # Re-importing an export restores the same snippets under new IDs
+    response = client.post("/api/snippets/import", content=response.content)
+    assert response.json() == {"imported": 2}
+
+
+def test_import_reports_invalid_line(client):
+    response = client.post(
+        "/api/snippets/import", content='{"title": "One"}\n{"title": 5}\n'
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"]["imported"] == 0
+    assert response.json()["detail"]["message"].startswith("Line 2:")
+    assert client.get("/api/snippets").json() == []
+
+
+def test_import_rejects_long_line(client, monkeypatch):
+    monkeypatch.setattr(ndjson, "NDJSON_MAX_LINE_BYTES", 100)
+
+    def body():
+        yield b'{"title": "One"}\n{"title": "'
+        for _ in range(1000):
+            yield b"x" * 64  # Never ends the line
+
+    response = client.post("/api/snippets/import", content=body())
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == "Line 2: longer than 100 bytes"
+    assert client.get("/api/snippets").json() == []
+
+
+def test_get_snippet_conditional(client):
+    snippet_id = client.post("/api/snippets/", json={"title": "One"}).json()["id"]
+    response = client.get(f"/api/snippets/{snippet_id}")
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        f"/api/snippets/{snippet_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.put(f"/api/snippets/{snippet_id}", json={"title": "Two"})
+    response = client.get(
+        f"/api/snippets/{snippet_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["title"] == "Two"
+    assert response.headers["ETag"] != etag
+
+
+def test_get_snippets_conditional(client):
+    client.post("/api/snippets/", json={"title": "One"})
+    response = client.get("/api/snippets")
+    etag = response.headers["ETag"]
+    response = client.get("/api/snippets", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Any write invalidates the cached pages
+    snippet_id = client.post("/api/snippets/", json={"title": "Two"}).json()["id"]
+    response = client.get("/api/snippets", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [s["title"] for s in response.json()] == ["Two", "One"]
+
+    client.delete(f"/api/snippets/{snippet_id}")
+    assert [s["title"] for s in client.get("/api/snippets").json()] == ["One"]
+    assert client.get(f"/api/snippets/{snippet_id}").status_code == 404
+
+
+def test_snippet_texts_are_stored_once(client, db_session):
+    code = "def square(x):\n    return x * x\n"
+    ids = [
+        client.post("/api/snippets/", json={"title": t, "code": code}).json()["id"]
+        for t in ("One", "Two")
+    ]
+    client.put(f"/api/snippets/{ids[1]}", json={"feedback": "Use pow"})
+
+    assert db_session.scalar(text("SELECT count(*) FROM blobs")) == 2
+    snippet = client.get(f"/api/snippets/{ids[1]}").json()
+    assert (snippet["code"], snippet["feedback"]) == (code, "Use pow")
+
+
+def test_snippet_revisions(client, db_session):
+    snippet = client.post(
+        "/api/snippets/", json={"title": "Square", "code": "def f(x):\n    pass\n"}
+    ).json()
+    url = f"/api/snippets/{snippet['id']}"
+    assert [r["number"] for r in client.get(f"{url}/revisions").json()] == [1]
+
+    client.put(url, json={"code": "def f(x):\n    return x * x\n"})
+    client.put(url, json={"code": "def f(x):\n    return x * x\n"})  # No change
+    client.put(url, json={"title": "Square a number", "feedback": "Add tests"})
+    assert client.get(url).json()["revision"] == 3
+
+    response = client.get(f"{url}/revisions")
+    assert [(r["number"], r["changes"]) for r in response.json()] == [
+        (3, ["title", "feedback"]),
+        (2, ["code"]),
+        (1, []),
+    ]
+    assert len(client.get(f"{url}/revisions", params={"before": 3}).json()) == 2
+
+    first = client.get(f"{url}/revisions/1").json()
+    assert (first["title"], first["code"]) == ("Square", "def f(x):\n    pass\n")
+    assert first["created_at"] == snippet["updated_at"]
+    second = client.get(f"{url}/revisions/2").json()
+    assert (second["title"], second["feedback"]) == ("Square", "")
+    assert client.get(f"{url}/revisions/3").json()["feedback"] == "Add tests"
+    assert client.get(f"{url}/revisions/4").status_code == 404
+
+    # The replaced code is only kept in the revisions
+    assert db_session.scalar(text("SELECT count(*) FROM blobs")) == 2
@@ -0,0 +1,99 @@
+import asyncio
+
+from src import sse
+from src.streams import SharedStream
+
+
+async def collect(stream) -> list[str]:
+    return [event async for event in stream]
+
+
+def test_format_event():
+    assert sse.format_event("a\nb", "code", "s:1") == (
+        'id: s:1\nevent: code\ndata: "a\\nb"\n\n'
+    )
+    assert sse.format_event({"x": 1}) == 'data: {"x": 1}\n\n'
+
+
+def test_parse_event_id():
+    assert sse.parse_event_id(None, "s") == 0
+    assert sse.parse_event_id("s:4", "s") == 5
+    assert sse.parse_event_id("other:4", "s") == 0
+
+
+def test_batch_budget(monkeypatch):
+    assert sse.batch_budget("title") == sse.BatchBudget(*sse.BATCH_BUDGETS["title"])
+    assert sse.batch_budget("unknown") == sse.BatchBudget(
+        sse.SSE_BATCH_BYTES, sse.SSE_BATCH_DELAY_MS
+    )
+    monkeypatch.setenv("SSE_BATCH_CODE_BYTES", "8")
+    assert sse.batch_budget("code").max_bytes == 8
+
+
+def test_event_stream_batches_consecutive_chunks():
+    async def source():
+        for chunk in ["a", "b", "c", "d"]:
+            yield "message", chunk
+        yield "language", {"language": "python"}
+
+    async def main():
+        shared = SharedStream(source())
+        return await collect(sse.event_stream("s", shared))
+
+    # The first chunk is sent on its own to keep the time to first byte low
+    assert asyncio.run(main()) == [
+        sse.format_event("a", "message", "s:0"),
+        sse.format_event("bcd", "message", "s:3"),
+        sse.format_event({"language": "python"}, "language", "s:4"),
+        sse.format_event({}, "done", "s:5"),
+    ]
+
+
+def test_event_stream_flushes_on_size():
+    async def source():
+        for chunk in ["a", "b", "c", "d"]:
+            yield "message", chunk
+
+    async def main():
+        budget = sse.BatchBudget(max_bytes=2, max_delay_ms=1000)
+        return await collect(sse.event_stream("s", SharedStream(source()), 0, budget))
+
+    assert asyncio.run(main())[:3] == [
+        sse.format_event("a", "message", "s:0"),
+        sse.format_event("bc", "message", "s:2"),
+        sse.format_event("d", "message", "s:3"),
+    ]
+
+
+def test_event_stream_flushes_on_delay():
+    async def source():
+        for chunk in ["a", "b", "c"]:
+            await asyncio.sleep(0.03)
+            yield "message", chunk
+
+    async def main():
+        budget = sse.BatchBudget(max_bytes=1024, max_delay_ms=10)
+        return await collect(sse.event_stream("s", SharedStream(source()), 0, budget))
+
+    assert asyncio.run(main())[:3] == [
+        sse.format_event("a", "message", "s:0"),
+        sse.format_event("b", "message", "s:1"),
+        sse.format_event("c", "message", "s:2"),
+    ]
+
+
+def test_event_stream_sends_heartbeats_and_errors(monkeypatch):
+    monkeypatch.setattr(sse, "SSE_HEARTBEAT_S", 0.01)
+
+    async def source():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+        yield  # pragma: no cover
+
+    async def main():
+        return await collect(sse.event_stream("s", SharedStream(source())))
+
+    events = asyncio.run(main())
+    assert sse.HEARTBEAT in events
+    assert events[-2] == sse.format_event({"message": "upstream down"}, "error")
+    assert events[-1] == sse.format_event({}, "done", "s:0")
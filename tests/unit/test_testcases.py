@@ -0,0 +1,87 @@
+from src.testcases import split_python_tests
+
+
+def test_split_test_functions():
+    test_code = """
+import math
+
+def helper(x):
+    return math.floor(x)
+
+def test_floor():
+    assert helper(1.5) == 1
+
+async def test_async():
+    assert helper(2.5) == 2
+
+if __name__ == "__main__":
+    test_floor()
+"""
+    cases = split_python_tests(test_code)
+    assert [case.name for case in cases] == ["test_floor", "test_async"]
+    assert cases[0].test_code.startswith("import math\n")
+    assert cases[0].test_code.endswith("\ntest_floor()")
+    assert "asyncio.run(test_async())" in cases[1].test_code
+    # The __main__ block would call the tests before they are defined
+    assert all("__main__" not in case.test_code for case in cases)
+
+    # A lone test function is called too
+    assert split_python_tests("def test_one():\n    assert True")[0].test_code == (
+        "def test_one():\n    assert True\ntest_one()"
+    )
+
+
+def test_split_skips_functions_taking_arguments():
+    test_code = """
+def test_add(a, b):
+    assert add(a, b) == a + b
+
+def testing_util():
+    return 1
+
+def test_defaults(x=1, *, y=2):
+    assert test_add(x, y) is None
+
+test_add(1, 2)
+"""
+    cases = split_python_tests(test_code)
+    assert [case.name for case in cases] == ["test_defaults"]
+    assert "test_add(1, 2)" in cases[0].test_code  # Not a test, so kept as setup
+
+
+def test_split_top_level_asserts():
+    test_code = """
+it = iter([1, 2])
+assert next(it) == 1
+assert next(it) == 2, (
+    "second"
+)
+print("done")
+"""
+    cases = split_python_tests(test_code)
+    assert [case.name for case in cases] == [
+        "assert next(it) == 1",
+        "assert next(it) == 2, (",
+    ]
+    assert cases[0].test_code == "it = iter([1, 2])\nassert next(it) == 1"
+    # Earlier asserts run for their side effects, whether they pass or not
+    assert cases[1].test_code == (
+        "it = iter([1, 2])\n"
+        "try:\n    assert next(it) == 1\nexcept Exception:\n    pass\n"
+        'assert next(it) == 2, (\n    "second"\n)\n'
+        'print("done")'
+    )
+
+
+def test_split_falls_back_to_whole_test_code():
+    cases = [
+        "x = 1\nassert x == 1",
+        "def test_a(): pass\nx = 1; test_a()",
+        "assert (",
+        "",
+    ]
+    for test_code in cases:
+        cases = split_python_tests(test_code)
+        assert [(case.name, case.test_code) for case in cases] == [
+            ("test_code", test_code)
+        ]
@@ -0,0 +1,23 @@
+import pytest
+
+from src.languages import PYTHON
+from src.warm_pool import WarmPool, WarmPoolError
+
+
+def test_warm_pool_recovers_when_a_worker_cannot_be_replaced():
+    pool = WarmPool(1, PYTHON.worker)
+    source = PYTHON.build_script("", "print('ok')")
+    assert pool.run(source, 1000, 64, 1000)["stdout"] == "ok\n"
+
+    worker = pool._idle.queue[0]
+    worker.proc.kill()
+    worker.proc.wait()
+    pool.command = ("false",)  # Replacements fail to start
+    with pytest.raises(WarmPoolError):
+        pool.run(source, 1000, 64, 1000)
+    with pytest.raises(WarmPoolError):
+        pool.run(source, 1000, 64, 1000)
+
+    pool.command = PYTHON.worker
+    assert pool.run(source, 1000, 64, 1000)["stdout"] == "ok\n"
+    pool.shutdown()